@@ -1,24 +1,19 @@
 from django import forms
-from website.apps.core.models import Language
+from django.core.cache import cache
+from django.db.models import Count
+from website.apps.core.models import Language, Clade, get_clade_version
 from website.apps.lexicon.models import Word, CognateSet, CognateNote
 
-from collections import Counter
 
 def get_clades(depth=3):
-    clades = Counter()
-    total = 0
-    for o in Language.objects.values('classification'):
-        if len(o['classification']) < 2:
-            continue
-        classif = [_.strip() for _ in o['classification'].split(',')]
-        sub = []
-        for i in range(0, min([depth, len(classif)])):
-            sub.append(classif[i])
-            clades[", ".join(sub)] += 1
-        total += 1
-        
-    choices = sorted([(c, "%s (%d)" % (c, clades[c])) for c in clades])
-    choices.insert(0, ('', 'ALL (%d)' % total))  # add default
+    key = 'cognacy-clades-%d-%d' % (depth, get_clade_version())
+    choices = cache.get(key)
+    if choices is None:
+        clades = Clade.objects.filter(depth__lte=depth).annotate(count=Count('languages'))
+        total = Language.objects.filter(clades__depth=1).count()
+        choices = sorted([(c.path, "%s (%d)" % (c.path, c.count)) for c in clades])
+        choices.insert(0, ('', 'ALL (%d)' % total))  # add default
+        cache.set(key, choices, None)
     return choices
     
 
@@ -44,8 +39,16 @@ class DoCognateForm(forms.Form):
         if clades:
             self.fields['clade'].choices = clades
 
+class CognateSetsField(forms.ModelMultipleChoiceField):
+    """Multiple choice field that also takes a single cognate set"""
+    def clean(self, value):
+        if value is not None and not isinstance(value, (list, tuple)):
+            value = [value]
+        return super(CognateSetsField, self).clean(value)
+
+
 class MergeCognateForm(forms.Form):
-    old = forms.ModelChoiceField(
+    old = CognateSetsField(
         queryset=None,
     )
     new = forms.ModelChoiceField(
@@ -60,7 +63,7 @@ class MergeCognateForm(forms.Form):
     
     def clean(self):
         cleaned_data = super(MergeCognateForm, self).clean()
-        if cleaned_data.get('old', None) == cleaned_data.get('new', None):
+        if cleaned_data.get('new', None) in cleaned_data.get('old', []):
             raise forms.ValidationError('The cognate sets cannot be the same!')
         return cleaned_data
         
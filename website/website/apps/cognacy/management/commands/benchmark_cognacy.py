@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from website.apps.core.models import Language, Source
+from website.apps.core.models import update_clades, invalidate_clades
+from website.apps.lexicon.models import Word, Lexicon, CognateSet, Cognate
+from website.apps.lexicon.counts import update_counts
+from website.apps.cognacy.views import do
+
+
+class Command(BaseCommand):
+    args = 'benchmark_cognacy [--sizes 1000,5000,20000]'
+    help = 'Times the cognacy workbench on synthetic words. Changes are rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes',
+            action='store',
+            dest='sizes',
+            default='1000,5000,20000',
+            help='Comma separated list of entries per word to test'
+        )
+        parser.add_argument('--languages',
+            action='store',
+            dest='languages',
+            type=int,
+            default=200,
+            help='Number of languages to spread the entries over'
+        )
+        parser.add_argument('--setsize',
+            action='store',
+            dest='setsize',
+            type=int,
+            default=10,
+            help='Number of entries in each cognate set'
+        )
+
+    def _print(self, message):
+        """
+        Wrapper to print to stdout, if it exists
+
+        (it won't exist if we're running tests)
+        """
+        if hasattr(self, 'stdout'):
+            self.stdout.write(message)
+
+    def make_word(self, size, nlanguages=200, setsize=10):
+        """Creates a word with `size` entries, each in a cognate set of `setsize`"""
+        editor = User.objects.create(username='benchmark-cognacy')
+        source = Source.objects.create(
+            author='Benchmark', slug='benchmark-cognacy', editor=editor
+        )
+        word = Word.objects.create(word='benchmark', slug='benchmark', editor=editor)
+        Language.objects.bulk_create([
+            Language(
+                language='Benchmark %d' % i, slug='benchmark-%d' % i,
+                classification='Benchmark, Clade %d' % (i % 10),
+                editor=editor
+            ) for i in range(nlanguages)
+        ])
+        languages = list(Language.objects.filter(slug__startswith='benchmark-'))
+        for language in languages:  # bulk_create doesn't send post_save
+            update_clades(Language, language)
+        invalidate_clades()
+        Lexicon.objects.bulk_create([
+            Lexicon(
+                language=languages[i % len(languages)], source=source,
+                word=word, entry='entry-%d' % i, editor=editor
+            ) for i in range(size)
+        ])
+        update_counts(added=[
+            (languages[i % len(languages)].id, source.id, word.id) for i in range(size)
+        ])
+        CognateSet.objects.bulk_create([
+            CognateSet(protoform='*benchmark-%d' % i, editor=editor)
+            for i in range(size // setsize + 1)
+        ])
+        cogsets = list(CognateSet.objects.filter(protoform__startswith='*benchmark-'))
+        lex_ids = word.lexicon_set.values_list('id', flat=True).order_by('id')
+        Cognate.objects.bulk_create([
+            Cognate(lexicon_id=lex_id, cognateset=cogsets[i // setsize], editor=editor)
+            for i, lex_id in enumerate(lex_ids)
+        ])
+        return editor, word
+
+    def benchmark(self, size, nlanguages=200, setsize=10):
+        """
+        Returns (number of queries, seconds) to render a word with `size`
+        entries. The synthetic data is rolled back afterwards.
+        """
+        with transaction.atomic():
+            editor, word = self.make_word(size, nlanguages, setsize)
+            request = RequestFactory().get('/cognacy/do/%s/' % word.slug)
+            request.user = editor
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                response = do(request, word.slug, '')
+                elapsed = time.time() - start
+            transaction.set_rollback(True)
+        invalidate_clades()
+        assert response.status_code == 200
+        return len(queries), elapsed
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options['sizes'].split(',')]
+        self._print("Entries\tQueries\tSeconds")
+        for size in sizes:
+            nqueries, elapsed = self.benchmark(
+                size, options['languages'], options['setsize']
+            )
+            self._print("%d\t%d\t%0.3f" % (size, nqueries, elapsed))
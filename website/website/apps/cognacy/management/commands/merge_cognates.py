@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from website.apps.lexicon.models import CognateSet
+from website.apps.cognacy.utils import merge_cognatesets
+
+
+class Command(BaseCommand):
+    args = 'merge_cognates target source [source ...] [--save]'
+    help = 'Merges one or more cognate sets into the target cognate set'
+    output_transaction = True
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', type=int)
+        parser.add_argument('sources', nargs='+', type=int)
+        parser.add_argument('--save',
+            action='store_true',
+            dest='save',
+            default=False,
+            help='Save changes to database'
+        )
+        parser.add_argument('--editor',
+            action='store',
+            dest='editor',
+            default=None,
+            help='Username to record the change against'
+        )
+
+    def _print(self, message):
+        """
+        Wrapper to print to stdout, if it exists
+
+        (it won't exist if we're running tests)
+        """
+        if hasattr(self, 'stdout'):
+            self.stdout.write(message)
+
+    def handle(self, *args, **options):
+        try:
+            target = CognateSet.objects.get(pk=options['target'])
+        except CognateSet.DoesNotExist:
+            raise CommandError("Unknown cognate set %d" % options['target'])
+
+        sources = CognateSet.objects.filter(pk__in=options['sources']).exclude(pk=target.pk)
+        missing = set(options['sources']) - set(sources.values_list('id', flat=True))
+        missing.discard(target.pk)
+        if missing:
+            raise CommandError("Unknown cognate set(s) %s" % ", ".join(
+                ["%d" % m for m in sorted(missing)]
+            ))
+
+        editor = None
+        if options['editor']:
+            editor = User.objects.get(username=options['editor'])
+
+        for source in sources:
+            self._print("%d\t%d cognates\t-> %d" % (
+                source.pk, source.cognate_set.count(), target.pk
+            ))
+
+        if options['save']:
+            moved = merge_cognatesets(target, sources, editor=editor)
+            self._print("Moved %d cognates into %d" % (moved, target.pk))
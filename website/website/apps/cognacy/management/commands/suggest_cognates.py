@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from website.apps.lexicon.models import Word
+from website.apps.cognacy.suggestions import suggest_cognates, THRESHOLD
+
+
+class Command(BaseCommand):
+    args = 'suggest_cognates [--word slug] [--processes N] [--threshold T] [--force]'
+    help = 'Clusters the entries of words with changed entries into suggested cognate sets'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--word',
+            action='append',
+            dest='words',
+            default=[],
+            help='Only cluster this word slug (can be given more than once)'
+        )
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=None,
+            help='Number of worker processes (default: one per CPU)'
+        )
+        parser.add_argument('--threshold',
+            action='store',
+            dest='threshold',
+            type=float,
+            default=THRESHOLD,
+            help='Clustering threshold (default: %0.2f)' % THRESHOLD
+        )
+        parser.add_argument('--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='Re-cluster words even if their entries have not changed'
+        )
+    
+    def _print(self, message):
+        """
+        Wrapper to print to stdout, if it exists
+        
+        (it won't exist if we're running tests)
+        """
+        if hasattr(self, 'stdout'):
+            self.stdout.write(message)
+    
+    def handle(self, *args, **options):
+        word_ids = None
+        if options['words']:
+            word_ids = list(
+                Word.objects.filter(slug__in=options['words']).values_list('id', flat=True)
+            )
+        
+        count = 0
+        for count, (word_id, entries) in enumerate(suggest_cognates(
+            word_ids, threshold=options['threshold'],
+            processes=options['processes'], force=options['force']
+        ), 1):
+            self._print("%d\t%d entries" % (word_id, entries))
+        self._print("Clustered %d words" % count)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lexicon', '0005_removing_concepticon_indexes'),
+        ('cognacy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CognateSuggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cluster', models.IntegerField(help_text='Suggested Cognate Set')),
+                ('lexicon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cognate_suggestion', to='lexicon.Lexicon')),
+            ],
+            options={
+                'db_table': 'cognacy_suggestions',
+            },
+        ),
+        migrations.CreateModel(
+            name='SuggestedWord',
+            fields=[
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='lexicon.Word')),
+                ('checksum', models.CharField(help_text="Hash of the word's entries", max_length=40)),
+                ('threshold', models.FloatField(help_text='Clustering threshold')),
+                ('added', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'cognacy_suggested_words',
+            },
+        ),
+        migrations.AddField(
+            model_name='cognatesuggestion',
+            name='word',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lexicon.Word'),
+        ),
+        migrations.AlterIndexTogether(
+            name='cognatesuggestion',
+            index_together=set([('word', 'cluster')]),
+        ),
+    ]
@@ -1 +1,55 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from website.apps.lexicon.models import Word, Lexicon
+
+
+class CognateSetReservation(models.Model):
+    """
+    Cognate set ids handed out to an editor by the cognacy workbench.
+
+    The primary key *is* the reserved cognate set id, so the database
+    guarantees that two editors can never hold the same free id.
+    """
+    id = models.IntegerField(primary_key=True)
+    editor = models.ForeignKey(User)
+    added = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'cognacy_reservations'
+        ordering = ['id', ]
+
+
+class CognateSuggestion(models.Model):
+    """
+    A candidate cognate set for a lexical entry, from automatic cognate
+    detection (see `website.apps.cognacy.suggestions`).
+    
+    `cluster` numbers the candidate sets within a word, and has nothing to
+    do with the cognate set ids.
+    """
+    lexicon = models.OneToOneField(Lexicon, related_name='cognate_suggestion')
+    word = models.ForeignKey(Word)
+    cluster = models.IntegerField(help_text="Suggested Cognate Set")
+    
+    class Meta:
+        db_table = 'cognacy_suggestions'
+        index_together = [
+            ["word", "cluster"],
+        ]
+
+
+class SuggestedWord(models.Model):
+    """
+    Records the state of each word's entries when the cognate suggestions
+    were made, so that only words with changed entries are re-clustered.
+    """
+    word = models.OneToOneField(Word, primary_key=True)
+    checksum = models.CharField(max_length=40,
+        help_text="Hash of the word's entries")
+    threshold = models.FloatField(help_text="Clustering threshold")
+    added = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'cognacy_suggested_words'
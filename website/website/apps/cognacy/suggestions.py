@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Automatic cognate detection.
+
+Clusters the entries of each word into candidate cognate sets using lingpy,
+and stores them as `CognateSuggestion`s for the cognacy workbench. Each word
+is stored with a checksum of its entries so that re-running only clusters
+the words whose entries have changed, and an interrupted run picks up from
+where it stopped.
+"""
+from collections import defaultdict
+from multiprocessing import Pool
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from website.apps.lexicon.models import Lexicon
+from website.apps.lexicon.alignment import get_checksum
+from website.apps.cognacy.models import CognateSuggestion, SuggestedWord
+
+# normalised distance below which entries are clustered together.
+THRESHOLD = 0.55
+
+
+def _tokenize(entry):
+    from lingpy import ipa2tokens, tokens2class
+    try:
+        return tokens2class(ipa2tokens(entry), 'sca')
+    except (ValueError, IndexError, KeyError):
+        # not something lingpy can segment, so compare the raw characters.
+        return list(entry)
+
+
+def _distance(a, b):
+    from lingpy.align.pairwise import edit_dist
+    if not a or not b:
+        return 0.0 if a == b else 1.0
+    return edit_dist(a, b, normalized=True)
+
+
+def cluster_entries(entries, threshold=THRESHOLD):
+    """
+    Clusters a word's (lexicon id, entry) pairs into candidate cognate sets
+    by UPGMA on the edit distance between their sound classes.
+
+    Returns a list of (lexicon id, cluster) where clusters are numbered from
+    1 in order of their first lexicon id.
+    """
+    from lingpy.algorithm.clustering import flat_upgma
+    entries = sorted(entries)
+    if not entries:
+        return []
+    sequences = [_tokenize(entry or '') for (lex_id, entry) in entries]
+    matrix = [[0.0] * len(sequences) for _ in sequences]
+    for i in range(len(sequences)):
+        for j in range(i + 1, len(sequences)):
+            matrix[i][j] = matrix[j][i] = _distance(sequences[i], sequences[j])
+
+    clusters = sorted([sorted(m) for m in flat_upgma(threshold, matrix).values()])
+    out = []
+    for cluster, members in enumerate(clusters, 1):
+        out.extend([(entries[i][0], cluster) for i in members])
+    return sorted(out)
+
+
+def _cluster_word(job):
+    # runs in the worker processes, so no database access in here.
+    word_id, checksum, entries, threshold = job
+    return word_id, checksum, cluster_entries(entries, threshold)
+
+
+def get_stale_words(word_ids=None, threshold=THRESHOLD, force=False):
+    """
+    Returns a dictionary of {word id: (checksum, entries)} for the words
+    whose entries have changed since they were last clustered at this
+    `threshold` (or all of them if `force` is set).
+    """
+    lexica = Lexicon.objects.all()
+    if word_ids is not None:
+        lexica = lexica.filter(word_id__in=word_ids)
+    entries = defaultdict(list)
+    for lex_id, word_id, entry in lexica.values_list('id', 'word_id', 'entry').iterator():
+        entries[word_id].append((lex_id, entry))
+
+    done = {}
+    if not force:
+        done = dict(
+            SuggestedWord.objects.filter(threshold=threshold).values_list('word_id', 'checksum')
+        )
+    stale = {}
+    for word_id in entries:
+        checksum = get_checksum(entries[word_id])
+        if done.get(word_id) != checksum:
+            stale[word_id] = (checksum, entries[word_id])
+    return stale
+
+
+def save_suggestions(word_id, checksum, clusters, threshold=THRESHOLD):
+    """Replaces the suggestions for a word with `clusters` from `cluster_entries`"""
+    with transaction.atomic():
+        # entries may have been deleted or moved while we were clustering.
+        current = set(
+            Lexicon.objects.filter(word_id=word_id).values_list('id', flat=True)
+        )
+        CognateSuggestion.objects.filter(
+            Q(word_id=word_id) | Q(lexicon_id__in=[l for (l, c) in clusters])
+        ).delete()
+        CognateSuggestion.objects.bulk_create([
+            CognateSuggestion(lexicon_id=lex_id, word_id=word_id, cluster=cluster)
+            for (lex_id, cluster) in clusters if lex_id in current
+        ])
+        SuggestedWord.objects.update_or_create(word_id=word_id, defaults={
+            'checksum': checksum, 'threshold': threshold, 'added': timezone.now()
+        })
+
+
+def suggest_cognates(word_ids=None, threshold=THRESHOLD, processes=None, force=False):
+    """
+    Updates the cognate suggestions for all words (or just `word_ids`) whose
+    entries have changed, clustering them in a pool of `processes` workers
+    (defaults to one per CPU, `1` clusters in this process).
+
+    This is a generator yielding (word id, number of entries) as each word
+    is saved, so an interrupted run keeps everything done so far.
+    """
+    stale = get_stale_words(word_ids, threshold, force)
+    jobs = [
+        (word_id, stale[word_id][0], stale[word_id][1], threshold)
+        for word_id in sorted(stale)
+    ]
+    if processes == 1:
+        pool, results = None, (_cluster_word(job) for job in jobs)
+    else:
+        # don't let the workers inherit our database connection.
+        if not connection.in_atomic_block:
+            connection.close()
+        pool = Pool(processes)
+        results = pool.imap_unordered(_cluster_word, jobs)
+    try:
+        for word_id, checksum, clusters in results:
+            save_suggestions(word_id, checksum, clusters, threshold)
+            yield word_id, len(clusters)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
@@ -5,7 +5,7 @@ from django.template.loader import render_to_string
 import django_tables2 as tables
 from django_tables2.utils import A  # alias for Accessor
 
-from website.apps.core.tables import DataTable
+from website.apps.core.tables import DataTable, KeysetMixin
 
 from website.apps.core.models import Source
 from website.apps.lexicon.models import Lexicon, CognateSet, Cognate
@@ -28,11 +28,15 @@ class CognateSourceIndexTable(DataTable):
     Meta.attrs['summary'] = 'Table of Sources with Cognates'
 
 
-class CognateSourceDetailTable(DataTable):
+class CognateSourceDetailTable(KeysetMixin, DataTable):
     """Table of cognate sets by source"""
     cognateset = tables.LinkColumn('cognacy:detail', args=[A('cognateset_id')])
-    language = tables.LinkColumn('language-detail', args=[A('language.slug')])
-    word = tables.LinkColumn('word-detail', args=[A('word.slug')])
+    language = tables.LinkColumn(
+        'language-detail', args=[A('lexicon.language.slug')], accessor='lexicon.language'
+    )
+    word = tables.LinkColumn(
+        'word-detail', args=[A('lexicon.word.slug')], accessor='lexicon.word'
+    )
     lexicon = tables.Column()
     
     def render_lexicon(self, record):
@@ -52,11 +56,11 @@ class CognateSourceDetailTable(DataTable):
     Meta.attrs['summary'] = 'Table of Cognate Sets by Source'
 
 
-class CognateSetDetailTable(DataTable):
+class CognateSetDetailTable(KeysetMixin, DataTable):
     """Cognate set detail table"""
     id = tables.Column()
     language = tables.LinkColumn('language-detail', args=[A('language.slug')])
-    classification = tables.Column()
+    classification = tables.Column(accessor='language.classification')
     word = tables.LinkColumn('word-detail', args=[A('word.slug')])
     source = tables.LinkColumn('source-detail', args=[A('source.slug')])
     entry = tables.Column()
@@ -92,6 +96,7 @@ class CognacyTable(DataTable):
     annotation = tables.Column()
     loan = tables.BooleanColumn(null=False, yesno=('x', ''))
     cognacy = tables.Column()
+    suggested = tables.Column(verbose_name="Suggested")
     edit = tables.Column()
     
     def render_language(self, record):
@@ -105,6 +110,11 @@ class CognacyTable(DataTable):
             ])
         )
     
+    def render_suggested(self, value):
+        return mark_safe(
+            '<span class="label" title="Suggested cognate set">~%d</span>' % value
+        )
+    
     def render_edit(self, record):
         return mark_safe(
             '<input type="text" class="input-mini" id="c-%d" name="c-%d" value="" />' % (record.id, record.id)
@@ -118,7 +128,7 @@ class CognacyTable(DataTable):
     class Meta(DataTable.Meta):
         model = Lexicon
         order_by = 'classification' # default sorting
-        sequence = ('id', 'language', 'source', 'classification', 'entry', 'annotation', 'loan', 'cognacy', 'edit')
+        sequence = ('id', 'language', 'source', 'classification', 'entry', 'annotation', 'loan', 'cognacy', 'suggested', 'edit')
         exclude = ('editor', 'added', 'slug', 'phon_entry', 'loan_source', 'word', 'source_gloss')
     Meta.attrs['summary'] = 'Table of Lexicon'
 
@@ -1,3 +1,4 @@
+from website.apps.core.models import Language
 from website.apps.lexicon.models import CognateSet
 from website.apps.cognacy.tests.data import DataMixin
 
@@ -12,6 +13,33 @@ class Test_GetClades(DataMixin):
         assert (u'a', u'a (2)') in clades  # clade a, both languages
         assert (u'a, a', u'a, a (1)') in clades  # clade a, a - langa
         assert (u'a, b', u'a, b (1)') in clades  # clade a, b - langb
+    
+    def test_cached(self):
+        get_clades()
+        with self.assertNumQueries(0):
+            get_clades()
+    
+    def test_invalidated_on_save(self):
+        get_clades()
+        Language.objects.create(
+            language='C', slug='langc', classification='a, c', editor=self.editor
+        )
+        clades = get_clades()
+        assert ('', 'ALL (3)') in clades
+        assert (u'a, c', u'a, c (1)') in clades
+    
+    def test_invalidated_on_change(self):
+        get_clades()
+        self.lang_b.classification = 'a, a'
+        self.lang_b.save()
+        clades = get_clades()
+        assert (u'a, a', u'a, a (2)') in clades
+        assert (u'a, b', u'a, b (1)') not in clades
+    
+    def test_invalidated_on_delete(self):
+        get_clades()
+        self.lang_b.delete()
+        assert ('', 'ALL (1)') in get_clades()
 
 
 class Test_DoCognateForm(DataMixin):
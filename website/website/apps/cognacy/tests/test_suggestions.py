@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from django.core.urlresolvers import reverse
+from django.test.client import Client
+
+from website.apps.cognacy.tests.data import DataMixin
+from website.apps.cognacy.models import CognateSuggestion, SuggestedWord
+from website.apps.cognacy.suggestions import get_checksum, cluster_entries
+from website.apps.cognacy.suggestions import get_stale_words, suggest_cognates
+from website.apps.lexicon.models import Word, Lexicon
+
+
+class Test_Suggestions(DataMixin):
+    """Tests the automatic cognate suggestions"""
+    @classmethod
+    def setUpTestData(cls):
+        super(Test_Suggestions, cls).setUpTestData()
+        cls.five = Word.objects.create(word='Five', slug='five', editor=cls.editor)
+        for entry in (u'lima', u'lima', u'rima', u'tangan', u'ta\u014ban'):
+            Lexicon.objects.create(
+                language=cls.lang_a, word=cls.five, source=cls.source,
+                editor=cls.editor, entry=entry
+            )
+    
+    def setUp(self):
+        self.lima = list(self.five.lexicon_set.order_by('id'))
+    
+    def suggestions(self, word):
+        return dict(
+            CognateSuggestion.objects.filter(word=word).values_list('lexicon_id', 'cluster')
+        )
+    
+    def test_checksum(self):
+        assert get_checksum([(1, 'a'), (2, 'b')]) == get_checksum([(2, 'b'), (1, 'a')])
+        assert get_checksum([(1, 'a'), (2, 'b')]) != get_checksum([(1, 'a'), (2, 'c')])
+        assert get_checksum([(1, 'a'), (2, 'b')]) != get_checksum([(1, 'a')])
+    
+    def test_cluster_entries(self):
+        clusters = cluster_entries([(l.id, l.entry) for l in self.lima])
+        assert [c for (l, c) in clusters] == [1, 1, 1, 2, 2]
+    
+    def test_cluster_entries_empty(self):
+        assert cluster_entries([]) == []
+        assert cluster_entries([(1, '')]) == [(1, 1)]
+    
+    def test_suggest_cognates(self):
+        done = list(suggest_cognates(processes=1))
+        assert sorted(done) == [(self.word.id, 3), (self.five.id, 5)]
+        suggestions = self.suggestions(self.five)
+        assert suggestions[self.lima[0].id] == suggestions[self.lima[2].id]
+        assert suggestions[self.lima[3].id] == suggestions[self.lima[4].id]
+        assert suggestions[self.lima[0].id] != suggestions[self.lima[3].id]
+        assert SuggestedWord.objects.count() == 2
+    
+    def test_pool(self):
+        done = list(suggest_cognates(processes=2))
+        assert sorted(done) == [(self.word.id, 3), (self.five.id, 5)]
+        assert CognateSuggestion.objects.count() == 8
+    
+    def test_incremental(self):
+        list(suggest_cognates(processes=1))
+        assert get_stale_words() == {}
+        assert list(suggest_cognates(processes=1)) == []
+        # change one entry, only that word is re-clustered.
+        self.lima[2].entry = 'tangam'
+        self.lima[2].save()
+        assert list(get_stale_words()) == [self.five.id]
+        assert list(suggest_cognates(processes=1)) == [(self.five.id, 5)]
+        suggestions = self.suggestions(self.five)
+        assert suggestions[self.lima[2].id] == suggestions[self.lima[3].id]
+    
+    def test_threshold_change(self):
+        list(suggest_cognates(processes=1))
+        assert len(get_stale_words(threshold=0.1)) == 2
+    
+    def test_force(self):
+        list(suggest_cognates(processes=1))
+        assert len(list(suggest_cognates(processes=1, force=True))) == 2
+    
+    def test_word_ids(self):
+        assert list(suggest_cognates([self.five.id], processes=1)) == [(self.five.id, 5)]
+    
+    def test_deleted_entry(self):
+        list(suggest_cognates(processes=1))
+        self.lima[0].delete()
+        assert list(suggest_cognates(processes=1)) == [(self.five.id, 4)]
+        assert len(self.suggestions(self.five)) == 4
+    
+    def test_moved_entry(self):
+        list(suggest_cognates(processes=1))
+        self.lima[0].word = self.word
+        self.lima[0].save()
+        assert len(list(suggest_cognates(processes=1))) == 2
+        assert self.lima[0].id in self.suggestions(self.word)
+        assert self.lima[0].id not in self.suggestions(self.five)
+    
+    def test_shown_in_do(self):
+        list(suggest_cognates(processes=1))
+        client = Client()
+        client.login(username="admin", password="test")
+        response = client.get(reverse('cognacy:do', kwargs={'word': 'five', 'clade': ''}))
+        assert b'Suggested cognate set' in response.content
@@ -0,0 +1,269 @@
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import six
+from django.utils import timezone
+
+from reversion.models import Revision, Version
+
+from website.apps.cognacy.tests.data import DataMixin
+from website.apps.cognacy.models import CognateSetReservation
+from website.apps.cognacy.utils import get_missing_cogids, get_free_ranges
+from website.apps.cognacy.utils import release_cogids, save_cognacy, merge_cognatesets
+from website.apps.cognacy.utils import RESERVATION_TIMEOUT
+from website.apps.lexicon.models import Lexicon, CognateSet, Cognate, CognateNote
+
+
+class Test_GetMissingCogids(DataMixin):
+    """Tests get_missing_cogids"""
+    def setUp(self):
+        super(Test_GetMissingCogids, self).setUp()
+        # make some gaps: 1, 2, 4, 5, 8
+        CognateSet.objects.all().delete()
+        for pk in (1, 2, 4, 5, 8):
+            CognateSet.objects.create(pk=pk, editor=self.editor)
+        self.other = User.objects.create_user('other', 'other@example.com', 'test')
+
+    def test_no_cognates(self):
+        CognateSet.objects.all().delete()
+        assert get_missing_cogids(limit=3) == [1, 2, 3]
+
+    def test_free_ranges(self):
+        assert get_free_ranges() == [(3, 4), (6, 8), (9, None)]
+
+    def test_free_ranges_leading_gap(self):
+        CognateSet.objects.filter(pk__in=[1, 2]).delete()
+        assert get_free_ranges() == [(1, 4), (6, 8), (9, None)]
+
+    def test_free_ranges_limit(self):
+        assert get_free_ranges(limit=2) == [(3, 4), (6, 8)]
+
+    def test_fills_gaps(self):
+        assert get_missing_cogids(limit=6) == [3, 6, 7, 9, 10, 11]
+
+    def test_limit(self):
+        assert get_missing_cogids(limit=2) == [3, 6]
+
+    def test_deleted_cognate_set_is_reused(self):
+        CognateSet.objects.filter(pk=4).delete()
+        assert get_missing_cogids(limit=2) == [3, 4]
+
+    def test_reserves_for_editor(self):
+        assert get_missing_cogids(limit=3, editor=self.editor) == [3, 6, 7]
+        assert CognateSetReservation.objects.filter(editor=self.editor).count() == 3
+
+    def test_editors_get_different_ids(self):
+        assert get_missing_cogids(limit=3, editor=self.editor) == [3, 6, 7]
+        assert get_missing_cogids(limit=3, editor=self.other) == [9, 10, 11]
+        # and the first editor keeps theirs.
+        assert get_missing_cogids(limit=3, editor=self.editor) == [3, 6, 7]
+
+    def test_unreserved_skips_reservations(self):
+        get_missing_cogids(limit=2, editor=self.other)
+        assert get_missing_cogids(limit=2) == [7, 9]
+
+    def test_used_reservation_is_replaced(self):
+        get_missing_cogids(limit=3, editor=self.editor)
+        CognateSet.objects.create(pk=6, editor=self.editor)
+        assert get_missing_cogids(limit=3, editor=self.editor) == [3, 7, 9]
+        assert not CognateSetReservation.objects.filter(pk=6).exists()
+
+    def test_expired_reservations_are_released(self):
+        get_missing_cogids(limit=3, editor=self.other)
+        CognateSetReservation.objects.update(
+            added=timezone.now() - RESERVATION_TIMEOUT - timedelta(minutes=1)
+        )
+        assert get_missing_cogids(limit=3, editor=self.editor) == [3, 6, 7]
+
+    def test_release_cogids(self):
+        get_missing_cogids(limit=3, editor=self.other)
+        release_cogids([3, 6])
+        assert get_missing_cogids(limit=3) == [3, 6, 9]
+
+
+class Test_SaveCognacy(DataMixin):
+    """Tests save_cognacy"""
+    def test_additions(self):
+        save_cognacy(self.editor, additions=[
+            (self.lex_b.id, '%d' % self.cogset1.id),
+            (self.lex_c.id, '%d' % self.cogset1.id),
+        ])
+        assert self.cogset1.lexicon.count() == 3
+
+    def test_creates_cognateset(self):
+        pk = CognateSet.objects.order_by('-id')[0].id + 10
+        save_cognacy(self.editor, additions=[(self.lex_a.id, '%d' % pk)])
+        assert list(CognateSet.objects.get(pk=pk).lexicon.all()) == [self.lex_a]
+
+    def test_new_cognateset_in_revision(self):
+        pk = CognateSet.objects.order_by('-id')[0].id + 10
+        save_cognacy(self.editor, additions=[(self.lex_a.id, '%d' % pk)])
+        cogset = CognateSet.objects.get(pk=pk)
+        assert len(Version.objects.get_for_object(cogset)) == 1
+        assert len(Version.objects.get_for_object(cogset.cognate_set.get())) == 1
+
+    def test_releases_reservation(self):
+        pk = get_missing_cogids(limit=1, editor=self.editor)[0]
+        save_cognacy(self.editor, additions=[(self.lex_a.id, '%d' % pk)])
+        assert not CognateSetReservation.objects.filter(pk=pk).exists()
+
+    def test_duplicate_addition(self):
+        out = save_cognacy(self.editor, additions=[
+            (self.lex_a.id, '%d' % self.cogset1.id)
+        ])
+        assert self.cogset1.lexicon.count() == 1
+        assert 'already in cognate set' in out[0][1]
+
+    def test_deletions(self):
+        save_cognacy(self.editor, deletions=[
+            (self.lex_b.id, '%d' % self.cogset2.id)
+        ])
+        assert list(self.cogset2.lexicon.all()) == [self.lex_c]
+
+    def test_removes_empty_cognateset(self):
+        save_cognacy(self.editor, deletions=[
+            (self.lex_b.id, '%d' % self.cogset2.id),
+            (self.lex_c.id, '%d' % self.cogset2.id),
+        ])
+        assert not CognateSet.objects.filter(pk=self.cogset2.pk).exists()
+
+    def test_non_numeric(self):
+        out = save_cognacy(self.editor, additions=[(self.lex_a.id, 'banana')])
+        assert out[0][1].startswith('ERROR')
+        assert out[0][1].endswith('is not a number')
+
+    def test_unknown_lexicon(self):
+        out = save_cognacy(self.editor, additions=[(999, '%d' % self.cogset1.id)])
+        assert out == [(messages.ERROR, 'ERROR Lexicon 999 does not exist', 'error')]
+
+    def test_delete_command(self):
+        save_cognacy(self.editor, commands=[(self.lex_c.id, '!DELETE')])
+        assert not Lexicon.objects.filter(pk=self.lex_c.pk).exists()
+
+    def test_one_revision(self):
+        save_cognacy(self.editor,
+            commands=[(self.lex_c.id, '!DELETE')],
+            additions=[(self.lex_b.id, '%d' % self.cogset1.id)],
+            deletions=[(self.lex_a.id, '%d' % self.cogset1.id)],
+        )
+        assert Revision.objects.count() == 1
+        assert Revision.objects.get().user == self.editor
+
+    def test_queries_independent_of_size(self):
+        # one set of additions...
+        with CaptureQueriesContext(connection) as one:
+            save_cognacy(self.editor, additions=[(self.lex_b.id, '100')])
+        # ... is as expensive as three.
+        CognateSet.objects.filter(pk=100).delete()
+        with CaptureQueriesContext(connection) as three:
+            save_cognacy(self.editor, additions=[
+                (self.lex_a.id, '100'), (self.lex_b.id, '100'), (self.lex_c.id, '100')
+            ])
+        # (ignoring the reversion tables which store a row per version)
+        writes = lambda ctx: [
+            q['sql'] for q in ctx.captured_queries
+            if not q['sql'].startswith('SELECT') and 'reversion_' not in q['sql']
+        ]
+        assert len(writes(one)) == len(writes(three)), writes(three)
+
+
+class Test_MergeCognatesets(DataMixin):
+    """Tests merge_cognatesets"""
+    def setUp(self):
+        super(Test_MergeCognatesets, self).setUp()
+        self.cogset3 = CognateSet.objects.create(protoform='test-3', editor=self.editor)
+        Cognate.objects.create(lexicon=self.lex_a, cognateset=self.cogset3, editor=self.editor)
+        Cognate.objects.create(lexicon=self.lex_c, cognateset=self.cogset3, editor=self.editor)
+
+    def test_merges_multiple_sources(self):
+        target = CognateSet.objects.create(protoform='target', editor=self.editor)
+        merge_cognatesets(target, [self.cogset1, self.cogset2], editor=self.editor)
+        assert sorted(target.lexicon.values_list('id', flat=True)) == sorted([
+            self.lex_a.id, self.lex_b.id, self.lex_c.id
+        ])
+
+    def test_deletes_sources(self):
+        merge_cognatesets(self.cogset1, [self.cogset2, self.cogset3], editor=self.editor)
+        assert not CognateSet.objects.filter(pk__in=[self.cogset2.pk, self.cogset3.pk]).exists()
+
+    def test_no_duplicates(self):
+        # lex_a is in cogset1 and cogset3, lex_c is in cogset2 and cogset3
+        moved = merge_cognatesets(self.cogset1, [self.cogset2, self.cogset3], editor=self.editor)
+        assert moved == 2
+        assert Cognate.objects.filter(cognateset=self.cogset1, lexicon=self.lex_a).count() == 1
+        assert Cognate.objects.filter(cognateset=self.cogset1, lexicon=self.lex_c).count() == 1
+        assert self.cogset1.lexicon.count() == 3
+
+    def test_ignores_target_in_sources(self):
+        merge_cognatesets(self.cogset1, [self.cogset1, self.cogset2], editor=self.editor)
+        assert CognateSet.objects.filter(pk=self.cogset1.pk).exists()
+        assert self.cogset1.lexicon.count() == 3
+
+    def test_moves_notes(self):
+        note = CognateNote.objects.create(
+            cognateset=self.cogset2, note='note', editor=self.editor
+        )
+        merge_cognatesets(self.cogset1, [self.cogset2], editor=self.editor)
+        assert CognateNote.objects.get(pk=note.pk).cognateset == self.cogset1
+
+    def test_one_revision(self):
+        merge_cognatesets(self.cogset1, [self.cogset2, self.cogset3], editor=self.editor)
+        assert Revision.objects.count() == 1
+        assert Revision.objects.get().user == self.editor
+
+
+class Test_MergeCognatesCommand(DataMixin):
+    """Tests the merge_cognates command"""
+    def setUp(self):
+        super(Test_MergeCognatesCommand, self).setUp()
+        self.cogset3 = CognateSet.objects.create(protoform='test-3', editor=self.editor)
+        Cognate.objects.create(lexicon=self.lex_a, cognateset=self.cogset3, editor=self.editor)
+        Cognate.objects.create(lexicon=self.lex_c, cognateset=self.cogset3, editor=self.editor)
+
+    def merge(self, *args, **options):
+        out = six.StringIO()
+        call_command('merge_cognates', *[str(a) for a in args], stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run(self):
+        out = self.merge(self.cogset1.pk, self.cogset2.pk, self.cogset3.pk)
+        assert "%d\t2 cognates\t-> %d" % (self.cogset2.pk, self.cogset1.pk) in out
+        assert "%d\t2 cognates\t-> %d" % (self.cogset3.pk, self.cogset1.pk) in out
+        assert 'Moved' not in out
+        assert CognateSet.objects.filter(pk=self.cogset3.pk).exists()
+
+    def test_save(self):
+        out = self.merge(
+            self.cogset1.pk, self.cogset2.pk, self.cogset3.pk, save=True, editor='admin'
+        )
+        # lex_a is already in cogset1, and lex_c is in both sources.
+        assert 'Moved 2 cognates into %d' % self.cogset1.pk in out
+        assert sorted(self.cogset1.lexicon.values_list('id', flat=True)) == sorted([
+            self.lex_a.id, self.lex_b.id, self.lex_c.id
+        ])
+        assert Cognate.objects.filter(cognateset=self.cogset1).count() == 3
+        assert not CognateSet.objects.filter(pk__in=[self.cogset2.pk, self.cogset3.pk]).exists()
+        assert Revision.objects.get().user == self.editor
+
+    def test_target_in_sources(self):
+        self.merge(self.cogset1.pk, self.cogset1.pk, self.cogset2.pk, save=True)
+        assert CognateSet.objects.filter(pk=self.cogset1.pk).exists()
+        assert self.cogset1.lexicon.count() == 3
+
+    def test_unknown_cognateset(self):
+        with self.assertRaises(CommandError):
+            self.merge(999, self.cogset2.pk)
+        with self.assertRaises(CommandError):
+            self.merge(self.cogset1.pk, self.cogset2.pk, 999, save=True)
+        assert CognateSet.objects.filter(pk=self.cogset2.pk).exists()
+
+    def test_bad_arguments(self):
+        with self.assertRaises(CommandError):
+            self.merge(self.cogset1.pk)
+        with self.assertRaises(CommandError):
+            self.merge(self.cogset1.pk, 'banana')
@@ -5,9 +5,9 @@ from django.core.urlresolvers import reverse
 from website.apps.core.models import Source
 from website.apps.cognacy.tests.data import DataMixin
 
-from website.apps.core.tests.utils import PaginatorTestMixin
+from website.apps.core.tests.utils import KeysetPaginatorTestMixin
 
-class Test_CognateSourceDetail(DataMixin, PaginatorTestMixin, TestCase):
+class Test_CognateSourceDetail(DataMixin, KeysetPaginatorTestMixin, TestCase):
     def setUp(self):
         super(Test_CognateSourceDetail, self).setUp()
         self.url = reverse('cognacy:cognatesource_detail', kwargs={'slug': self.source.slug})
@@ -42,3 +42,9 @@ class Test_CognateSourceDetail(DataMixin, PaginatorTestMixin, TestCase):
         response = self.client.get(url)
         data = response.context['table'].data.data
         assert len(data) == 0
+    
+    def test_sorting(self):
+        for sort in ('language', '-word', 'lexicon', 'cognateset'):
+            response = self.client.get(self.url, {'sort': sort})
+            self.assertEquals(response.status_code, 200)
+            assert len(response.context['table'].page.object_list) == 2
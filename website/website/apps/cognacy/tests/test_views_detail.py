@@ -54,17 +54,20 @@ class Test_CognateSetDetail(DataMixin, TestCase):
     
     def test_paginator(self):
         self.client.login(username="admin", password="test")
-        response = self.client.get('{}?page=1'.format(self.url))
+        response = self.client.get('{}?cursor='.format(self.url))
         self.assertEqual(response.status_code, 200)
     
-    def test_bad_paginator_integer(self):
+    def test_sorting(self):
         self.client.login(username="admin", password="test")
-        response = self.client.get('{}?page=10000'.format(self.url))
-        self.assertEqual(response.status_code, 404)
-        
-    def test_bad_paginator_word(self):
+        url = reverse('cognacy:detail', kwargs={'pk': self.cogset2.id})
+        for sort in ('classification', '-language', 'source'):
+            response = self.client.get(url, {'sort': sort})
+            self.assertEqual(response.status_code, 200)
+            assert b'three' in response.content
+    
+    def test_bad_paginator_cursor(self):
         self.client.login(username="admin", password="test")
-        response = self.client.get('{}?page=banana'.format(self.url))
+        response = self.client.get('{}?cursor=banana'.format(self.url))
         self.assertEqual(response.status_code, 404)
     
         
\ No newline at end of file
@@ -5,6 +5,7 @@ from django.core.urlresolvers import reverse
 
 from website.apps.cognacy.tests.data import DataMixin
 from website.apps.lexicon.models import CognateSet, Cognate, CognateNote
+from website.apps.cognacy.management.commands import benchmark_cognacy
         
 
 class Test_Do(DataMixin):
@@ -97,3 +98,12 @@ class Test_Do(DataMixin):
         
         
 
+
+
+class Test_DoQueries(DataMixin):
+    """Tests the Cognate Do View doesn't need more queries for larger words"""
+    def test_queries_independent_of_size(self):
+        cmd = benchmark_cognacy.Command()
+        small, _ = cmd.benchmark(10, nlanguages=5, setsize=2)
+        large, _ = cmd.benchmark(200, nlanguages=20, setsize=5)
+        assert small == large, "%d queries for 10 entries, %d for 200" % (small, large)
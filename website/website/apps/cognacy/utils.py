@@ -1,14 +1,313 @@
-from website.apps.lexicon.models import CognateSet
-
-def get_missing_cogids(limit=10):
-    cogids = CognateSet.objects.all().values_list('id', flat=True)
-    # handle no cognate case.
-    if len(cogids) == 0:
-        return range(1, limit + 1)
-    
-    # find the maximum cognate id and adding limit to it -- this 
-    # means that we can iterate over things happily and always return
-    # $limit records
-    max_cog_id = max(cogids) + limit
-    return [i for i in range(1, max_cog_id + 1) if i not in cogids][0:limit]
+from datetime import timedelta
 
+from django.contrib import messages
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from reversion import revisions as reversion
+
+from website.apps.lexicon.models import Lexicon, CognateSet, Cognate, CognateNote
+from website.apps.cognacy.models import CognateSetReservation
+
+# how long an editor holds on to the cognate set ids they've been offered.
+RESERVATION_TIMEOUT = timedelta(hours=2)
+
+# number of times to retry when another editor grabs the same free ids.
+RESERVATION_RETRIES = 5
+
+
+def get_free_ranges(limit=10):
+    """
+    Returns up to `limit` ranges of unused cognate set ids as (start, stop)
+    tuples, where `stop` is the next used id (exclusive) or None for the
+    open-ended range above the highest cognate set.
+
+    This looks for the ends of runs of consecutive ids (id + 1 not taken) so
+    the database can answer from the primary key index rather than us having
+    to load every cognate set id.
+    """
+    table = connection.ops.quote_name(CognateSet._meta.db_table)
+    cursor = connection.cursor()
+
+    # handle no cognate case / a gap below the first cognate set.
+    cursor.execute("SELECT MIN(id) FROM %s" % table)
+    first = cursor.fetchone()[0]
+    if first is None:
+        return [(1, None)]
+
+    ranges = []
+    if first > 1:
+        ranges.append((1, first))
+
+    cursor.execute("""
+        SELECT c.id + 1, (SELECT MIN(n.id) FROM {table} n WHERE n.id > c.id)
+        FROM {table} c
+        WHERE NOT EXISTS (SELECT 1 FROM {table} n WHERE n.id = c.id + 1)
+        ORDER BY c.id
+        LIMIT %s
+    """.format(table=table), [limit])
+    ranges.extend(cursor.fetchall())
+    return ranges[0:limit]
+
+
+def _find_free_ids(limit, skip):
+    """Returns the first `limit` unused cognate set ids not in `skip`"""
+    found = []
+    # each range has at least one id in it, so we can never need more than
+    # `limit` ranges plus one for each id we've been told to skip.
+    for start, stop in get_free_ranges(limit + len(skip)):
+        i = start
+        while (stop is None or i < stop) and len(found) < limit:
+            if i not in skip:
+                found.append(i)
+            i += 1
+        if len(found) == limit:
+            break
+    return found
+
+
+def get_missing_cogids(limit=10, editor=None):
+    """
+    Returns the next `limit` free cognate set ids.
+
+    If `editor` is given then these ids are reserved for that editor for
+    RESERVATION_TIMEOUT so that two people working on the cognacy workbench
+    at the same time are never offered the same ids. Ids reserved by other
+    editors are always skipped.
+    """
+    for attempt in range(RESERVATION_RETRIES):
+        try:
+            with transaction.atomic():
+                return _reserve_cogids(limit, editor)
+        except IntegrityError:
+            # someone else reserved one of our ids in the meantime. Try again.
+            if attempt == RESERVATION_RETRIES - 1:
+                raise
+
+
+def _reserve_cogids(limit, editor):
+    now = timezone.now()
+    reservations = CognateSetReservation.objects.all()
+    reservations.filter(added__lt=now - RESERVATION_TIMEOUT).delete()
+
+    mine, others = [], set()
+    for pk, editor_id in reservations.values_list('id', 'editor_id'):
+        if editor is not None and editor_id == editor.id:
+            mine.append(pk)
+        else:
+            others.add(pk)
+
+    if editor is None:
+        return _find_free_ids(limit, others)
+
+    # keep the ids we've already offered this editor, as long as they haven't
+    # been used in the meantime.
+    used = set(CognateSet.objects.filter(id__in=mine).values_list('id', flat=True))
+    release_cogids(used)
+    mine = sorted(set(mine) - used)[0:limit]
+    reservations.filter(id__in=mine).update(added=now)
+
+    new = _find_free_ids(limit - len(mine), others | set(mine))
+    CognateSetReservation.objects.bulk_create([
+        CognateSetReservation(id=i, editor=editor, added=now) for i in new
+    ])
+    return sorted(mine + new)
+
+
+def release_cogids(ids):
+    """Releases any reservations on the given cognate set ids"""
+    CognateSetReservation.objects.filter(id__in=list(ids)).delete()
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def save_cognacy(editor, commands=(), additions=(), deletions=()):
+    """
+    Applies a batch of cognacy changes from the cognacy workbench.
+
+    - `commands` is a list of (lexicon id, command) e.g. (1, '!DELETE')
+    - `additions` is a list of (lexicon id, cognate set id) to add.
+    - `deletions` is a list of (lexicon id, cognate set id) to remove.
+
+    Cognate set ids can be strings as entered by the editor. Unknown
+    cognate sets are created when adding, and cognate sets left empty by
+    deletions are removed.
+
+    Everything happens in one transaction and is recorded as one revision.
+    Returns a list of (level, message, extra_tags) for the messages framework.
+    """
+    out = []
+    lexica = Lexicon.objects.in_bulk(
+        set([k for (k, v) in commands]) |
+        set([k for (k, v) in additions]) |
+        set([k for (k, v) in deletions])
+    )
+
+    def check(changes):
+        # filter out changes with non-numeric or unknown ids.
+        valid = []
+        for lex_id, cogset in changes:
+            cog_id = _as_int(cogset)
+            if cog_id is None:  # non numeric input. Can't be a PK
+                out.append((messages.ERROR,
+                    'ERROR %r for lexicon %d is not a number' % (cogset, lex_id),
+                    'error'
+                ))
+            elif lex_id not in lexica:
+                out.append((messages.ERROR,
+                    'ERROR Lexicon %d does not exist' % lex_id, 'error'
+                ))
+            else:
+                valid.append((lex_id, cog_id))
+        return valid
+
+    additions, deletions = check(additions), check(deletions)
+    cogsets = CognateSet.objects.in_bulk(
+        set([c for (l, c) in additions]) | set([c for (l, c) in deletions])
+    )
+
+    # existing memberships of everything we're touching.
+    existing = {}  # (lexicon id, cognateset id) -> [cognate ids]
+    members = Cognate.objects.filter(lexicon_id__in=list(lexica))
+    for pk, lex_id, cog_id in members.values_list('id', 'lexicon_id', 'cognateset_id'):
+        existing.setdefault((lex_id, cog_id), []).append(pk)
+
+    with reversion.create_revision():
+        reversion.set_user(editor)
+        reversion.set_comment("Cognacy changes")
+
+        # 1. Special commands
+        to_delete = [lex_id for (lex_id, command) in commands if command == '!DELETE']
+        for lex_id in to_delete:
+            if lex_id not in lexica:
+                continue
+            out.append((messages.WARNING,
+                'Warning: DELETED lexicon %r' % lexica[lex_id], 'warning'
+            ))
+            reversion.add_to_revision(lexica[lex_id])
+
+        # 2. Cognate Additions
+        new_cogsets, new_cognates = [], []
+        for lex_id, cog_id in additions:
+            if cog_id not in cogsets:  # doesn't exist -- create
+                cogsets[cog_id] = CognateSet(
+                    pk=cog_id, protoform="", gloss="", editor=editor
+                )
+                new_cogsets.append(cogsets[cog_id])
+                out.append((messages.INFO,
+                    'Creating Cognate Set %r' % cogsets[cog_id], 'success'
+                ))
+            # avoid duplicates
+            if (lex_id, cog_id) in existing:
+                out.append((messages.WARNING,
+                    'Warning: %r already in cognate set %d' % (lexica[lex_id], cog_id),
+                    'warning'
+                ))
+                continue
+            existing[(lex_id, cog_id)] = []
+            new_cognates.append(
+                Cognate(lexicon_id=lex_id, cognateset_id=cog_id, editor=editor)
+            )
+            out.append((messages.INFO,
+                'Adding %r to cognate set %d' % (lexica[lex_id], cog_id),
+                'success'
+            ))
+
+        # 3. Cognate Deletions
+        removed, emptied = [], set()
+        for lex_id, cog_id in deletions:
+            if cog_id not in cogsets:
+                out.append((messages.ERROR,
+                    'ERROR CognateSet %r does not exist' % cog_id, 'error'
+                ))
+                continue
+            for pk in existing.pop((lex_id, cog_id), []):
+                out.append((messages.INFO,
+                    'Removing %r to cognate set %d' % (lexica[lex_id], cog_id),
+                    'warning'
+                ))
+                removed.append(pk)
+            emptied.add(cog_id)
+
+        # record the current state of everything we're about to remove,
+        # and remove it.
+        for cognate in Cognate.objects.filter(id__in=removed):
+            reversion.add_to_revision(cognate)
+        Cognate.objects.filter(id__in=removed).delete()
+        Lexicon.objects.filter(id__in=to_delete).delete()
+
+        # write the new cognate sets and cognates
+        CognateSet.objects.bulk_create(new_cogsets)
+        release_cogids([c.id for c in new_cogsets])
+        # as for the cognates, add the saved cognate sets to the revision.
+        for cogset in CognateSet.objects.filter(id__in=[c.id for c in new_cogsets]):
+            reversion.add_to_revision(cogset)
+        Cognate.objects.bulk_create(new_cognates)
+        if new_cognates:
+            # bulk_create doesn't give us primary keys on all databases, so
+            # fetch the new cognates back to add them to the revision.
+            seen = set([pk for pks in existing.values() for pk in pks])
+            added = Cognate.objects.filter(
+                lexicon_id__in=set([c.lexicon_id for c in new_cognates]),
+                cognateset_id__in=set([c.cognateset_id for c in new_cognates]),
+            )
+            for cognate in added:
+                if cognate.id not in seen:
+                    reversion.add_to_revision(cognate)
+
+        # remove cognatesets if they're empty
+        empty = CognateSet.objects.filter(id__in=emptied)
+        empty = empty.annotate(count=Count('cognate')).filter(count=0)
+        for cog in empty:
+            out.append((messages.INFO,
+                'Removing empty cognate set %r' % cog, 'warning'
+            ))
+        CognateSet.objects.filter(id__in=[c.id for c in empty]).delete()
+    return out
+
+
+def merge_cognatesets(target, sources, editor=None):
+    """
+    Folds the cognate sets `sources` into the cognate set `target`.
+
+    Cognates are moved to `target` unless their lexicon is already in it
+    (or is in more than one of the sources), notes are moved across, and
+    the source cognate sets are deleted.
+
+    This is done with a fixed number of UPDATE/DELETE statements in one
+    transaction and is recorded as one revision.
+    Returns the number of cognates moved to `target`.
+    """
+    source_ids = [
+        getattr(s, 'pk', s) for s in sources if getattr(s, 'pk', s) != target.pk
+    ]
+    members = Cognate.objects.filter(cognateset_id__in=source_ids)
+    with reversion.create_revision():
+        reversion.set_user(editor)
+        reversion.set_comment("Merged cognate sets %s into %d" % (
+            ", ".join(["%d" % s for s in sorted(source_ids)]), target.pk
+        ))
+        # remove cognates whose lexicon is already in the target...
+        members.filter(
+            lexicon_id__in=Cognate.objects.filter(cognateset=target).values('lexicon_id')
+        ).delete()
+        # ...or appear in more than one source (keeping the first).
+        keep = members.values('lexicon_id').annotate(keep=Min('id')).values('keep')
+        members.exclude(id__in=keep).delete()
+
+        moved = list(members.values_list('id', flat=True))
+        members.update(cognateset=target)
+        CognateNote.objects.filter(cognateset_id__in=source_ids).update(cognateset=target)
+        CognateSet.objects.filter(id__in=source_ids).delete()
+
+        # updates don't send post_save, so record the moved cognates ourselves.
+        reversion.add_to_revision(target)
+        for cognate in Cognate.objects.filter(id__in=moved):
+            reversion.add_to_revision(cognate)
+    return len(moved)
@@ -1,7 +1,9 @@
+from collections import defaultdict
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
-from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage
 from django.db import transaction
 from django.db.models import Max, Q, Count
 from django.shortcuts import get_object_or_404, Http404, render, redirect
@@ -10,15 +12,16 @@ from django.utils.decorators import method_decorator
 from django.views.generic import DetailView
 from django_tables2 import SingleTableView, RequestConfig
 
-from reversion import revisions as reversion
-
-from website.apps.core.models import Source
-from website.apps.lexicon.models import Word, Lexicon, CognateSet, Cognate, CognateNote
+from website.apps.core.models import Source, Clade
+from website.apps.core.pagination import InvalidCursor
+from website.apps.lexicon.models import Word, CognateSet, Cognate, CognateNote
 from website.apps.cognacy.forms import DoCognateForm, MergeCognateForm, CognateNoteForm, get_clades
 from website.apps.cognacy.tables import CognateSourceIndexTable, CognateSourceDetailTable
 from website.apps.cognacy.tables import CognacyTable, CognateSetDetailTable 
 
-from website.apps.cognacy.utils import get_missing_cogids
+from website.apps.cognacy.utils import get_missing_cogids, save_cognacy
+from website.apps.cognacy.utils import merge_cognatesets
+from website.apps.cognacy.models import CognateSuggestion
 
 
 class CognateSourceIndex(SingleTableView):
@@ -40,19 +43,19 @@ class CognateSourceDetail(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super(CognateSourceDetail, self).get_context_data(**kwargs)
-        qset = []
-        for o in kwargs['object'].cognate_set.select_related().all():
-            o.language = o.lexicon.language
-            o.word = o.lexicon.word
-            qset.append(o)
+        qset = kwargs['object'].cognate_set.select_related(
+            'lexicon__language', 'lexicon__word'
+        )
         context['lexicon'] = CognateSourceDetailTable(qset)
-        RequestConfig(self.request).configure(context['lexicon'])
-            
+        RequestConfig(self.request, paginate=False).configure(context['lexicon'])
+        
         try:
-            context['lexicon'].paginate(page=self.request.GET.get('page', 1), per_page=50)
+            context['lexicon'].paginate_keyset(
+                self.request.GET.get(context['lexicon'].prefixed_cursor_field), per_page=50
+            )
         except EmptyPage: # 404 on a empty page
             raise Http404
-        except PageNotAnInteger: # 404 on invalid page number
+        except InvalidCursor: # 404 on invalid cursor
             raise Http404
         
         context['type'] = 'Source'
@@ -67,19 +70,17 @@ class CognateSetDetail(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super(CognateSetDetail, self).get_context_data(**kwargs)
-        qset = []   # yuck
-        for o in kwargs['object'].lexicon.select_related('language', 'word', 'source').all():
-            o.classification = o.language.classification
-            qset.append(o)
-        
+        qset = kwargs['object'].lexicon.select_related('language', 'word', 'source')
         context['lexicon'] = CognateSetDetailTable(qset)
-        RequestConfig(self.request).configure(context['lexicon'])
+        RequestConfig(self.request, paginate=False).configure(context['lexicon'])
         
         try:
-            context['lexicon'].paginate(page=self.request.GET.get('page', 1), per_page=50)
+            context['lexicon'].paginate_keyset(
+                self.request.GET.get(context['lexicon'].prefixed_cursor_field), per_page=50
+            )
         except EmptyPage: # 404 on a empty page
             raise Http404
-        except PageNotAnInteger: # 404 on invalid page number
+        except InvalidCursor: # 404 on invalid cursor
             raise Http404
         # get any notes for this cognate set.
         context['notes'] = CognateNote.objects.filter(cognateset=kwargs['object'])
@@ -108,45 +109,51 @@ def do_index(request):
 def do(request, word, clade=None):
     """Do cognacy"""
     w = get_object_or_404(Word, slug=word)
-    lex_ids, entries = [], []
     lexica = w.lexicon_set.all()
     if clade:
-        lexica = lexica.filter(language__classification__startswith=clade)
-    
-    for e in lexica.select_related('source', 'word', 'language'):
-        lex_ids.append(e.id)
-        entries.append(e)
-    
-    # save us from one query for each cognateset -- select_related doesn't help us here so
-    # we do a rather ungainly merge.
-    # 1. get a list of (lexicon.id, cognateset.id)
-    queryset = Cognate.objects.filter(lexicon_id__in=lex_ids).select_related('lexicon', 'cognateset', 'cognateset__source')
-    cogs = [(c.lexicon_id, c.cognateset_id, c.cognateset) for c in queryset]
-    # 2. get notes
-    notes = CognateNote.objects.filter(Q(word=w) | Q(cognateset__in=[c[2] for c in cogs]))
+        lexica = lexica.filter(language__in=Clade.objects.languages(clade))
+    
+    # save us from one query for each cognateset -- select_related doesn't
+    # help us here so we index the (lexicon.id, cognateset.id) pairs in one
+    # query and the cognate sets in play in another.
+    cognates = Cognate.objects.filter(lexicon__in=lexica.values('id'))
+    cognacy = defaultdict(list)  # lexicon id -> [cognateset ids]
+    for lex_id, cog_id in cognates.values_list('lexicon_id', 'cognateset_id'):
+        cognacy[lex_id].append(cog_id)
+    
+    CSQ = CognateSet.cache_all_method.filter(
+        id__in=cognates.values('cognateset_id')
+    ).select_related('source').order_by('id')
+    cogsets = dict((c.id, c) for c in CSQ)
+    
+    # automatic suggestions (see suggest_cognates command)
+    suggestions = dict(CognateSuggestion.objects.filter(
+        lexicon__in=lexica.values('id')
+    ).values_list('lexicon_id', 'cluster'))
+    
+    # get notes
+    notes = CognateNote.objects.filter(
+        Q(word=w) | Q(cognateset__in=cognates.values('cognateset_id'))
+    )
     
-    # 3. go through entries and attach a list of cognateset ids if needed, else empty list
+    # go through entries and attach a list of cognateset ids if needed, else
+    # empty list, and collect the entries in each cognate set in play.
     entries_and_cogs = []
-    inplay = {}
-    for e in entries:
-        e.cognacy = [c[1] for c in cogs if c[0] == e.id]
+    inplay = defaultdict(set)  # cognateset id -> set of entries
+    for e in lexica.select_related('source', 'word', 'language'):
+        e.cognacy = cognacy.get(e.id, [])
+        e.suggested = suggestions.get(e.id)
         e.edit = True  # dummy value so django-tables2 passes to render_edit()
         e.classification = e.language.classification
         entries_and_cogs.append(e)
-        
-        cogobjs = [_[2] for _ in cogs if _[1] in e.cognacy]
-        for o in cogobjs:
-            inplay[o] = inplay.get(o, set())
-            inplay[o].add(e.entry)
+        for cog_id in e.cognacy:
+            inplay[cog_id].add(e.entry)
     
-    inplay = dict([(k, ", ".join(sorted(v)[0:20])) for (k, v) in inplay.items()])
-    inplay = sorted([(k.id, k, v) for (k, v) in inplay.items()])
-    inplay = [(_[1], _[2]) for _ in inplay]
+    inplay = [
+        (cogsets[k], ", ".join(sorted(inplay[k])[0:20])) for k in sorted(inplay)
+    ]
     
     form = DoCognateForm(initial={'word': w.id, 'clade': clade}, is_hidden=True, clades=get_clades())
-    
-    
-    CSQ = CognateSet.cache_all_method.filter(id__in=[c[1] for c in cogs]).order_by('id')
     mergeform = MergeCognateForm(request.POST or None, prefix='merge', queryset=CSQ)
     commentform = CognateNoteForm(request.POST or None, prefix='comment', 
         queryset=CSQ, initial = {'word': w,}
@@ -159,7 +166,7 @@ def do(request, word, clade=None):
         'word': w, 'clade': clade, 'lexicon': table,
         'inplay': inplay, 'form': form,
         'mergeform': mergeform,
-        'next_cognates': get_missing_cogids(limit=10),
+        'next_cognates': get_missing_cogids(limit=10, editor=request.user),
         'notes': notes,
         'commentform': commentform,
     })
@@ -196,7 +203,8 @@ def save(request, word, clade=None):
         except ValueError:
             raise ValueError("Form tampering!")
         
-        # pull out subsets of actions
+        # pull out subsets of actions: special commands, cognate additions
+        # and cognate deletions.
         commands = [
             (k, v) for (k, v) in changes if v.startswith("!")
         ]
@@ -207,97 +215,10 @@ def save(request, word, clade=None):
             (k, v[1:]) for (k, v) in changes if v.startswith('-') and v.startswith("!") == False
         ]
         
-        
-        # 1. Special commands
-        for lex_id, command in commands:
-            L = Lexicon.objects.get(pk=lex_id)
-            if command == '!DELETE':
-                messages.add_message(request, messages.WARNING, 
-                    'Warning: DELETED lexicon %r' % L, 
-                    extra_tags='warning'
-                )
-                with reversion.create_revision():
-                    L.delete()
-                    reversion.set_user(request.user)
-                    reversion.set_comment("Deleted item")
-                    
-        # 2. Cognate Additions
-        for lex_id, cogset in additions:
-            L = Lexicon.objects.get(pk=lex_id)
-            
-            try:
-                cog = CognateSet.objects.get(pk=int(cogset))
-            except ValueError:  # non numeric input. Can't be a PK
-                messages.add_message(request, messages.ERROR, 
-                    'ERROR %r for lexicon %d is not a number' % (cogset, lex_id), 
-                    extra_tags='error'
-                )
-                continue
-            except CognateSet.DoesNotExist:  # doesn't exist -- create
-                with reversion.create_revision():
-                    cog = CognateSet.objects.create(
-                        pk=int(cogset),
-                        protoform = "",
-                        gloss = "",
-                        editor=request.user
-                    )
-                    cog.save()
-                messages.add_message(request, messages.INFO, 
-                    'Creating Cognate Set %r' % cog, 
-                    extra_tags='success'
-                )
-            
-            # avoid duplicates
-            if L not in cog.lexicon.all():
-                with reversion.create_revision():
-                    Cognate.objects.create(lexicon=L, cognateset=cog, editor=request.user).save()
-                messages.add_message(request, messages.INFO, 
-                    'Adding %r to cognate set %d' % (L, cog.id), 
-                    extra_tags='success'
-                )
-            else:
-                messages.add_message(request, messages.WARNING, 
-                    'Warning: %r already in cognate set %d' % (L, cog.id), 
-                    extra_tags='warning'
-                )
-        
-        # 3. Cognate Deletions
-        for lex_id, cogset in deletions:
-            L = Lexicon.objects.get(pk=lex_id)
-            cog = None
-            
-            try:
-                cog = CognateSet.objects.get(pk=int(cogset))
-            except ValueError:  # non numeric input. Can't be a PK
-                messages.add_message(request, messages.ERROR,
-                    'ERROR %r for lexicon %d is not a number' % (cogset, lex_id),
-                    extra_tags='error'
-                )
-                continue
-            except CognateSet.DoesNotExist:  # doesn't exist -- create
-                messages.add_message(request, messages.ERROR,
-                    'ERROR CognateSet %r does not exist' % cogset,
-                    extra_tags='error'
-                )
-                continue
-                
-            members = [_ for _ in L.cognate_set.all() if _.cognateset_id == cog.id]
-            for m in members:
-                messages.add_message(request, messages.INFO,
-                    'Removing %r to cognate set %d' % (L, cog.id),
-                    extra_tags='warning'
-                )
-                with reversion.create_revision():
-                    m.delete()
-            
-            # remove cognateset if it's empty
-            if cog.cognate_set.count() == 0:
-                messages.add_message(request, messages.INFO,
-                    'Removing empty cognate set %r' % cog,
-                    extra_tags='warning'
-                )
-                with reversion.create_revision():
-                    cog.delete()
+        # 2. apply them in one go.
+        changes = save_cognacy(request.user, commands, additions, deletions)
+        for level, message, tags in changes:
+            messages.add_message(request, level, message, extra_tags=tags)
         
         url = reverse('cognacy:do', kwargs={
             'word': form.cleaned_data['word'].slug, 
@@ -319,20 +240,11 @@ def merge(request, word, clade=None):
         old = form.cleaned_data['old']
         new = form.cleaned_data['new']
         
-        messages.add_message(request, messages.INFO,
-            'Moving cognate set %r to %r' % (old, new),
-            extra_tags='warning'
-        )
-        # get the lexical items already in this cognateset
-        already = [lex for lex in new.lexicon.all()]
-        
-        with reversion.create_revision():
-            for cog in old.cognate_set.all():
-                if cog.lexicon in already:
-                    cog.delete()  # already got it in this cognate set. Delete the cognate
-                else:
-                    cog.cognateset = new
-                    cog.save()
-            old.delete()
+        for o in old:
+            messages.add_message(request, messages.INFO,
+                'Moving cognate set %r to %r' % (o, new),
+                extra_tags='warning'
+            )
+        merge_cognatesets(new, old, editor=request.user)
     url = reverse('cognacy:do', kwargs={'word': word, 'clade': clade})
     return redirect(url)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk imports.
+
+Saving a registered model normally does a lot of work per row: redirects
+are checked for a changed slug, the watson search index is updated, and
+reversion versions the object if there's a revision open. That's fine
+through the website but slow when loading a wordlist of tens of thousands
+of rows.
+
+Inside `bulk_import()` these are all switched off, the objects saved are
+noted, and once the block finishes their search entries and statistics are
+rebuilt in bulk and one revision is written to record the import.
+
+The watson and reversion receivers are disconnected for the whole process
+while the block runs, so this is for management commands rather than the
+website.
+
+`create_objects` is `bulk_create` for code that needs the primary keys of
+the new rows, whether or not the database returns them.
+"""
+from contextlib import contextmanager
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router
+from django.db.models import Max
+from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.encoding import force_text
+
+from reversion import revisions as reversion
+from reversion.models import Revision
+from watson import search as watson
+from watson.models import SearchEntry
+
+from website.signals import suspend_redirects
+from website.apps.statistics.models import statistic
+
+BATCH_SIZE = 500
+
+
+class BulkImport(object):
+    """The objects saved in a `bulk_import` block, by model"""
+    def __init__(self):
+        self.touched = {}
+
+    def add(self, model, pks):
+        """
+        Notes objects saved without a post_save signal (e.g. by bulk_create)
+        so that they're indexed at the end.
+        """
+        self.touched.setdefault(model, set()).update(pks)
+
+    def _saved(self, sender, instance, **kwargs):
+        # only what would have been indexed or versioned.
+        if reversion.is_registered(sender) or watson.is_registered(sender):
+            self.add(sender, [instance.pk])
+
+    def summary(self):
+        return u", ".join([
+            u"%d %s" % (len(pks), force_text(
+                model._meta.verbose_name if len(pks) == 1 else model._meta.verbose_name_plural
+            ))
+            for model, pks in sorted(self.touched.items(), key=lambda i: i[0].__name__)
+        ])
+
+
+def create_objects(model, objs, fields):
+    """
+    Adds `objs` (instances of `model`) with `bulk_create` and sets their
+    primary keys.
+
+    Databases that can't return the keys of a bulk insert (e.g. SQLite) get
+    them by matching the new rows on `fields`. These should include a
+    timestamp such as `added`, so that rows another connection adds at the
+    same time don't match. Identical objects get their keys in order.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    model.objects.bulk_create(objs)
+    attnames = [model._meta.get_field(f).attname for f in fields]
+    waiting = {}
+    for obj in objs:
+        waiting.setdefault(tuple([getattr(obj, a) for a in attnames]), []).append(obj)
+    rows = model.objects.filter(pk__gt=last).order_by('pk').values_list('pk', *fields)
+    for row in rows:
+        pending = waiting.get(tuple(row[1:]))
+        if pending:
+            pending.pop(0).pk = row[0]
+    return objs
+
+
+def _get_receivers():
+    """Returns the (signal, receiver, sender) that watson and reversion use"""
+    engine = watson.default_search_engine
+    for model in engine.get_registered_models():
+        yield post_save, engine._post_save_receiver, model
+    for model in reversion.get_registered_models():
+        for sender, signal, receiver in reversion._get_senders_and_signals(model):
+            yield signal, receiver, sender
+
+
+def update_search_index(model, pks):
+    """
+    Replaces the watson search entries for the `model` objects with primary
+    keys `pks`, a batch at a time.
+    """
+    engine = watson.default_search_engine
+    if not engine.is_registered(model):
+        return
+    adapter = engine.get_adapter(model)
+    content_type = ContentType.objects.get_for_model(model)
+    pks = sorted(pks)
+    for i in range(0, len(pks), BATCH_SIZE):
+        batch = pks[i:i + BATCH_SIZE]
+        SearchEntry.objects.filter(
+            engine_slug=engine._engine_slug, content_type=content_type,
+            object_id_int__in=batch
+        ).delete()
+        SearchEntry.objects.bulk_create([
+            SearchEntry(
+                engine_slug=engine._engine_slug,
+                content_type=content_type,
+                object_id=force_text(obj.pk),
+                object_id_int=obj.pk,
+                title=adapter.get_title(obj),
+                description=adapter.get_description(obj),
+                content=adapter.get_content(obj),
+                url=adapter.get_url(obj),
+                meta_encoded=adapter.serialize_meta(obj),
+            ) for obj in model._default_manager.filter(pk__in=batch)
+        ])
+
+
+@contextmanager
+def bulk_import(comment=u"Bulk import", user=None):
+    """
+    Runs the block with the per-row save hooks off, then indexes what was
+    saved and writes one revision summarising it. Yields a `BulkImport`.
+    Nothing is rebuilt if the block raises.
+    """
+    batch = BulkImport()
+    receivers = list(_get_receivers())
+    for signal, receiver, sender in receivers:
+        signal.disconnect(receiver, sender=sender)
+    post_save.connect(batch._saved, weak=False, dispatch_uid="bulk-import")
+    try:
+        with suspend_redirects():
+            yield batch
+    finally:
+        post_save.disconnect(dispatch_uid="bulk-import")
+        for signal, receiver, sender in receivers:
+            signal.connect(receiver, sender=sender)
+
+    if not batch.touched:
+        return
+    for model, pks in batch.touched.items():
+        update_search_index(model, pks)
+    statistic.update(models=list(batch.touched))
+    Revision.objects.create(
+        date_created=timezone.now(), user=user,
+        comment=u"%s: %s" % (comment, batch.summary())
+    )
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Cached language dossiers.
+
+The language page shows a lot of things about a language that rarely
+change: alternate names, links, attachments, the sources of its lexicon,
+its location and pronoun paradigm. These are gathered into one dossier
+per language and cached under the language's slug, so that the page only
+needs one cache read (and a query for its page of lexicon).
+
+The dossiers are deleted by signal handlers (see the models of the core,
+lexicon and pronouns apps) whenever anything in them changes. Anything
+that changes these in bulk should call `invalidate_dossiers` itself.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from website.apps.core.locations import get_location
+from website.apps.core.models import Language, Source
+
+DOSSIER_KEY = 'language-dossier:%s'
+
+# a backstop: anything we fail to invalidate is stale for a day at most.
+DOSSIER_TIMEOUT = 60 * 60 * 24
+
+
+def get_key(slug):
+    return DOSSIER_KEY % slug
+
+
+def build_dossier(language):
+    """
+    Returns the dossier for `language`, a dict of everything on the
+    language page except the lexicon, ready for the template.
+    """
+    dossier = {
+        'language': language,
+        'alternatenames': list(language.alternatename_set.all()),
+        'links': list(language.link_set.all()),
+        'attachments': list(language.attachment_set.select_related('source')),
+        'sources_used': list(Source.objects.filter(
+            pk__in=language.lexicon_set.values('source_id')
+        )),
+        'location': get_location(language.isocode),
+    }
+
+    if 'website.apps.pronouns' in settings.INSTALLED_APPS:
+        from website.apps.pronouns.models import Paradigm
+        from website.apps.pronouns.tools import add_pronoun_table
+        paradigm = Paradigm.objects.filter(language=language).first()
+        if paradigm is not None:
+            dossier['pronoun'] = paradigm
+            # fetch the cells and their entries up front so that they're
+            # cached with the rest.
+            dossier['pronoun_rows'] = add_pronoun_table(
+                paradigm.pronoun_set.select_related('pronountype').prefetch_related('entries')
+            )
+    return dossier
+
+
+def get_dossier(slug):
+    """
+    Returns the dossier for the language with the slug `slug`, building and
+    caching it if need be. Raises Language.DoesNotExist if there isn't one.
+    """
+    key = get_key(slug)
+    dossier = cache.get(key)
+    if dossier is None:
+        dossier = build_dossier(Language.objects.get(slug=slug))
+        cache.set(key, dossier, DOSSIER_TIMEOUT)
+    return dossier
+
+
+def invalidate_dossiers(languages=None, slugs=None):
+    """
+    Deletes the cached dossiers of the languages with the given ids (or a
+    queryset of languages), and/or those with the given slugs.
+    """
+    keys = [get_key(slug) for slug in slugs or []]
+    if languages is not None:
+        if not hasattr(languages, 'values_list'):
+            languages = Language.objects.filter(pk__in=list(languages))
+        keys.extend([get_key(slug) for slug in languages.values_list('slug', flat=True)])
+    if keys:
+        cache.delete_many(keys)
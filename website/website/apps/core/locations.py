@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+The location index.
+
+Maps and language pages need the coordinates of languages by ISO code.
+Rather than querying `Location` for these every time, each process loads
+all of them once into a dict of {isocode: Point}.
+
+Saving or deleting a `Location` bumps the version of the index (see the
+signal handlers in the core models), and the index is reloaded when it's
+next used. Anything that changes locations in bulk should call
+`invalidate_locations` itself.
+
+Each process keeps its own version, and other processes only hear about a
+change through the version in the cache (as for the clade version). That
+needs a cache they all share, e.g. memcached or the database cache: with
+the dummy or local-memory caches, the cached version is ignored and other
+processes keep their index until they restart.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from website.apps.core.models import Location
+
+LOCATION_VERSION_KEY = 'location-version'
+
+Point = namedtuple('Point', ['latitude', 'longitude'])
+
+# cache backends that aren't shared between processes.
+UNSHARED_CACHES = (DummyCache, LocMemCache)
+
+# (version, {isocode: Point}) as last loaded by this process, and the
+# number of times this process has changed the locations.
+_index = (None, {})
+_changes = 0
+_lock = threading.Lock()
+
+
+def get_location_version():
+    version = cache.get(LOCATION_VERSION_KEY)
+    if version is None:
+        # start from the time so that we never reuse an old version if the
+        # version key has been evicted.
+        version = int(time.time() * 1000)
+        cache.add(LOCATION_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_locations(**kwargs):
+    global _changes
+    with _lock:
+        _changes += 1
+    try:
+        cache.incr(LOCATION_VERSION_KEY)
+    except ValueError:  # not set.
+        get_location_version()
+
+
+def is_shared_cache():
+    """Returns True if the cache is shared between processes"""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], UNSHARED_CACHES)
+
+
+def load_locations():
+    """Returns {isocode: Point} for every location in the database"""
+    index = {}
+    # where an isocode has more than one location, the first one wins.
+    rows = Location.objects.order_by('pk').values_list('isocode', 'latitude', 'longitude')
+    for isocode, latitude, longitude in rows:
+        index.setdefault(isocode, Point(latitude, longitude))
+    return index
+
+
+def get_locations():
+    """Returns the index of {isocode: Point}, reloading it if it's stale"""
+    global _index
+    version = (_changes, get_location_version() if is_shared_cache() else None)
+    if _index[0] != version:
+        with _lock:
+            if _index[0] != version:
+                _index = (version, load_locations())
+    return _index[1]
+
+
+def get_location(isocode):
+    """Returns the Point for `isocode`, or None if it has no location"""
+    if not isocode:
+        return None
+    return get_locations().get(isocode)
@@ -2,16 +2,29 @@
 import os
 import re
 import sys
+import time
 from optparse import make_option
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import transaction
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from website.apps.core.bulk import bulk_import
+from website.apps.lexicon.models import Lexicon
+from website.apps.lexicon.loader import Loader, LoadError, read_table, read_cldf, BATCH_SIZE
 
 is_script = re.compile(r"""^[\d|x]{4}_.*\.py$""")
 
+# tabular files loaded by `Loader` rather than run, and how to read them.
+TABLES = {
+    '.tsv': read_table,
+    '.csv': read_table,
+    '.json': read_cldf,  # the metadata of a CLDF wordlist.
+}
+
 class Command(BaseCommand):
     args = '<filename ../path/to/file>'
-    help = 'Imports the given data file'
+    help = 'Imports the given data file (a script, or a TSV/CSV/CLDF wordlist)'
     output_transaction = True
     
     DATA_ROOT = os.path.join(os.path.split(settings.SITE_ROOT)[0], 'data')
@@ -24,6 +37,48 @@ class Command(BaseCommand):
             default=False,
             help='Run'
         )
+        parser.add_argument('--fast',
+            action='store_true',
+            dest='fast',
+            default=False,
+            help='Skip redirects, search indexing and versioning per row, '
+                 'and index and version the import as a whole afterwards'
+        )
+        parser.add_argument('--editor',
+            action='store',
+            dest='editor',
+            default=None,
+            help='Username to record a wordlist against'
+        )
+        parser.add_argument('--column',
+            action='append',
+            dest='column',
+            default=[],
+            metavar='TARGET=COLUMN',
+            help='Read a target (e.g. entry, language or language.isocode) '
+                 'from a differently named column of a wordlist'
+        )
+        parser.add_argument('--default',
+            action='append',
+            dest='default',
+            default=[],
+            metavar='TARGET=VALUE',
+            help='Value for a target that a row of a wordlist leaves empty '
+                 '(e.g. source=smith1991)'
+        )
+        parser.add_argument('--create',
+            action='store_true',
+            dest='create',
+            default=False,
+            help='Create languages, sources and words that don\'t exist'
+        )
+        parser.add_argument('--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of wordlist rows to add at a time (default: %d)' % BATCH_SIZE
+        )
     
     def list_datafiles(self):
         files = [_ for _ in os.listdir(self.DATA_ROOT)]
@@ -31,13 +86,65 @@ class Command(BaseCommand):
         for filename in sorted(files):
             print(" - {0}".format(os.path.join('data', filename)))
     
-    def load(self, filename, dryrun=True):
+    def _pairs(self, values, option):
+        pairs = {}
+        for value in values:
+            if '=' not in value:
+                raise CommandError('%s should be TARGET=VALUE, not %r' % (option, value))
+            target, value = value.split('=', 1)
+            pairs[target.strip()] = value.strip()
+        return pairs
+    
+    def _progress(self, count, rate):
+        self.stdout.write('Loaded %d rows (%d rows/s)\n' % (count, rate))
+    
+    def load_script(self, filename, fast=False):
         directory, module_name = os.path.split(filename)
         module_name = os.path.splitext(module_name)[0]
         sys.path.insert(0, directory)
         
-        with transaction.atomic():
+        if fast:
+            with bulk_import(u"Imported %s" % module_name) as batch:
+                __import__(module_name)
+            self.stdout.write('Imported %s\n' % batch.summary())
+        else:
             __import__(module_name)
+    
+    def load_table(self, filename, options):
+        if not options.get('editor'):
+            raise CommandError('Loading a wordlist needs an --editor')
+        editor = User.objects.get(username=options['editor'])
+        loader = Loader(
+            editor,
+            mapping=self._pairs(options.get('column') or [], '--column'),
+            defaults=self._pairs(options.get('default') or [], '--default'),
+            create=options.get('create', False),
+            batch_size=options.get('batch_size') or BATCH_SIZE,
+            progress=self._progress
+        )
+        rows = TABLES[os.path.splitext(filename)[1].lower()](filename)
+        start = time.time()
+        name = os.path.basename(filename)
+        try:
+            # the entries are indexed and versioned as a whole.
+            with bulk_import(u"Imported %s" % name, user=editor) as batch:
+                count = loader.load(rows)
+                batch.add(Lexicon, loader.added)
+        except LoadError as e:
+            raise CommandError(u"%s: %s" % (name, e))
+        seconds = time.time() - start
+        self.stdout.write('Loaded %d entries in %.1fs (%d rows/s)\n' % (
+            count, seconds, count / max(seconds, 0.001)
+        ))
+        for model, ids in sorted(loader.created.items(), key=lambda i: i[0].__name__):
+            self.stdout.write('Created %d %s\n' % (len(ids), model._meta.verbose_name_plural))
+    
+    def load(self, filename, dryrun=True, fast=False, **options):
+        with transaction.atomic():
+            if os.path.splitext(filename)[1].lower() in TABLES:
+                self.load_table(filename, options)
+            else:
+                self.load_script(filename, fast)
             if dryrun:
                 raise ValueError("No save -- Rollback") 
             else:
@@ -62,15 +169,16 @@ class Command(BaseCommand):
         
         filehead, fileext = os.path.splitext(options['filename'])
         
-        if fileext != '.py':
+        if fileext != '.py' and fileext.lower() not in TABLES:
             raise IOError('Unable to import a %s file' % fileext)
         
         self.stdout.write('Importing "%s"\n' % options['filename'])
         
+        filename = options.pop('filename')
         if 'run' in options and options['run']:
-            self.load(options['filename'], dryrun=False)
+            self.load(filename, dryrun=False, **options)
         else:
-            self.load(options['filename'], dryrun=True)
+            self.load(filename, dryrun=True, **options)
             sys.stdout.write(
                 "Dry-run complete. Use --run to save changes. Rolling back."
             )
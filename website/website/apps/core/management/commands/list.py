@@ -25,7 +25,7 @@ class Command(BaseCommand):
                 o.slug,
                 o.ljust(20),
                 ",".join([f.slug for f in o.family.all()]),
-                "%d" % o.lexicon_set.count(),
+                "%d" % o.lexicon_count,
                 o.classification
             ]))
     
@@ -47,7 +47,7 @@ class Command(BaseCommand):
                 o.slug,
                 o,
                 o.year,
-                '%d' % o.lexicon_set.count(),
+                '%d' % o.lexicon_count,
                 '%d' % o.cognate_set.count()
             ]))
     
@@ -57,7 +57,7 @@ class Command(BaseCommand):
             print("\t".join([
                 o.slug,
                 o,
-                '%d' % o.lexicon_set.count()
+                '%d' % o.lexicon_count
             ]))
      
     def handle(self, *args, **options):
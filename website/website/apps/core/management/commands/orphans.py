@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-from django.db.models import Count
 from django.core.management.base import BaseCommand
 
 from website.apps.core.models import Language, Source
@@ -18,24 +17,18 @@ class Command(BaseCommand):
         print("")
         
         print('Languages with zero entries:')
-        languages = Language.objects.annotate(count=Count('lexicon')).all()
-        for o in languages.order_by('slug'):
-            if o.count == 0:
-                print(" - %s" % o.slug)
+        for o in Language.objects.filter(lexicon_count=0).order_by('slug'):
+            print(" - %s" % o.slug)
         print("")
         
         print('Sources with zero entries:')
-        sources = Source.objects.annotate(count=Count('lexicon')).all()
-        for o in sources.order_by('slug'):
-            if o.count == 0:
-                print(" - %s" % o.slug)
+        for o in Source.objects.filter(lexicon_count=0).order_by('slug'):
+            print(" - %s" % o.slug)
         print("")
         
         print('Words with zero entries:')
-        words = Word.objects.annotate(count=Count('lexicon')).all()
-        for o in words.order_by('slug'):
-            if o.count == 0:
-                print(" - %s" % o.slug)
+        for o in Word.objects.filter(lexicon_count=0).order_by('slug'):
+            print(" - %s" % o.slug)
         print("")
         
         
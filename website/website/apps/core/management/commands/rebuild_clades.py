@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from website.apps.core.models import Clade
+
+
+class Command(BaseCommand):
+    args = ''
+    help = 'rebuilds the clade tree from the language classifications'
+    output_transaction = True
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Clade.objects.rebuild()
+        self.stdout.write("%d clades" % Clade.objects.count())
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from website.apps.core.models import NGRAM_FIELDS
+from website.apps.core.ngrams import rebuild_ngrams
+
+
+class Command(BaseCommand):
+    args = 'rebuild_ngrams [model label...]'
+    help = 'Rebuilds the n-gram search index (of all indexed models, or the given ones)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='model labels e.g. lexicon.lexicon')
+    
+    def handle(self, *args, **options):
+        labels = [label.lower() for label in args] or sorted(NGRAM_FIELDS)
+        for label in labels:
+            if label not in NGRAM_FIELDS:
+                raise CommandError("%s is not indexed" % label)
+            count = rebuild_ngrams(apps.get_model(label))
+            self.stdout.write("%s: indexed %d objects" % (label, count))
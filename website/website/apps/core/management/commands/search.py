@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
-from optparse import make_option
 from django.core.management.base import BaseCommand
 
-from website.apps.core.models import Language, Source
+from website.apps.core.models import Language, Source, NGRAM_FIELDS
+from website.apps.core.ngrams import search, normalize, MIN_QUERY_LENGTH
 
 try:
     from website.apps.lexicon.models import Lexicon, Word
@@ -11,68 +11,82 @@ except ImportError:
     Lexicon, Word = None, None
 
 
+def find(queryset, query):
+    """
+    Searches with the n-gram index, or scans the table for queries too
+    short for the index (which `search` doesn't match at all).
+    """
+    if len(normalize(query)) < MIN_QUERY_LENGTH:
+        field = NGRAM_FIELDS[queryset.model._meta.label_lower]
+        return queryset.filter(**{'%s__icontains' % field: query})
+    return search(queryset, query)
+
+
 class Command(BaseCommand):
     args = 'search language/source/word/lexicon query'
     help = 'Searches Database'
     output_transaction = True
     
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*')
+    
     def search_isocodes(self, query):
         for i in Language.objects.select_related().filter(isocode__iexact="%s" % query):
-            print " ".join([
+            self.stdout.write(u" ".join([
                 '%d' % i.id,
                 i.language.ljust(20),
                 i.isocode.ljust(20), 
-                i.classification
-            ])
+                i.classification or ''
+            ]))
     
     def search_languages(self, query):
-        for i in Language.objects.select_related().filter(language__icontains="%s" % query, isocode__iexact="%s" % query):
-            print " ".join([
+        for i in find(Language.objects.all(), query):
+            self.stdout.write(u" ".join([
                 '%d' % i.id,
-                i.ljust(20),
+                i.language.ljust(20),
                 i.slug.ljust(20),
-                i.isocode.ljust(20),
-                i.classification
-            ]) 
+                (i.isocode or '').ljust(20),
+                i.classification or ''
+            ]))
     
     def search_sources(self, query):
         for i in Source.objects.select_related().filter(author__icontains="%s" % query):
-            print " ".join([
+            self.stdout.write(u" ".join([
                 '%d' % i.id,
                 i.author.ljust(20),
-                '%d' % i.year,
+                '%s' % i.year,
                 i.slug.ljust(20),
-                i.reference
-            ]) 
+                i.reference or ''
+            ]))
     
     def search_lexicon(self, query):
         if Lexicon is None:
             raise NotImplementedError("website.apps.lexicon not installed")
-        for i in Lexicon.objects.select_related().filter(entry__icontains="%s" % query):
-            print " ".join([
+        for i in find(Lexicon.objects.select_related().order_by('id'), query):
+            self.stdout.write(u" ".join([
                 '%d' % i.id,
-                str(i.language).ljust(20),
-                str(i.source).ljust(20),
-                str(i.word).ljust(10),
+                i.language.slug.ljust(20),
+                i.source.slug.ljust(20),
+                i.word.slug.ljust(10),
                 i.entry
-            ])
+            ]))
     
     def search_words(self, query):
         if Word is None:
             raise NotImplementedError("website.apps.lexicon not installed")
-        for i in Word.objects.select_related().filter(word__icontains="%s" % query):
-            print " ".join([
+        for i in find(Word.objects.all(), query):
+            self.stdout.write(u" ".join([
                 '%d' % i.id,
-                i.ljust(20),
+                i.word.ljust(20),
                 i.slug.ljust(20),
-            ])
+            ]))
             
     def handle(self, *args, **options):
         try:
             what, query = args
         except ValueError:
-            print self.args
-            quit()
+            self.stdout.write(self.args)
+            return
         
         if what in ('languages', 'language', 'lang', 'l'):
             self.search_languages(query)
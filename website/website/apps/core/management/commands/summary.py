@@ -24,17 +24,17 @@ class Command(BaseCommand):
                 fam = o.family.all()[0].slug
             except IndexError:
                 fam = "-"
-            print("\t".join([o.slug, fam, '%d' % o.lexicon_set.count()]))
+            print("\t".join([o.slug, fam, '%d' % o.lexicon_count]))
         print("\n")
         
         print("# Sources:")
         for o in Source.objects.all():
-            print("\t".join([o.slug, '%d' % o.lexicon_set.count()]))
+            print("\t".join([o.slug, '%d' % o.lexicon_count]))
         print("\n")
         
         print("# Words:")
         for o in Word.objects.all():
-            print("\t".join([o.slug, '%d' % o.lexicon_set.count()]))
+            print("\t".join([o.slug, '%d' % o.lexicon_count]))
         print("\n")
         
         print("# Statistics:")
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Merging of duplicate Words, Languages and Sources.
+
+Every row that refers to the object being removed (including many-to-many
+memberships) is re-pointed at the object it is merged into with one UPDATE
+per relation, so the cost doesn't depend on how much data is attached.
+
+Rows that are worked out from others (the clade tree, cognate suggestions
+and alignments) aren't moved: they go with the deleted object, and are
+redone for the object it was merged into.
+"""
+from django.db.models import Q
+from reversion import revisions as reversion
+
+from website.signals import add_redirect
+from website.apps.core.models import Language, update_clades, remove_empty_clades
+
+# number of moved rows to load at a time when adding them to the revision.
+BATCH_SIZE = 500
+
+# the models of the derived rows, which are left out of the merge.
+DERIVED = (
+    'core.clade_languages',
+    'cognacy.cognatesuggestion',
+    'cognacy.suggestedword',
+    'lexicon.alignment',
+    'lexicon.alignmentqueue',
+)
+
+
+def get_relations(model):
+    """
+    Returns the foreign keys (and one-to-one fields) on other models that
+    point to `model`, including those on many-to-many through tables, but
+    not those of derived rows.
+    """
+    return [
+        f.field for f in model._meta.get_fields(include_hidden=True)
+        if (f.one_to_many or f.one_to_one) and f.auto_created and not f.concrete
+        and f.related_model._meta.label_lower not in DERIVED
+    ]
+
+
+def get_dependents(obj):
+    """Returns a list of (foreign key, queryset of rows) that refer to `obj`"""
+    return [
+        (field, field.model._base_manager.filter(**{field.name: obj}))
+        for field in get_relations(obj.__class__)
+    ]
+
+
+def _remove_clashes(field, rows, target):
+    # drop the rows that would break a unique constraint once moved, i.e.
+    # where `target` already has a row with the same values.
+    groups = [g for g in field.model._meta.unique_together if field.name in g]
+    if field.unique:
+        groups.append((field.name,))
+    for group in groups:
+        others = [n for n in group if n != field.name]
+        existing = field.model._base_manager.filter(**{field.name: target})
+        if not others:
+            if existing.exists():
+                rows.delete()
+            continue
+        clashes = Q()
+        for values in existing.values_list(*others):
+            clashes |= Q(**dict(zip(others, values)))
+        if clashes:
+            rows.filter(clashes).delete()
+
+
+def merge_objects(target, source, editor=None):
+    """
+    Merges `source` into `target` (two objects of the same model) and
+    deletes `source`, adding a redirect from its url to `target`'s.
+
+    This happens in one transaction (the revision's) and is recorded as
+    one revision.
+    Returns a list of (model, field name, number of rows moved).
+    """
+    assert target.__class__ == source.__class__, "Can only merge objects of the same type"
+    assert target.pk != source.pk, "Can't merge an object into itself"
+    moved = []
+    with reversion.create_revision():
+        reversion.set_user(editor)
+        reversion.set_comment("Merged %s into %s" % (source, target))
+        reversion.add_to_revision(target)
+        for field, rows in get_dependents(source):
+            _remove_clashes(field, rows, target)
+            ids = []
+            if reversion.is_registered(field.model):
+                ids = list(rows.values_list('pk', flat=True))
+            count = rows.update(**{field.name: target})
+            # updates don't send post_save, so record the moved rows ourselves.
+            for i in range(0, len(ids), BATCH_SIZE):
+                for obj in field.model._base_manager.filter(pk__in=ids[i:i + BATCH_SIZE]):
+                    reversion.add_to_revision(obj)
+            moved.append((field.model, field.name, count))
+
+        old_path, new_path = source.get_absolute_url(), target.get_absolute_url()
+        reversion.add_to_revision(source)
+        source.delete()
+        add_redirect(old_path, new_path)
+
+        if isinstance(target, Language):
+            # the clades of the source went with it.
+            update_clades(Language, target)
+            remove_empty_clades()
+    return moved
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_clades(apps, schema_editor):
+    Language = apps.get_model("core", "Language")
+    Clade = apps.get_model("core", "Clade")
+    Membership = Clade.languages.through
+    clades, members = {}, []
+    for lang_id, classification in Language.objects.values_list('id', 'classification'):
+        parent, sub = None, []
+        for clade in (classification or '').split(','):
+            clade = clade.strip()
+            if not clade:
+                continue
+            sub.append(clade)
+            path = ", ".join(sub)
+            if len(path) > 255:
+                break
+            if path not in clades:
+                clades[path] = Clade.objects.create(
+                    parent=parent, name=clade, path=path, depth=len(sub)
+                )
+            parent = clades[path]
+            members.append(Membership(language_id=lang_id, clade_id=parent.id))
+    Membership.objects.bulk_create(members, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_glottolog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Clade',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Clade Name', max_length=255)),
+                ('path', models.CharField(help_text='Full Classification of Clade', max_length=255, unique=True)),
+                ('depth', models.PositiveSmallIntegerField(db_index=True, help_text='Depth of Clade in Classification')),
+                ('languages', models.ManyToManyField(blank=True, db_table='language_clades', related_name='clades', to='core.Language')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='core.Clade')),
+            ],
+            options={
+                'ordering': ['path'],
+                'db_table': 'clades',
+            },
+        ),
+        migrations.RunPython(build_clades, migrations.RunPython.noop),
+    ]
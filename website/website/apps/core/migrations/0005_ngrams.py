@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:38
+from __future__ import unicode_literals
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def get_ngrams(text):
+    text = unicodedata.normalize('NFC', text or u'').lower()
+    return set([text[i:i + n] for n in (2, 3) for i in range(0, len(text) - n + 1)])
+
+
+def build_ngrams(apps, schema_editor):
+    NGram = apps.get_model("core", "NGram")
+    for label, field in [('core.language', 'language')]:
+        model = apps.get_model(*label.split('.'))
+        chunk = []
+        for pk, text in model.objects.values_list('pk', field).iterator():
+            chunk.extend([NGram(model=label, object_id=pk, gram=g) for g in get_ngrams(text)])
+            if len(chunk) > 5000:
+                NGram.objects.bulk_create(chunk, batch_size=500)
+                chunk = []
+        NGram.objects.bulk_create(chunk, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_clades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NGram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Label of the indexed model', max_length=32)),
+                ('object_id', models.IntegerField(help_text='Id of the indexed object')),
+                ('gram', models.CharField(max_length=3)),
+            ],
+            options={
+                'db_table': 'ngrams',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='ngram',
+            unique_together=set([('gram', 'model', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='ngram',
+            index_together=set([('model', 'object_id')]),
+        ),
+        migrations.RunPython(build_ngrams, migrations.RunPython.noop),
+    ]
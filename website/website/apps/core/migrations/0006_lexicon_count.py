@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ngrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='language',
+            name='lexicon_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, help_text='Number of lexical entries'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='lexicon_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, help_text='Number of lexical entries'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+import time
+
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from website.signals import create_redirect
@@ -41,9 +44,31 @@ class TrackedModel(models.Model):
         get_latest_by = 'added'
 
 
+class CountedModel(TrackedModel):
+    """
+    Abstract base class for models that keep a count of their lexical
+    entries (see `website.apps.lexicon.counts`).
+    """
+    lexicon_count = models.IntegerField(default=0, editable=False, db_index=True,
+        help_text="Number of lexical entries")
+    
+    def save(self, *args, **kwargs):
+        # don't overwrite the count with the one we loaded, as it may have
+        # changed since.
+        if not self._state.adding and not kwargs.get('update_fields'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'lexicon_count'
+            ]
+        super(CountedModel, self).save(*args, **kwargs)
+    
+    class Meta(TrackedModel.Meta):
+        abstract = True
+
+
 @python_2_unicode_compatible
 @reversion.register
-class Source(TrackedModel):
+class Source(CountedModel):
     """Source Details"""
     year = models.CharField(max_length=12, 
         blank=True, null=True, db_index=True,
@@ -112,7 +137,7 @@ class Family(TrackedModel):
 
 @python_2_unicode_compatible
 @reversion.register
-class Language(TrackedModel):
+class Language(CountedModel):
     """Stores language information"""
     family = models.ManyToManyField(Family, blank=True)
     language = models.CharField(max_length=64, db_index=True,
@@ -148,6 +173,72 @@ class Language(TrackedModel):
         ordering = ['language', 'dialect']
 
 
+def get_clade_paths(classification):
+    """
+    Returns the clade paths contained in a classification string, e.g.
+    "Austronesian, Malayo-Polynesian" -> ["Austronesian", "Austronesian, Malayo-Polynesian"]
+    """
+    paths, sub = [], []
+    for clade in (classification or '').split(','):
+        clade = clade.strip()
+        if clade:
+            sub.append(clade)
+            paths.append(", ".join(sub))
+    return paths
+
+
+class CladeManager(models.Manager):
+    def languages(self, clade):
+        """
+        Returns the languages in `clade`.
+
+        Known clades are an indexed lookup on the clade tree, anything else
+        (e.g. a partial clade name) falls back to a prefix match on the
+        classification string.
+        """
+        clade = ", ".join(get_clade_paths(clade)[-1:])
+        if self.filter(path=clade).exists():
+            return Language.objects.filter(clades__path=clade)
+        return Language.objects.filter(classification__startswith=clade)
+    
+    def rebuild(self):
+        """Rebuilds the clade tree from scratch"""
+        self.all().delete()
+        for language in Language.objects.all():
+            update_clades(Language, language)
+
+
+@python_2_unicode_compatible
+class Clade(models.Model):
+    """
+    Materialized clade hierarchy built from `Language.classification`.
+    
+    Each clade stores its full path (e.g. "Austronesian, Malayo-Polynesian"),
+    and is linked to every language below it so that clade queries are a
+    join on an index rather than a scan of the classification strings.
+    This is kept up to date by `update_clades` when languages are saved.
+    """
+    parent = models.ForeignKey('self', blank=True, null=True,
+        related_name='children')
+    name = models.CharField(max_length=255,
+        help_text="Clade Name")
+    path = models.CharField(max_length=255, unique=True,
+        help_text="Full Classification of Clade")
+    depth = models.PositiveSmallIntegerField(db_index=True,
+        help_text="Depth of Clade in Classification")
+    languages = models.ManyToManyField(Language, blank=True,
+        related_name='clades', db_table='language_clades')
+    
+    objects = CladeManager()
+    
+    def __str__(self):
+        return six.text_type(self.path)
+    
+    class Meta:
+        db_table = 'clades'
+        ordering = ['path', ]
+
+
 @python_2_unicode_compatible
 @reversion.register
 class AlternateName(TrackedModel):
@@ -234,12 +325,120 @@ class PopulationSize(TrackedModel):
         db_table = 'popsize'
 
 
+class NGram(models.Model):
+    """
+    Character n-gram index for substring searches.
+    See `website.apps.core.ngrams`.
+    """
+    model = models.CharField(max_length=32, help_text="Label of the indexed model")
+    object_id = models.IntegerField(help_text="Id of the indexed object")
+    gram = models.CharField(max_length=3)
+    
+    class Meta:
+        unique_together = ("gram", "model", "object_id")
+        index_together = [
+            ["model", "object_id"],
+        ]
+        db_table = 'ngrams'
+
+
 # pre-save adding of redirects when slug field altered.
 pre_save.connect(create_redirect, sender=Source, dispatch_uid="source:001")
 pre_save.connect(create_redirect, sender=Family, dispatch_uid="family:001")
 pre_save.connect(create_redirect, sender=Language, dispatch_uid="language:001")
 
 
+def update_clades(sender, instance, **kwargs):
+    """Updates the clade tree with the classification of `instance`"""
+    # paths too long to index are left to the classification string.
+    paths = [p for p in get_clade_paths(instance.classification) if len(p) <= 255]
+    clades = dict([(c.path, c) for c in Clade.objects.filter(path__in=paths)])
+    parent = None
+    for depth, path in enumerate(paths, 1):
+        if path not in clades:
+            clades[path], _ = Clade.objects.get_or_create(path=path, defaults={
+                'parent': parent, 'name': path.split(', ')[-1], 'depth': depth
+            })
+        parent = clades[path]
+    
+    current = set(instance.clades.values_list('id', flat=True))
+    if current != set([c.id for c in clades.values()]):
+        instance.clades.set(clades.values())
+        remove_empty_clades()
+
+
+def remove_empty_clades(**kwargs):
+    Clade.objects.filter(languages__isnull=True).delete()
+
+
+post_save.connect(update_clades, sender=Language, dispatch_uid="language:clades")
+post_delete.connect(remove_empty_clades, sender=Language, dispatch_uid="language:clades")
+
+
+# Anything derived from the set of languages and their clades (e.g. the
+# cognacy clade choices) is cached under the current clade version, which
+# is bumped whenever languages change.
+CLADE_VERSION_KEY = 'clade-version'
+
+def get_clade_version():
+    version = cache.get(CLADE_VERSION_KEY)
+    if version is None:
+        # start from the time so that we never reuse an old version if the
+        # version key has been evicted.
+        version = int(time.time() * 1000)
+        cache.add(CLADE_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_clades(**kwargs):
+    try:
+        cache.incr(CLADE_VERSION_KEY)
+    except ValueError:  # not set.
+        get_clade_version()
+
+
+post_save.connect(invalidate_clades, sender=Language, dispatch_uid="language:clade-version")
+post_delete.connect(invalidate_clades, sender=Language, dispatch_uid="language:clade-version")
+m2m_changed.connect(invalidate_clades, sender=Language.family.through, dispatch_uid="language:clade-version")
+m2m_changed.connect(invalidate_clades, sender=Clade.languages.through, dispatch_uid="clade:clade-version")
+
+
+# the location index (see website.apps.core.locations) is reloaded by every
+# process when the location version changes.
+def invalidate_location_index(**kwargs):
+    from website.apps.core.locations import invalidate_locations
+    invalidate_locations()
+
+
+post_save.connect(invalidate_location_index, sender=Location, dispatch_uid="location:version")
+post_delete.connect(invalidate_location_index, sender=Location, dispatch_uid="location:version")
+
+
+# the n-gram index: {model label: indexed field}.
+NGRAM_FIELDS = {}
+
+def index_ngrams(sender, instance, **kwargs):
+    from website.apps.core.ngrams import index_objects
+    field = NGRAM_FIELDS[sender._meta.label_lower]
+    index_objects(sender, [(instance.pk, getattr(instance, field))])
+
+
+def unindex_ngrams(sender, instance, **kwargs):
+    from website.apps.core.ngrams import unindex_objects
+    unindex_objects(sender, [instance.pk])
+
+
+def register_ngrams(model, field):
+    """Keeps `field` of `model` in the n-gram index"""
+    NGRAM_FIELDS[model._meta.label_lower] = field
+    uid = "%s:ngrams" % model._meta.label_lower
+    post_save.connect(index_ngrams, sender=model, dispatch_uid=uid)
+    post_delete.connect(unindex_ngrams, sender=model, dispatch_uid=uid)
+
+
+register_ngrams(Language, 'language')
+
+
 watson.register(Language, 
     fields=('family', 'language', 'dialect', 'isocode', 'classification', 'information')
 )
@@ -258,3 +457,45 @@ statistic.register("Number of Locations", Location)
 statistic.register("Number of Links", Link)
 statistic.register("Number of Files", Attachment)
 
+
+# Language dossiers (see website.apps.core.dossier) are deleted whenever
+# anything in them changes.
+def invalidate_language(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    slugs = [instance.slug]
+    if instance.pk is not None:
+        # the dossier could still be cached under the old slug.
+        slugs.extend(sender.objects.filter(pk=instance.pk).values_list('slug', flat=True))
+    invalidate_dossiers(slugs=set(slugs))
+
+
+def invalidate_language_of(sender, instance, **kwargs):
+    """Invalidates the dossier of the language of `instance`"""
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers([instance.language_id])
+
+
+def invalidate_location(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers(Language.objects.filter(isocode=instance.isocode))
+
+
+def invalidate_source(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers(Language.objects.filter(
+        models.Q(lexicon__source=instance) | models.Q(attachment__source=instance)
+    ).distinct())
+
+
+pre_save.connect(invalidate_language, sender=Language, dispatch_uid="language:dossier")
+post_save.connect(invalidate_language, sender=Language, dispatch_uid="language:dossier")
+post_delete.connect(invalidate_language, sender=Language, dispatch_uid="language:dossier")
+post_save.connect(invalidate_language_of, sender=AlternateName, dispatch_uid="language:dossier")
+post_delete.connect(invalidate_language_of, sender=AlternateName, dispatch_uid="language:dossier")
+post_save.connect(invalidate_language_of, sender=Link, dispatch_uid="language:dossier")
+post_delete.connect(invalidate_language_of, sender=Link, dispatch_uid="language:dossier")
+post_save.connect(invalidate_language_of, sender=Attachment, dispatch_uid="language:dossier")
+post_delete.connect(invalidate_language_of, sender=Attachment, dispatch_uid="language:dossier")
+post_save.connect(invalidate_location, sender=Location, dispatch_uid="language:dossier")
+post_delete.connect(invalidate_location, sender=Location, dispatch_uid="language:dossier")
+post_save.connect(invalidate_source, sender=Source, dispatch_uid="language:dossier")
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Character n-gram index for substring searches.
+
+The bigrams and trigrams of the indexed field of each registered model
+(see `register_ngrams` in `website.apps.core.models`) are kept in `NGram`,
+so a substring search only has to look at the objects that contain all of
+the query's n-grams rather than scanning the whole table. Saving or
+deleting an object updates the index, and code that changes indexed fields
+in bulk calls `index_objects` itself. `rebuild_ngrams` reindexes
+everything.
+"""
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.encoding import force_text
+
+from website.apps.core.models import NGram, NGRAM_FIELDS
+
+# n-gram lengths to index. Queries shorter than the shortest can't use the
+# index, and match nothing rather than scanning the whole table.
+NGRAM_SIZES = (2, 3)
+MIN_QUERY_LENGTH = min(NGRAM_SIZES)
+
+# number of objects to (re)index at a time.
+CHUNK_SIZE = 500
+
+
+def normalize(text):
+    """Returns the form of `text` that is indexed and searched"""
+    return unicodedata.normalize('NFC', force_text(text or '')).lower()
+
+
+def get_ngrams(text):
+    """Returns the set of n-grams in `text`"""
+    text = normalize(text)
+    return set([
+        text[i:i + n] for n in NGRAM_SIZES for i in range(0, len(text) - n + 1)
+    ])
+
+
+def get_query_ngrams(query):
+    """
+    Returns the n-grams an object must contain to match `query`, or None if
+    the query is too short to use the index.
+    """
+    query = normalize(query)
+    n = max([size for size in NGRAM_SIZES if size <= len(query)] + [0])
+    if not n:
+        return None
+    return set([query[i:i + n] for i in range(0, len(query) - n + 1)])
+
+
+def index_objects(model, rows):
+    """
+    Updates the index for a list of (object id, text) of `model`, adding
+    and removing only the n-grams that have changed.
+    """
+    label = model._meta.label_lower
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = dict([(pk, get_ngrams(text)) for (pk, text) in rows[i:i + CHUNK_SIZE]])
+        current = dict([(pk, set()) for pk in chunk])
+        for pk, gram in NGram.objects.filter(
+            model=label, object_id__in=list(chunk)
+        ).values_list('object_id', 'gram'):
+            current[pk].add(gram)
+        with transaction.atomic():
+            for pk, grams in chunk.items():
+                removed = current[pk] - grams
+                if removed:
+                    NGram.objects.filter(
+                        model=label, object_id=pk, gram__in=removed
+                    ).delete()
+            NGram.objects.bulk_create([
+                NGram(model=label, object_id=pk, gram=gram)
+                for (pk, grams) in chunk.items() for gram in grams - current[pk]
+            ])
+
+
+def unindex_objects(model, ids):
+    """Removes the objects of `model` with the given ids from the index"""
+    label = model._meta.label_lower
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        NGram.objects.filter(model=label, object_id__in=ids[i:i + CHUNK_SIZE]).delete()
+
+
+def rebuild_ngrams(model, chunk_size=CHUNK_SIZE):
+    """Reindexes all objects of `model`. Returns the number of objects indexed"""
+    label = model._meta.label_lower
+    rows = model.objects.order_by('pk').values_list('pk', NGRAM_FIELDS[label])
+    count = 0
+    with transaction.atomic():
+        NGram.objects.filter(model=label).delete()
+        chunk = []
+        for pk, text in rows.iterator():
+            chunk.extend([NGram(model=label, object_id=pk, gram=g) for g in get_ngrams(text)])
+            count += 1
+            if count % chunk_size == 0:
+                NGram.objects.bulk_create(chunk)
+                chunk = []
+        NGram.objects.bulk_create(chunk)
+    return count
+
+
+def search(queryset, query):
+    """
+    Returns a queryset of the objects in `queryset` whose indexed field
+    contains `query` (ignoring case), or none of them if the query is
+    shorter than `MIN_QUERY_LENGTH`.
+
+    The n-grams can all be there without being in the right order, so the
+    candidates are checked with `icontains` too. Not every database ignores
+    the case of non-ASCII letters there (SQLite doesn't), so we also look
+    for the query as it's indexed.
+    """
+    label = queryset.model._meta.label_lower
+    field = NGRAM_FIELDS[label]
+    grams = get_query_ngrams(query)
+    if grams is None:
+        return queryset.none()
+
+    candidates = NGram.objects.filter(model=label, gram__in=grams)
+    candidates = candidates.values('object_id').annotate(n=Count('gram')).filter(n=len(grams))
+    lookup = '%s__icontains' % field
+    return queryset.filter(pk__in=candidates.values('object_id')).filter(
+        Q(**{lookup: query}) | Q(**{lookup: normalize(query)})
+    )
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Keyset (cursor) pagination.
+
+Rather than counting and skipping rows with OFFSET, a keyset page asks for
+the rows that sort after (or before) the last row seen, using the values
+of the ordering columns of that row -- so every page costs the same as the
+first one. The values are encoded in a cursor that goes in the URL.
+
+The ordering is resolved down to concrete columns (related models are
+ordered by their own `Meta.ordering`) and always ends with the primary key
+so that no two rows compare equal.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import six
+from django.utils.encoding import force_bytes, force_text
+
+NEXT, PREVIOUS = 'n', 'p'
+
+# the types of value a cursor can hold.
+SCALARS = six.string_types + six.integer_types + (float, bool, type(None))
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def _expand(model, name, descending=False):
+    """
+    Returns a list of (path, descending) for the ordering term `name` on
+    `model`, following relations to the ordering of the related model.
+    """
+    if name.startswith('-'):
+        name, descending = name[1:], not descending
+    if name == 'pk':
+        return [(name, descending)]
+
+    opts, field = model._meta, None
+    for part in name.split(LOOKUP_SEP):
+        if field is not None:
+            if not field.is_relation:
+                raise ValueError("Can't order by %s" % name)
+            opts = field.related_model._meta
+        field = opts.get_field(part)
+
+    if not field.is_relation or part == field.attname != field.name:
+        return [(name, descending)]
+
+    keys = []
+    for term in field.related_model._meta.ordering or ['pk']:
+        for path, desc in _expand(field.related_model, term, descending):
+            keys.append((name + LOOKUP_SEP + path, desc))
+    return keys
+
+
+def get_keys(queryset):
+    """
+    Returns the ordering of `queryset` as a list of (path, descending),
+    ending with the primary key.
+    """
+    query = queryset.query
+    if query.extra_order_by:
+        ordering = query.extra_order_by
+    elif query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = query.get_meta().ordering
+    else:
+        ordering = []
+
+    keys = []
+    for term in ordering:
+        if not hasattr(term, 'startswith') or term == '?':
+            raise ValueError("Can't paginate by %r" % term)
+        for key in _expand(queryset.model, term):
+            if key[0] not in [k[0] for k in keys]:
+                keys.append(key)
+    if not [path for (path, desc) in keys if path in ('pk', queryset.model._meta.pk.name)]:
+        keys.append(('pk', False))
+    return keys
+
+
+def get_value(record, path):
+    """Returns the value of `path` (e.g. 'language__slug') on a record"""
+    for attr in path.split(LOOKUP_SEP):
+        if record is None:
+            break
+        record = getattr(record, attr)
+    return record
+
+
+def _follows(path, descending, value, nulls_largest):
+    # rows that sort strictly after `value` in this column, or None.
+    ascending = not descending
+    if value is None:
+        if nulls_largest == ascending:  # nothing comes after a NULL
+            return None
+        return Q(**{path + '__isnull': False})
+    q = Q(**{path + ('__gt' if ascending else '__lt'): value})
+    if nulls_largest == ascending:
+        q |= Q(**{path + '__isnull': True})
+    return q
+
+
+def _equals(path, value):
+    if value is None:
+        return Q(**{path + '__isnull': True})
+    return Q(**{path: value})
+
+
+def get_condition(keys, values, nulls_largest=False):
+    """
+    Returns a Q object for the rows that come after `values` when ordered by
+    `keys` (from `get_keys`).
+    """
+    condition = None
+    for i, (path, descending) in enumerate(keys):
+        q = _follows(path, descending, values[i], nulls_largest)
+        if q is None:
+            continue
+        for (p, d), v in zip(keys[:i], values[:i]):
+            q &= _equals(p, v)
+        condition = q if condition is None else condition | q
+    return condition if condition is not None else Q(pk__in=[])
+
+
+class KeysetPage(object):
+    """
+    A page of records, with the cursors for the pages either side of it.
+    `object_list` can be replaced (e.g. by table rows), `records` stays.
+    """
+    def __init__(self, records, paginator, has_previous=False, has_next=False):
+        self.records = self.object_list = records
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return '<Keyset page of %d>' % len(self.records)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.records:
+            return self.paginator.get_cursor(self.records[0], PREVIOUS)
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.records:
+            return self.paginator.get_cursor(self.records[-1], NEXT)
+
+
+class KeysetPaginator(object):
+    """
+    Paginates a queryset by keyset. The queryset is reordered by its
+    resolved keys (see `get_keys`).
+
+    `count` is only used for display, and is never worked out here -- pass
+    it in if it's known (e.g. from `lexicon_count`), or leave it as None.
+    """
+    def __init__(self, queryset, per_page, count=None):
+        self.keys = get_keys(queryset)
+        self.queryset = queryset.order_by(*self._ordering(self.keys))
+        self.per_page = int(per_page)
+        self.count = count
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        self.checksum = hashlib.md5(
+            force_bytes(u",".join(self._ordering(self.keys)))
+        ).hexdigest()[:8]
+
+    @staticmethod
+    def _ordering(keys):
+        return [('-' if desc else '') + path for (path, desc) in keys]
+
+    def get_cursor(self, record, direction=NEXT):
+        """Returns the cursor for the page after (or before) `record`"""
+        payload = [direction, self.checksum, [get_value(record, p) for (p, d) in self.keys]]
+        payload = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return force_text(base64.urlsafe_b64encode(force_bytes(payload))).rstrip('=')
+
+    def read_cursor(self, cursor):
+        """Returns the (direction, values) in `cursor`"""
+        try:
+            cursor = force_bytes(cursor)
+            payload = base64.urlsafe_b64decode(cursor + b'=' * (-len(cursor) % 4))
+            direction, checksum, values = json.loads(force_text(payload))
+        except (TypeError, ValueError, UnicodeError):
+            raise InvalidCursor("Invalid cursor")
+        if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+            raise InvalidCursor("Invalid cursor")
+        if not all([isinstance(v, SCALARS) for v in values]):
+            raise InvalidCursor("Invalid cursor")
+        if checksum != self.checksum or len(values) != len(self.keys):
+            raise InvalidCursor("Cursor is for a different ordering")
+        return direction, values
+
+    def page(self, cursor=None):
+        """
+        Returns the KeysetPage following (or preceding) `cursor`, or the
+        first page if there's no cursor.
+        """
+        if not cursor:
+            records = list(self.queryset[:self.per_page + 1])
+            return KeysetPage(
+                records[:self.per_page], self, has_next=len(records) > self.per_page
+            )
+
+        direction, values = self.read_cursor(cursor)
+        if direction == NEXT:
+            keys, queryset = self.keys, self.queryset
+        else:
+            keys = [(path, not desc) for (path, desc) in self.keys]
+            queryset = self.queryset.order_by(*self._ordering(keys))
+
+        try:
+            queryset = queryset.filter(get_condition(keys, values, self.nulls_largest))
+            records = list(queryset[:self.per_page + 1])
+        except (TypeError, ValueError, ValidationError):  # values of the wrong type
+            raise InvalidCursor("Invalid cursor")
+        if not records:
+            raise EmptyPage("That page contains no results")
+        more = len(records) > self.per_page
+        records = records[:self.per_page]
+        if direction == NEXT:
+            return KeysetPage(records, self, has_previous=True, has_next=more)
+        return KeysetPage(records[::-1], self, has_previous=more, has_next=True)
@@ -1,9 +1,11 @@
 from django.utils.safestring import mark_safe
 import django_tables2 as tables
+from django_tables2.rows import BoundRows
 from django_tables2.utils import A  # alias for Accessor
 from django.template.loader import render_to_string
 
 from website.apps.core.models import Source, Language, Family
+from website.apps.core.pagination import KeysetPaginator
 from website.apps.core.templatetags.website_tags import condense_classification
 
 # Note, due to the current version of django_tables2 not merging in Meta classes
@@ -34,19 +36,48 @@ class DataTable(tables.Table):
         }
     
 
+class KeysetMixin(object):
+    """
+    Mixin for tables of querysets to paginate by keyset rather than by page
+    number (see `website.apps.core.pagination`). Render these tables with
+    "keyset_table.html".
+    """
+    cursor_field = 'cursor'
+    
+    @property
+    def prefixed_cursor_field(self):
+        return u'%s%s' % (self.prefix, self.cursor_field)
+    
+    def paginate_keyset(self, cursor=None, per_page=None, count=None):
+        """
+        Paginates the table starting after (or before) `cursor`, which is
+        usually `request.GET.get(table.prefixed_cursor_field)`. `count` is the
+        total number of rows, if it's known, for display.
+        
+        Raises `InvalidCursor` or `EmptyPage` for bad cursors.
+        """
+        self.paginator = KeysetPaginator(
+            self.data.data, per_page or self._meta.per_page, count
+        )
+        self.page = self.paginator.page(cursor)
+        self.page.object_list = BoundRows(
+            self.page.object_list, self, pinned_data=self.pinned_data
+        )
+    
+
 class SourceIndexTable(DataTable):
     """Source Listing"""
     author = tables.LinkColumn('source-detail', args=[A('slug')])
     year = tables.LinkColumn('source-detail', args=[A('slug')])
     reference = tables.LinkColumn('source-detail', args=[A('slug')])
-    count = tables.LinkColumn('source-detail', args=[A('slug')])
+    count = tables.LinkColumn('source-detail', args=[A('slug')], accessor='lexicon_count')
     
     class Meta(DataTable.Meta):
         model = Source
         #order_by = ('author', 'year',)
         order_by = 'author'
         sequence = ('author', 'year', 'reference', 'count')
-        exclude = ('id', 'editor', 'added', 'slug', 'comment', 'bibtex')
+        exclude = ('id', 'editor', 'added', 'slug', 'comment', 'bibtex', 'lexicon_count')
     Meta.attrs['summary'] = 'Table of Sources'
     
 
@@ -55,7 +86,7 @@ class LanguageIndexTable(DataTable):
     isocode = tables.LinkColumn('language-detail', args=[A('slug')])
     language = tables.LinkColumn('language-detail', args=[A('slug')])
     classification = tables.Column()
-    count = tables.LinkColumn('language-detail', args=[A('slug')])
+    count = tables.LinkColumn('language-detail', args=[A('slug')], accessor='lexicon_count')
     
     def render_language(self, record):
         col = tables.LinkColumn('language-detail', args=[record.slug])
@@ -70,7 +101,7 @@ class LanguageIndexTable(DataTable):
         model = Language
         order_by = 'language' # default sorting
         sequence = ('isocode', 'language', 'classification', 'count')
-        exclude = ('id', 'editor', 'added', 'slug', 'information', 'dialect')
+        exclude = ('id', 'editor', 'added', 'slug', 'information', 'dialect', 'lexicon_count')
     Meta.attrs['summary'] = 'Table of Languages'
 
 
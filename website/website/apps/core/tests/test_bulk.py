@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from django.contrib.auth.models import User
+from django.contrib.redirects.models import Redirect
+from django.test import TestCase
+
+from reversion import revisions as reversion
+from reversion.models import Revision, Version
+from watson import search as watson
+from watson.models import SearchEntry
+
+from website.apps.core.models import Language, Source
+from website.apps.core.bulk import bulk_import, create_objects
+from website.apps.statistics.models import StatisticalValue
+
+
+class Test_BulkImport(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.source = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', reference='S2',
+            editor=cls.editor
+        )
+
+    def create(self, name):
+        return Language.objects.create(language=name, slug=name.lower(), editor=self.editor)
+
+    def entries(self, obj):
+        return SearchEntry.objects.filter(object_id_int=obj.pk, url=obj.get_absolute_url())
+
+    def test_indexed_afterwards(self):
+        with bulk_import():
+            lang = self.create('Maori')
+            assert not self.entries(lang).exists()
+        assert self.entries(lang).count() == 1
+        assert watson.search('Maori').count() == 1
+
+    def test_revision(self):
+        with bulk_import(u"Imported maori", user=self.editor):
+            with reversion.create_revision():
+                self.create('Maori')
+                self.create('Samoan')
+        assert Version.objects.count() == 0
+        revision = Revision.objects.get()
+        assert revision.comment == u"Imported maori: 2 languages"
+        assert revision.user == self.editor
+
+    def test_statistics(self):
+        with bulk_import():
+            self.create('Maori')
+        labels = StatisticalValue.objects.values_list('label', flat=True)
+        assert "Number of Languages" in labels
+        assert "Number of Sources" not in labels
+
+    def test_no_redirects(self):
+        with bulk_import():
+            source = Source.objects.get(pk=self.source.pk)
+            source.slug = 'Smith1991a'
+            source.save()
+        assert Redirect.objects.count() == 0
+        assert self.entries(source).count() == 1
+
+    def test_add(self):
+        with bulk_import() as batch:
+            Language.objects.bulk_create([
+                Language(language='Maori', slug='maori', editor=self.editor)
+            ])
+            batch.add(Language, Language.objects.values_list('pk', flat=True))
+        assert self.entries(Language.objects.get(slug='maori')).count() == 1
+
+    def test_hooks_restored(self):
+        with self.assertRaises(ValueError):
+            with bulk_import():
+                self.create('Maori')
+                raise ValueError("Rollback")
+        assert Revision.objects.count() == 0
+        assert watson.search('Maori').count() == 0
+        # back to indexing and versioning every save.
+        with reversion.create_revision():
+            lang = self.create('Samoan')
+        assert self.entries(lang).count() == 1
+        assert Version.objects.count() == 1
+        lang.slug = 'samoa'
+        lang.save()
+        assert Redirect.objects.count() == 1
+
+
+class Test_CreateObjects(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        Source.objects.create(year="1991", author='Smith', slug='Smith1991', editor=cls.editor)
+
+    def test_sets_keys(self):
+        sources = [
+            Source(year="1992", author=author, slug=author.lower(), editor=self.editor)
+            for author in ('Jones', 'Brown')
+        ]
+        assert create_objects(Source, sources, ('slug', 'added')) == sources
+        assert [Source.objects.get(pk=s.pk).author for s in sources] == ['Jones', 'Brown']
+
+    def test_identical_objects(self):
+        # i.e. the same in the fields they're matched on.
+        sources = [
+            Source(year="1992", author='Jones', slug='jones%d' % i, editor=self.editor)
+            for i in range(3)
+        ]
+        create_objects(Source, sources, ('author', 'editor'))
+        assert len(set([s.pk for s in sources])) == 3
+        assert sorted([s.pk for s in sources]) == [s.pk for s in sources]
+        assert [Source.objects.get(pk=s.pk).slug for s in sources] == ['jones0', 'jones1', 'jones2']
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Language, AlternateName, Link, Location
+from website.apps.core.dossier import get_dossier, get_key, invalidate_dossiers
+from website.apps.core.locations import invalidate_locations
+
+
+class Test_Dossier(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.lang = Language.objects.create(
+            language='Maori', slug='maori', isocode='mri', editor=cls.editor
+        )
+        cls.other = Language.objects.create(
+            language='Samoan', slug='samoan', isocode='smo', editor=cls.editor
+        )
+        AlternateName.objects.create(
+            language=cls.lang, name='Te Reo', slug='tereo', editor=cls.editor
+        )
+
+    def setUp(self):
+        cache.clear()
+        # the location index outlives the (rolled back) locations of other tests.
+        invalidate_locations()
+        self.url = reverse('language-detail', kwargs={'language': 'maori'})
+
+    def test_get_dossier(self):
+        dossier = get_dossier('maori')
+        assert dossier['language'] == self.lang
+        assert [a.name for a in dossier['alternatenames']] == ['Te Reo']
+        assert dossier['location'] is None
+        assert cache.get(get_key('maori')) is not None
+
+    def test_missing(self):
+        with self.assertRaises(Language.DoesNotExist):
+            get_dossier('fudge')
+
+    def test_cached(self):
+        get_dossier('maori')
+        with self.assertNumQueries(0):
+            get_dossier('maori')
+
+    def test_page_queries(self):
+        self.client.get(self.url)
+        # only the page of lexicon once the dossier is cached.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Te Reo')
+
+    def test_invalidate_alternate_name(self):
+        self.assertNotContains(self.client.get(self.url), 'Maori Proper')
+        AlternateName.objects.create(
+            language=self.lang, name='Maori Proper', slug='maoriproper', editor=self.editor
+        )
+        self.assertContains(self.client.get(self.url), 'Maori Proper')
+
+    def test_invalidate_link(self):
+        link = Link.objects.create(
+            language=self.lang, link='http://example.com', description='An Example',
+            editor=self.editor
+        )
+        self.assertContains(self.client.get(self.url), 'An Example')
+        link.delete()
+        self.assertNotContains(self.client.get(self.url), 'An Example')
+
+    def test_invalidate_location(self):
+        get_dossier('maori')
+        get_dossier('samoan')
+        Location.objects.create(isocode='mri', latitude=-41.0, longitude=174.0, editor=self.editor)
+        assert cache.get(get_key('maori')) is None
+        assert cache.get(get_key('samoan')) is not None
+        assert get_dossier('maori')['location'].latitude == -41.0
+
+    def test_invalidate_language(self):
+        get_dossier('maori')
+        lang = Language.objects.get(pk=self.lang.pk)
+        lang.classification = 'Austronesian'
+        lang.save()
+        assert get_dossier('maori')['language'].classification == 'Austronesian'
+
+    def test_invalidate_slug(self):
+        get_dossier('maori')
+        lang = Language.objects.get(pk=self.lang.pk)
+        lang.slug = 'reomaori'
+        lang.save()
+        assert cache.get(get_key('maori')) is None
+        with self.assertRaises(Language.DoesNotExist):
+            get_dossier('maori')
+
+    def test_invalidate_dossiers(self):
+        get_dossier('maori')
+        get_dossier('samoan')
+        invalidate_dossiers([self.lang.pk])
+        assert cache.get(get_key('maori')) is None
+        assert cache.get(get_key('samoan')) is not None
+        invalidate_dossiers(Language.objects.all())
+        assert cache.get(get_key('samoan')) is None
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.test import TestCase
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Location
+from website.apps.core import locations
+from website.apps.core.locations import (
+    get_location, get_locations, get_location_version, invalidate_locations,
+    LOCATION_VERSION_KEY
+)
+
+
+class Test_LocationIndex(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.loc = Location.objects.create(
+            isocode='mri', latitude=-41.0, longitude=174.0, editor=cls.editor
+        )
+
+    def setUp(self):
+        cache.clear()
+        # the index outlives the (rolled back) locations of other tests.
+        invalidate_locations()
+
+    def test_get_location(self):
+        point = get_location('mri')
+        assert point.latitude == -41.0
+        assert point.longitude == 174.0
+        assert get_location('smo') is None
+        assert get_location(None) is None
+        assert get_location('') is None
+
+    def test_loaded_once(self):
+        get_locations()
+        with self.assertNumQueries(0):
+            assert 'mri' in get_locations()
+            get_location('mri')
+
+    def test_first_location_wins(self):
+        Location.objects.create(isocode='mri', latitude=1.0, longitude=2.0, editor=self.editor)
+        assert get_location('mri').latitude == -41.0
+
+    def test_refreshed_on_save(self):
+        get_locations()
+        loc = Location.objects.get(pk=self.loc.pk)
+        loc.latitude = -39.0
+        loc.save()
+        assert get_location('mri').latitude == -39.0
+
+    def test_refreshed_on_create_and_delete(self):
+        get_locations()
+        loc = Location.objects.create(isocode='smo', latitude=-13.0, longitude=-172.0, editor=self.editor)
+        assert get_location('smo').longitude == -172.0
+        loc.delete()
+        assert get_location('smo') is None
+
+    def test_invalidate_locations(self):
+        version = get_location_version()
+        invalidate_locations()
+        assert get_location_version() == version + 1
+
+    def test_invalidate_locations_unset(self):
+        invalidate_locations()
+        assert cache.get(LOCATION_VERSION_KEY) is not None
+
+    def test_unshared_cache_version_ignored(self):
+        # the test cache is local to this process, so a version there
+        # doesn't tell us about changes anywhere else...
+        assert not locations.is_shared_cache()
+        get_locations()
+        cache.set(LOCATION_VERSION_KEY, 1, None)
+        with self.assertNumQueries(0):
+            get_locations()
+        # ...but changes in this process still reload the index.
+        invalidate_locations()
+        with self.assertNumQueries(1):
+            get_locations()
+
+    def test_shared_cache_version(self):
+        is_shared_cache, locations.is_shared_cache = locations.is_shared_cache, lambda: True
+        try:
+            get_locations()
+            # another process changed the locations.
+            cache.incr(LOCATION_VERSION_KEY)
+            with self.assertNumQueries(1):
+                get_locations()
+            with self.assertNumQueries(0):
+                get_locations()
+        finally:
+            locations.is_shared_cache = is_shared_cache
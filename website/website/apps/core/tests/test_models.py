@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
-from website.apps.core.models import Language, Source
+from django.utils import six
+from website.apps.core.models import Language, Source, Clade, get_clade_paths
 
 class Test_Language(TestCase):
     
@@ -65,4 +67,71 @@ class Test_Source(TestCase):
             slug='Smith1991', reference='S2',
             comment='c1', editor=self.editor
         )
-        self.assertEquals(str(s), s.author)
\ No newline at end of file
+        self.assertEquals(str(s), s.author)
+
+class Test_Clade(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+    
+    def make(self, slug, classification):
+        return Language.objects.create(
+            language=slug, slug=slug, classification=classification,
+            editor=self.editor
+        )
+    
+    def test_get_clade_paths(self):
+        assert get_clade_paths(None) == []
+        assert get_clade_paths('') == []
+        assert get_clade_paths('A,B , ,C') == ['A', 'A, B', 'A, B, C']
+    
+    def test_created_on_save(self):
+        l = self.make('a', 'A, B, C')
+        assert [c.path for c in l.clades.order_by('depth')] == ['A', 'A, B', 'A, B, C']
+        c = Clade.objects.get(path='A, B, C')
+        assert c.name == 'C'
+        assert c.depth == 3
+        assert c.parent.path == 'A, B'
+        assert c.parent.parent.path == 'A'
+    
+    def test_shared(self):
+        self.make('a', 'A, B')
+        self.make('b', 'A, C')
+        assert Clade.objects.count() == 3
+        assert Clade.objects.get(path='A').languages.count() == 2
+    
+    def test_reclassify(self):
+        l = self.make('a', 'A, B')
+        l.classification = 'A, C'
+        l.save()
+        assert [c.path for c in l.clades.order_by('depth')] == ['A', 'A, C']
+        # empty clades are removed
+        assert not Clade.objects.filter(path='A, B').exists()
+    
+    def test_delete(self):
+        self.make('a', 'A, B').delete()
+        assert Clade.objects.count() == 0
+    
+    def test_languages(self):
+        a = self.make('a', 'A, B')
+        b = self.make('b', 'A, Bc')
+        assert list(Clade.objects.languages('A, B')) == [a]
+        assert list(Clade.objects.languages('A,Bc')) == [b]
+        assert sorted(Clade.objects.languages('A').values_list('slug', flat=True)) == ['a', 'b']
+        # unknown clades fall back to matching on the classification
+        assert sorted(Clade.objects.languages('A, ').values_list('slug', flat=True)) == ['a', 'b']
+        assert list(Clade.objects.languages('A, Bc, D')) == []
+    
+    def test_rebuild(self):
+        self.make('a', 'A, B')
+        Clade.objects.all().delete()
+        Clade.objects.rebuild()
+        assert Clade.objects.count() == 2
+    
+    def test_rebuild_command(self):
+        self.make('a', 'A, B')
+        Clade.objects.all().delete()
+        out = six.StringIO()
+        call_command('rebuild_clades', stdout=out)
+        assert out.getvalue().strip() == '2 clades'
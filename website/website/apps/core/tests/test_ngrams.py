@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import six
+from django.utils.encoding import force_text
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Language, NGram
+from website.apps.core.ngrams import get_ngrams, get_query_ngrams, search, rebuild_ngrams
+
+
+class Test_NGrams(TestCase):
+    def test_get_ngrams(self):
+        assert get_ngrams(u'Ŋata') == set([u'ŋa', u'at', u'ta', u'ŋat', u'ata'])
+        assert get_ngrams(u'a') == set()
+        assert get_ngrams(None) == set()
+
+    def test_get_query_ngrams(self):
+        assert get_query_ngrams(u'ŋg') == set([u'ŋg'])
+        assert get_query_ngrams(u'Mata') == set([u'mat', u'ata'])
+        assert get_query_ngrams(u'a') is None
+
+
+class Test_LanguageIndex(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.lang1 = Language.objects.create(
+            language='Maori', slug='maori', isocode='mri', editor=cls.editor
+        )
+        cls.lang2 = Language.objects.create(
+            language='Samoan', slug='samoan', isocode='smo', editor=cls.editor
+        )
+
+    def grams(self, obj):
+        return set(NGram.objects.filter(
+            model='core.language', object_id=obj.pk
+        ).values_list('gram', flat=True))
+
+    def test_indexed(self):
+        assert self.grams(self.lang1) == get_ngrams(u'maori')
+
+    def test_changed(self):
+        lang = Language.objects.get(pk=self.lang1.pk)
+        lang.language = 'Tongan'
+        lang.save()
+        assert self.grams(lang) == get_ngrams(u'tongan')
+
+    def test_deleted(self):
+        pk = self.lang1.pk
+        Language.objects.get(pk=pk).delete()
+        assert not NGram.objects.filter(model='core.language', object_id=pk).exists()
+
+    def test_search(self):
+        assert list(search(Language.objects.all(), 'ori')) == [self.lang1]
+        assert list(search(Language.objects.all(), 'MOA')) == [self.lang2]
+        assert list(search(Language.objects.all(), 'oa')) == [self.lang2]
+        # too short to use the index.
+        assert list(search(Language.objects.all(), 'n')) == []
+        assert list(search(Language.objects.all(), 'xyz')) == []
+
+    def test_search_order(self):
+        # all the n-grams of "moamo" are in "samoan", but not in that order.
+        assert list(search(Language.objects.all(), 'oamo')) == []
+
+    def test_rebuild(self):
+        NGram.objects.all().delete()
+        assert rebuild_ngrams(Language, chunk_size=1) == 2
+        assert self.grams(self.lang2) == get_ngrams(u'samoan')
+
+    def test_rebuild_command(self):
+        NGram.objects.all().delete()
+        out = six.StringIO()
+        call_command('rebuild_ngrams', 'core.Language', stdout=out)
+        assert out.getvalue().strip() == 'core.language: indexed 2 objects'
+        assert list(search(Language.objects.all(), 'ori')) == [self.lang1]
+
+    def test_search_command(self):
+        out = six.StringIO()
+        call_command('search', 'language', 'ori', stdout=out)
+        assert force_text(out.getvalue()).split()[0:2] == [str(self.lang1.id), 'Maori']
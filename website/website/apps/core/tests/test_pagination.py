@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Language, Attachment
+from website.apps.core.pagination import KeysetPaginator, InvalidCursor, get_keys
+from website.apps.core.tables import KeysetMixin, LanguageIndexTable
+
+
+class KeysetLanguageTable(KeysetMixin, LanguageIndexTable):
+    pass
+
+
+class Test_KeysetPaginator(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        for i, name in enumerate(['Maori', 'Samoan', 'Tongan', 'Fijian', 'Maori', 'Samoan', 'Rapanui']):
+            Language.objects.create(
+                language=name, slug='lang%d' % i, editor=cls.editor,
+                dialect='D%d' % (i % 3) if i % 2 else None,
+                classification=None if i % 3 else 'Polynesian',
+            )
+
+    def walk(self, queryset, per_page):
+        paginator = KeysetPaginator(queryset, per_page)
+        page = paginator.page()
+        pages = [page.records]
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page.records)
+        return paginator, pages
+
+    def walk_back(self, paginator, cursor):
+        page = paginator.page(cursor)
+        pages = [page.records]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            pages.insert(0, page.records)
+        return pages
+
+    def test_get_keys(self):
+        assert get_keys(Language.objects.all()) == [
+            ('language', False), ('dialect', False), ('pk', False)
+        ]
+        assert get_keys(Language.objects.order_by('-slug')) == [('slug', True), ('pk', False)]
+        assert get_keys(Language.objects.order_by('id')) == [('id', False)]
+
+    def test_get_keys_related(self):
+        assert get_keys(Attachment.objects.order_by('-source')) == [
+            ('source__author', True), ('source__year', True), ('pk', False)
+        ]
+
+    def test_get_keys_random(self):
+        with self.assertRaises(ValueError):
+            get_keys(Language.objects.order_by('?'))
+
+    def test_walk(self):
+        for ordering in (
+            ['language', 'dialect'], ['-language', 'dialect'], ['dialect'],
+            ['-dialect'], ['classification', '-dialect'], ['-id'],
+        ):
+            queryset = Language.objects.order_by(*ordering)
+            expected = list(queryset.order_by(*ordering + ['pk']))
+            for per_page in (1, 2, 3, 7, 10):
+                paginator, pages = self.walk(queryset, per_page)
+                assert [len(p) for p in pages[:-1]] == [per_page] * (len(pages) - 1)
+                assert sum(pages, []) == expected, (ordering, per_page)
+                # ...and back again from the last page.
+                last = paginator.get_cursor(pages[-2][-1]) if len(pages) > 1 else None
+                assert sum(self.walk_back(paginator, last), []) == expected, (ordering, per_page)
+
+    def test_page_queries(self):
+        paginator, pages = self.walk(Language.objects.all(), 2)
+        cursor = paginator.get_cursor(pages[1][-1])
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.page(cursor)
+        assert len(queries) == 1
+        assert 'COUNT(' not in queries[0]['sql'].upper()
+        assert 'OFFSET' not in queries[0]['sql'].upper()
+        assert page.records == pages[2]
+
+    def test_empty(self):
+        page = KeysetPaginator(Language.objects.none(), 10).page()
+        assert page.records == []
+        assert not page.has_previous() and not page.has_next()
+        assert page.next_cursor is None
+
+    def test_past_end(self):
+        paginator = KeysetPaginator(Language.objects.all(), 10)
+        cursor = paginator.get_cursor(Language.objects.order_by('-language', '-dialect')[0])
+        with self.assertRaises(EmptyPage):
+            paginator.page(cursor)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Language.objects.all(), 10)
+        for cursor in ('banana', 'WzEsMiwzXQ', 'WyJuIiwiMCIsWzEsMiwzXV0'):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_other_ordering(self):
+        cursor = KeysetPaginator(Language.objects.all(), 2).page().next_cursor
+        with self.assertRaises(InvalidCursor):
+            KeysetPaginator(Language.objects.order_by('slug'), 2).page(cursor)
+
+    def test_table(self):
+        table = KeysetLanguageTable(Language.objects.all())
+        table.paginate_keyset(per_page=3, count=7)
+        assert [row.record.slug for row in table.page.object_list] == ['lang3', 'lang0', 'lang4']
+        cursor = table.page.next_cursor
+        table = KeysetLanguageTable(Language.objects.all())
+        table.paginate_keyset(cursor, per_page=3)
+        assert [row.record.slug for row in table.page.object_list] == ['lang6', 'lang1', 'lang5']
+        assert table.prefixed_cursor_field == 'cursor'
@@ -4,7 +4,7 @@ from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 
 from website.apps.core.models import Source, Language, Family, AlternateName
-from website.apps.core.tests.utils import PaginatorTestMixin
+from website.apps.core.tests.utils import PaginatorTestMixin, KeysetPaginatorTestMixin
 
 class BaseMixin(object):
     @classmethod
@@ -156,7 +156,7 @@ class Test_LanguageIndex(BaseMixin, PaginatorTestMixin, TestCase):
         self.assertContains(response, 'A Language')
         
 
-class Test_LanguageDetail(BaseMixin, PaginatorTestMixin, TestCase):
+class Test_LanguageDetail(BaseMixin, KeysetPaginatorTestMixin, TestCase):
     def setUp(self):
         super(Test_LanguageDetail, self).setUp()
         self.url = reverse(
@@ -456,7 +456,7 @@ class Test_SourceIndex(BaseMixin, PaginatorTestMixin, TestCase):
         self.assertNotContains(response, 'Smith')
     
 
-class Test_SourceDetail(BaseMixin, PaginatorTestMixin):
+class Test_SourceDetail(BaseMixin, KeysetPaginatorTestMixin):
     """Tests the source_detail view"""
     def setUp(self):
         super(Test_SourceDetail, self).setUp()
@@ -14,3 +14,19 @@ class PaginatorTestMixin(object):
     def test_bad_paginator_word(self):
         response = self.client.get('{}?page=banana'.format(self.url))
         self.assertEqual(response.status_code, 404)
+
+
+class KeysetPaginatorTestMixin(object):
+    """Mixin for running keyset paginator tests. Needs self.url to be set."""
+    def test_paginator(self):
+        response = self.client.get('{}?cursor='.format(self.url))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_bad_paginator_cursor(self):
+        response = self.client.get('{}?cursor=banana'.format(self.url))
+        self.assertEqual(response.status_code, 404)
+        
+    def test_bad_paginator_payload(self):
+        # valid base64 and json, but nonsense.
+        response = self.client.get('{}?cursor=WzEsMiwzXQ'.format(self.url))
+        self.assertEqual(response.status_code, 404)
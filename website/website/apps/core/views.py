@@ -6,7 +6,8 @@ from django.views.generic import DetailView, TemplateView
 from django.core.paginator import EmptyPage, PageNotAnInteger
 
 from website.apps.core.models import Family, Language, AlternateName, Source
-from website.apps.core.models import Location
+from website.apps.core.dossier import get_dossier
+from website.apps.core.pagination import InvalidCursor
 
 from django_tables2 import SingleTableView, RequestConfig
 from website.apps.core.tables import LanguageIndexTable
@@ -37,8 +38,6 @@ class LanguageIndex(SingleTableView):
             qset = qset.filter(
                 language__istartswith=self.request.GET['subset']
             )
-        if 'website.apps.lexicon' in settings.INSTALLED_APPS:
-            qset = qset.annotate(count=Count('lexicon')).all()
         return qset
     
     def get_context_data(self, **kwargs):
@@ -71,8 +70,6 @@ class SourceIndex(SingleTableView):
         qset = Source.objects.all()
         if 'subset' in self.request.GET:
             qset = qset.filter(author__istartswith=self.request.GET['subset'])
-        if 'website.apps.lexicon' in settings.INSTALLED_APPS:
-            return qset.annotate(count=Count('lexicon')).all()
         return qset
 
     def get_context_data(self, **kwargs):
@@ -142,15 +139,16 @@ class SourceDetail(DetailView):
             else:
                 context['lexicon_table'] = SourceLexiconTable(qset)
             
-            RequestConfig(self.request).configure(context['lexicon_table'])
+            RequestConfig(self.request, paginate=False).configure(context['lexicon_table'])
             
             try:
-                context['lexicon_table'].paginate(
-                    page=self.request.GET.get('page', 1), per_page=50
+                context['lexicon_table'].paginate_keyset(
+                    self.request.GET.get(context['lexicon_table'].prefixed_cursor_field),
+                    per_page=50, count=kwargs['object'].lexicon_count
                 )
             except EmptyPage:  # 404 on a empty page
                 raise Http404
-            except PageNotAnInteger:  # 404 on invalid page number
+            except InvalidCursor:  # 404 on invalid cursor
                 raise Http404
         
         return context
@@ -163,9 +161,7 @@ class FamilyDetail(DetailView):
     
     def get_context_data(self, **kwargs):
         context = super(FamilyDetail, self).get_context_data(**kwargs)
-        records = kwargs['object'].language_set.all().annotate(
-            count=Count('lexicon')
-        )
+        records = kwargs['object'].language_set.all()
         context['languages'] = LanguageIndexTable(records)
         RequestConfig(self.request).configure(context['languages'])
         
@@ -194,30 +190,10 @@ def language_detail(request, language):
     """
     # if we find the language slug, then render the language detail page.
     try:
-        my_lang = Language.objects.get(slug=language)
-        out = {
-            'language': my_lang,
-            'alternatenames': my_lang.alternatename_set.all(),
-            'links': my_lang.link_set.all(),
-            'attachments': my_lang.attachment_set.all(),
-        }
+        # everything but the lexicon comes from the cached dossier.
+        out = dict(get_dossier(language))
+        my_lang = out['language']
         
-        # sources used
-        sources = my_lang.lexicon_set.values('source_id').distinct().all()
-        source_ids = [_['source_id'] for _ in sources]
-        out['sources_used'] = Source.objects.filter(pk__in=source_ids)
-        
-        # location
-        out['location'] = None
-        if my_lang.isocode:
-            try:
-                out['location'] = Location.objects.filter(
-                    isocode=my_lang.isocode
-                )[0]
-            except (Location.DoesNotExist, IndexError):
-                pass  # keep out['location'] as None
-                
-            
         # load lexicon if installed.
         if 'website.apps.lexicon' in settings.INSTALLED_APPS:
             qset = my_lang.lexicon_set.select_related().all()
@@ -226,29 +202,18 @@ def language_detail(request, language):
             else:
                 out['lexicon_table'] = LanguageLexiconTable(qset)
             
-            RequestConfig(request).configure(out['lexicon_table'])
+            RequestConfig(request, paginate=False).configure(out['lexicon_table'])
             
             try:
-                out['lexicon_table'].paginate(
-                    page=request.GET.get('page', 1), per_page=50
+                out['lexicon_table'].paginate_keyset(
+                    request.GET.get(out['lexicon_table'].prefixed_cursor_field),
+                    per_page=50, count=my_lang.lexicon_count
                 )
             except EmptyPage:  # 404 on a empty page
                 raise Http404
-            except PageNotAnInteger:  # 404 on invalid page number
+            except InvalidCursor:  # 404 on invalid cursor
                 raise Http404
         
-        # load pronouns
-        if 'website.apps.pronouns' in settings.INSTALLED_APPS:
-            from website.apps.pronouns.models import Paradigm
-            from website.apps.pronouns.tools import add_pronoun_table
-            try:
-                out['pronoun'] = Paradigm.objects.filter(language=my_lang)[0]
-                out['pronoun_rows'] = add_pronoun_table(
-                    out['pronoun'].pronoun_set.all()
-                )
-            except IndexError:  # no paradigm
-                pass
-            
         return render(request, 'core/language_detail.html', out)
     except Language.DoesNotExist:
         pass
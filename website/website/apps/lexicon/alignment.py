@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+Multiple alignments of a word's entries.
+
+Alignments are expensive, so they are computed off the request path by the
+align_words command: `word_alignment` queues the word whenever its entries
+no longer match the stored alignment, and serves the last alignment until
+the new one is ready.
+"""
+import hashlib
+import json
+from collections import Counter
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from website.apps.lexicon.models import Lexicon, Alignment, AlignmentQueue
+from website.apps.lexicon.segments import get_segments, WORD_BOUNDARY
+
+# how long before a job claimed by a worker that has died is handed out again.
+ALIGNMENT_TIMEOUT = timedelta(hours=1)
+
+# realign a word from scratch when more than this fraction of its entries
+# have changed...
+REALIGN_FRACTION = 0.5
+
+# ...or when fitting the changed entries into the existing alignment lowers
+# its quality (see `get_quality`) by more than this.
+REALIGN_QUALITY_DROP = 0.1
+
+# penalty for a gap when fitting an entry into an existing alignment (the
+# SCA sound class scores run from -10 to 10).
+GAP_PENALTY = -2.0
+
+GAP = '-'
+
+
+def get_checksum(entries):
+    """Returns a hash of a word's (lexicon id, entry) pairs"""
+    checksum = hashlib.sha1()
+    for lex_id, entry in sorted(entries):
+        checksum.update((u"%d\t%s\n" % (lex_id, entry or '')).encode('utf8'))
+    return checksum.hexdigest()
+
+
+def get_entries(word_id):
+    return list(Lexicon.objects.filter(word_id=word_id).values_list('id', 'entry'))
+
+
+def is_alignable(entry):
+    """Returns True if lingpy can segment `entry`"""
+    return get_tokens(entry) is not None
+
+
+def get_tokens(entry, segments=None):
+    """
+    Returns the segments of `entry` as lingpy tokens, or None if they
+    can't be aligned. `segments` are the cached segments of the entry (see
+    `website.apps.lexicon.segments`), if any, otherwise lingpy segments it.
+    """
+    from lingpy import ipa2tokens, tokens2class
+    try:
+        if segments:
+            tokens = ['_' if s == WORD_BOUNDARY else s for s in segments.split()]
+        else:
+            tokens = ipa2tokens(entry)
+        tokens2class(tokens, 'sca')
+    except (ValueError, IndexError, KeyError):
+        return None
+    return tokens or None
+
+
+def align_entries(entries, segments=None):
+    """
+    Aligns a word's (lexicon id, entry) pairs with lingpy, using the
+    cached `segments` ({lexicon id: segments}) of the entries where given.
+
+    Returns a list of (lexicon id, entry, [aligned segments]). Entries that
+    lingpy can't segment (e.g. empty ones) get no segments.
+    """
+    from lingpy import Multiple
+    entries, cached = sorted(entries), segments or {}
+    tokens = [(lex_id, get_tokens(entry, cached.get(lex_id))) for (lex_id, entry) in entries]
+    tokens = [(lex_id, t) for (lex_id, t) in tokens if t is not None]
+    aligned = {}
+    if tokens:
+        msa = Multiple([t for (lex_id, t) in tokens])
+        msa.prog_align()
+        for (lex_id, t), row in zip(tokens, msa.alm_matrix):
+            aligned[lex_id] = list(row)
+    return [(lex_id, entry, aligned.get(lex_id, [])) for (lex_id, entry) in entries]
+
+
+def _get_classes(segments, cache):
+    from lingpy import tokens2class
+    classes = []
+    for segment in segments:
+        if segment not in cache:
+            cache[segment] = GAP if segment == GAP else tokens2class([segment], 'sca')[0]
+        classes.append(cache[segment])
+    return classes
+
+
+def _add_to_profile(profile, classes, n=1):
+    # adds (or with n=-1, removes) a row's sound classes to the profile.
+    for counter, c in zip(profile, classes):
+        if c != GAP:
+            counter[c] += n
+            if counter[c] <= 0:
+                del counter[c]
+
+
+def get_profile(rows, cache=None):
+    """
+    Returns the profile of aligned `rows` (as returned by `align_entries`),
+    i.e. a Counter of the sound classes in each column.
+    """
+    cache = {} if cache is None else cache
+    profile = []
+    for lex_id, entry, segments in rows:
+        if segments:
+            if not profile:
+                profile = [Counter() for s in segments]
+            _add_to_profile(profile, _get_classes(segments, cache))
+    return profile
+
+
+def get_quality(profile):
+    """
+    Returns the fraction of aligned segments that are in the most common
+    sound class of their column, given the `profile` of the alignment.
+    """
+    agree = sum([max(column.values()) for column in profile if column])
+    total = sum([sum(column.values()) for column in profile])
+    return float(agree) / total if total else 1.0
+
+
+def align_to_profile(classes, profile, scorer):
+    """
+    Aligns the sound `classes` of one entry against the columns of an
+    existing alignment, where `profile` is a Counter of the sound classes in
+    each column.
+
+    Returns a list of (column, segment) pairs, where `column` is None for
+    segments that need a new column and `segment` is None where the entry
+    has a gap.
+    """
+    depth = float(max([sum(c.values()) for c in profile] + [1]))
+
+    def match(i, j):
+        count = sum(profile[j].values())
+        if not count:
+            return GAP_PENALTY
+        return sum([scorer[classes[i], c] * n for (c, n) in profile[j].items()]) / count
+
+    def skip(j):
+        # gaps are cheaper in columns that are mostly gaps already.
+        return GAP_PENALTY * sum(profile[j].values()) / depth
+
+    rows, cols = len(classes), len(profile)
+    score = [[0.0] * (cols + 1) for _ in range(rows + 1)]
+    trace = [[None] * (cols + 1) for _ in range(rows + 1)]
+    for i in range(1, rows + 1):
+        score[i][0], trace[i][0] = score[i - 1][0] + GAP_PENALTY, 'insert'
+    for j in range(1, cols + 1):
+        score[0][j], trace[0][j] = score[0][j - 1] + skip(j - 1), 'skip'
+    for i in range(1, rows + 1):
+        for j in range(1, cols + 1):
+            score[i][j], trace[i][j] = max(
+                (score[i - 1][j - 1] + match(i - 1, j - 1), 'match'),
+                (score[i - 1][j] + GAP_PENALTY, 'insert'),
+                (score[i][j - 1] + skip(j - 1), 'skip'),
+            )
+
+    path, i, j = [], rows, cols
+    while i or j:
+        if trace[i][j] == 'match':
+            i, j = i - 1, j - 1
+            path.append((j, i))
+        elif trace[i][j] == 'insert':
+            i = i - 1
+            path.append((None, i))
+        else:
+            j = j - 1
+            path.append((j, None))
+    return path[::-1]
+
+
+def realign_entries(previous, entries, segments=None, profile=None):
+    """
+    Updates the `previous` alignment of a word (as returned by
+    `align_entries`, with its `profile` if known) to match its current
+    (lexicon id, entry) pairs (and cached `segments`, as for
+    `align_entries`).
+
+    Removed entries are taken out of the profile and added or changed
+    entries are aligned against it one at a time, so the cost depends on
+    how much has changed rather than on the size of the word. The rows are
+    only rewritten once, at the end. The word is aligned from scratch
+    instead when too much has changed or the quality of the alignment drops
+    too far.
+
+    Returns (rows, profile, incremental) where `incremental` is False if
+    the word was aligned from scratch.
+    """
+    from lingpy import rc
+    entries, cached = sorted(entries), segments or {}
+    old = dict([(lex_id, (entry, segments)) for (lex_id, entry, segments) in previous])
+    changed = [
+        (lex_id, entry) for (lex_id, entry) in entries
+        if lex_id not in old or old[lex_id][0] != entry
+    ]
+    kept = [
+        (lex_id, entry, old[lex_id][1]) for (lex_id, entry) in entries
+        if lex_id in old and old[lex_id][0] == entry
+    ]
+    if not [s for (lex_id, entry, s) in kept if s] or len(changed) > REALIGN_FRACTION * len(entries):
+        rows = align_entries(entries, cached)
+        return rows, get_profile(rows), False
+
+    cache = {}
+    if profile is None:
+        profile = get_profile(previous, cache)
+    else:
+        profile = [Counter(column) for column in profile]
+    current = set(entries)
+    for lex_id, entry, segments in previous:
+        if segments and (lex_id, entry) not in current:
+            _add_to_profile(profile, _get_classes(segments, cache), -1)
+
+    # drop the columns that only the removed entries used. Columns are known
+    # by their index in the previous alignment, and new ones by a negative
+    # number, until the rows are rewritten.
+    columns = [j for (j, column) in enumerate(profile) if column]
+    profile = [profile[j] for j in columns]
+    before = get_quality(profile)
+
+    scorer = rc('sca').scorer
+    added, new_columns = [], 0
+    for lex_id, entry in changed:
+        tokens = get_tokens(entry, cached.get(lex_id))
+        if tokens is None:
+            added.append((lex_id, entry, None))
+            continue
+        classes = _get_classes(tokens, cache)
+        placed, next_columns, next_profile = {}, [], []
+        for j, i in align_to_profile(classes, profile, scorer):
+            if j is None:
+                new_columns += 1
+                column, counter = -new_columns, Counter()
+            else:
+                column, counter = columns[j], profile[j]
+            if i is not None:
+                placed[column] = tokens[i]
+                _add_to_profile([counter], [classes[i]])
+            next_columns.append(column)
+            next_profile.append(counter)
+        columns, profile = next_columns, next_profile
+        added.append((lex_id, entry, placed))
+
+    if get_quality(profile) < before - REALIGN_QUALITY_DROP:
+        rows = align_entries(entries, cached)
+        return rows, get_profile(rows), False
+    rows = [
+        (lex_id, entry, [segments[j] if j >= 0 else GAP for j in columns] if segments else [])
+        for (lex_id, entry, segments) in kept
+    ] + [
+        (lex_id, entry, [placed.get(j, GAP) for j in columns] if placed is not None else [])
+        for (lex_id, entry, placed) in added
+    ]
+    return sorted(rows), profile, True
+
+
+def _align_word(job):
+    # runs in the worker processes, so no database access in here.
+    word_id, checksum, queued, entries, segments, previous, profile = job
+    if previous:
+        rows, profile = realign_entries(previous, entries, segments, profile)[0:2]
+    else:
+        rows = align_entries(entries, segments)
+        profile = get_profile(rows)
+    return word_id, checksum, queued, rows, profile
+
+
+def get_alignment(word, entries=None):
+    """
+    Returns (alignment, pending) for `word`, where `alignment` is the most
+    recent stored Alignment (or None) and `pending` is True if the word's
+    entries have changed since then. Changed words are queued for alignment.
+    """
+    if entries is None:
+        entries = get_entries(word.id)
+    checksum = get_checksum(entries)
+    try:
+        alignment = Alignment.objects.filter(word=word).latest()
+    except Alignment.DoesNotExist:
+        alignment = None
+    pending = alignment is None or alignment.checksum != checksum
+    if pending:
+        queue_alignment(word.id, checksum)
+    return alignment, pending
+
+
+def queue_alignment(word_id, checksum):
+    """Adds a word to the alignment queue (if not already queued for these entries)"""
+    queued = AlignmentQueue.objects.filter(word_id=word_id, checksum=checksum)
+    if not queued.exists():
+        AlignmentQueue.objects.update_or_create(word_id=word_id, defaults={
+            'checksum': checksum, 'added': timezone.now(), 'started': None
+        })
+
+
+def claim_alignments(limit=50):
+    """
+    Marks up to `limit` queued words as started and returns them.
+
+    Not every database can lock the rows we pick (SQLite ignores
+    `select_for_update`), so the UPDATE that claims them only matches the
+    ones that are still unclaimed, and we return just those we marked: a
+    worker that loses a race for a job gets fewer jobs, not the same one.
+    """
+    now = timezone.now()
+    claimable = Q(started__isnull=True) | Q(started__lt=now - ALIGNMENT_TIMEOUT)
+    with transaction.atomic():
+        jobs = AlignmentQueue.objects.select_for_update(skip_locked=True).filter(claimable)
+        pks = list(jobs.order_by('added').values_list('pk', flat=True)[0:limit])
+        AlignmentQueue.objects.filter(claimable, pk__in=pks).update(started=now)
+    return list(AlignmentQueue.objects.filter(pk__in=pks, started=now).order_by('added'))
+
+
+def save_alignment(word_id, checksum, rows, queued=None, profile=None):
+    """
+    Stores the alignment `rows` of a word (and their `profile`, see
+    `get_profile`) and removes it from the queue (`queued` is the checksum
+    the word was queued with, if different).
+    """
+    with transaction.atomic():
+        # only keep the latest alignment of each word.
+        Alignment.objects.filter(word_id=word_id).exclude(checksum=checksum).delete()
+        Alignment.objects.update_or_create(word_id=word_id, checksum=checksum, defaults={
+            'alignment': json.dumps(rows),
+            'profile': json.dumps(profile) if profile is not None else '',
+            'added': timezone.now()
+        })
+        # the entries might have changed again while we were busy, in
+        # which case the job stays in the queue for the next run.
+        AlignmentQueue.objects.filter(
+            word_id=word_id, checksum__in=[checksum, queued or checksum]
+        ).delete()
+        AlignmentQueue.objects.filter(word_id=word_id).update(started=None)
+
+
+def run_alignments(processes=None, limit=50, full=False):
+    """
+    Aligns everything in the alignment queue in a pool of `processes`
+    workers (defaults to one per CPU, `1` aligns in this process). Words
+    with a previous alignment are realigned incrementally unless `full`.
+
+    This is a generator yielding (word id, number of entries) as each
+    alignment is saved.
+    """
+    pool = None
+    try:
+        while True:
+            jobs, claimed = [], claim_alignments(limit)
+            previous = {}
+            if not full:
+                previous = dict([
+                    (alignment.word_id, alignment) for alignment in Alignment.objects.filter(
+                        word_id__in=[job.word_id for job in claimed]
+                    )
+                ])
+            # alignments are of the entries, so only use the cached segments
+            # of those without a separate phonological form.
+            segments = get_segments(list(Lexicon.objects.filter(
+                Q(phon_entry__isnull=True) | Q(phon_entry=''),
+                word_id__in=[job.word_id for job in claimed]
+            )))
+            for job in claimed:
+                entries = get_entries(job.word_id)
+                jobs.append((
+                    job.word_id, get_checksum(entries), job.checksum, entries,
+                    dict([
+                        (lex_id, segments[lex_id]) for (lex_id, entry) in entries
+                        if lex_id in segments
+                    ]),
+                    previous[job.word_id].get_rows() if job.word_id in previous else None,
+                    previous[job.word_id].get_profile() if job.word_id in previous else None,
+                ))
+            if not jobs:
+                break
+            if processes == 1:
+                results = (_align_word(job) for job in jobs)
+            else:
+                if pool is None:
+                    # don't let the workers inherit our database connection.
+                    if not connection.in_atomic_block:
+                        connection.close()
+                    pool = Pool(processes)
+                results = pool.imap_unordered(_align_word, jobs)
+            for word_id, checksum, queued, rows, profile in results:
+                save_alignment(word_id, checksum, rows, queued, profile)
+                yield word_id, len(rows)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Counts of the lexical entries of each language, source and word.
+
+The counts are kept in `lexicon_count` (see `CountedModel` in
+`website.apps.core.models`). Saving or deleting a Lexicon updates them
+(see the signals in `website.apps.lexicon.models`), and code that adds or
+moves entries in bulk calls `update_counts` or `recount_lexicon` itself.
+The recount_lexicon command corrects any that have drifted.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from website.apps.core.dossier import invalidate_dossiers
+from website.apps.core.models import Language, Source
+from website.apps.lexicon.models import Word, Lexicon
+
+# (field on Lexicon, counted model) in the order of the rows given to
+# `update_counts`.
+COUNTED = (
+    ('language_id', Language),
+    ('source_id', Source),
+    ('word_id', Word),
+)
+
+
+def update_counts(removed=(), added=()):
+    """
+    Updates the counts for entries that have been `removed` or `added`,
+    each a list of (language id, source id, word id), and deletes the
+    dossiers of their languages.
+    """
+    for i, (field, model) in enumerate(COUNTED):
+        deltas = Counter([row[i] for row in added])
+        deltas.subtract(Counter([row[i] for row in removed]))
+        # one update per distinct change, rather than per object.
+        changes = {}
+        for pk, n in deltas.items():
+            if n:
+                changes.setdefault(n, []).append(pk)
+        with transaction.atomic():
+            for n, ids in changes.items():
+                model.objects.filter(pk__in=ids).update(lexicon_count=F('lexicon_count') + n)
+    # the dossiers hold the language counts and the sources used.
+    invalidate_dossiers(set([row[0] for row in list(removed) + list(added)]))
+
+
+def get_actual_counts(model):
+    """Returns a subquery counting the entries of each object of `model`"""
+    field = dict([(m, f) for (f, m) in COUNTED])[model]
+    counts = Lexicon.objects.filter(**{field: OuterRef('pk')}).order_by()
+    counts = counts.values(field).annotate(n=Count('id')).values('n')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recount_lexicon(model, ids=None):
+    """
+    Corrects the counts of the objects of `model` with the given ids (or
+    all of them). Returns the number of counts that were wrong.
+    """
+    objects = model.objects.all()
+    if ids is not None:
+        objects = objects.filter(pk__in=ids)
+    stale = objects.annotate(actual=get_actual_counts(model)).exclude(
+        lexicon_count=F('actual')
+    ).values_list('pk', 'actual')
+    changes = {}
+    for pk, n in stale:
+        changes.setdefault(n, []).append(pk)
+    with transaction.atomic():
+        for n, pks in changes.items():
+            model.objects.filter(pk__in=pks).update(lexicon_count=n)
+    if model == Language:
+        invalidate_dossiers(sum(changes.values(), []))
+    return sum([len(pks) for pks in changes.values()])
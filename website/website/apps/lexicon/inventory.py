@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Character inventories of sources and languages.
+
+The number of times each character occurs in the entries of each source and
+language is kept in `SourceCharacter` and `LanguageCharacter`. Saving or
+deleting a Lexicon updates these counts (see the signals in
+`website.apps.lexicon.models`), and code that changes entries in bulk
+calls `update_inventory` itself. `rebuild_inventory` recounts everything
+from scratch.
+"""
+import unicodedata
+from collections import Counter
+from itertools import islice
+from multiprocessing import Pool
+
+from django.db import connection, transaction, IntegrityError
+from django.db.models import F, Q
+
+from website.apps.lexicon.models import Lexicon, SourceCharacter, LanguageCharacter
+
+# number of entries to count at a time when rebuilding.
+CHUNK_SIZE = 10000
+
+
+def count_characters(rows):
+    """
+    Counts the characters in a list of (source id, language id, entry).
+    Returns ({(source id, character): count}, {(language id, character): count})
+    """
+    sources, languages = Counter(), Counter()
+    for source_id, language_id, entry in rows:
+        for char in entry or '':
+            sources[(source_id, char)] += 1
+            languages[(language_id, char)] += 1
+    return sources, languages
+
+
+def _apply(model, field, deltas):
+    keys = set()
+    for (key, char), n in deltas.items():
+        keys.add(key)
+        rows = model.objects.filter(**{field: key, 'character': char})
+        if n == 0 or rows.update(count=F('count') + n) or n < 0:
+            # nothing to do, done, or nothing left to remove from (e.g. the
+            # source is being deleted).
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**{field: key, 'character': char, 'count': n})
+        except IntegrityError:  # added by someone else in the meantime.
+            rows.update(count=F('count') + n)
+    if keys:
+        model.objects.filter(**{field + '__in': keys, 'count__lte': 0}).delete()
+
+
+def update_inventory(removed=(), added=()):
+    """
+    Updates the inventories for entries that have been `removed` or
+    `added`, each a list of (source id, language id, entry). An entry that
+    has been changed is removed in its old form and added in its new form.
+    """
+    sources, languages = count_characters(added)
+    old_sources, old_languages = count_characters(removed)
+    sources.subtract(old_sources)
+    languages.subtract(old_languages)
+    with transaction.atomic():
+        _apply(SourceCharacter, 'source_id', sources)
+        _apply(LanguageCharacter, 'language_id', languages)
+
+
+def _get_chunks(lexica, size):
+    chunk = []
+    for row in lexica.values_list('source_id', 'language_id', 'entry').iterator():
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def rebuild_inventory(sources=None, languages=None, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Recounts the inventories of the given source and language ids (or all
+    of them if neither is given), counting chunks of entries in a pool of
+    `processes` workers (defaults to one per CPU, `1` counts in this
+    process).
+
+    Returns the number of entries counted.
+    """
+    everything = sources is None and languages is None
+    lexica = Lexicon.objects.all()
+    if not everything:
+        lexica = lexica.filter(
+            Q(source_id__in=sources or []) | Q(language_id__in=languages or [])
+        )
+
+    total, source_counts, language_counts = 0, Counter(), Counter()
+    chunks = _get_chunks(lexica, chunk_size)
+    pool = None
+    try:
+        while True:
+            batch = list(islice(chunks, processes or 1))
+            if not batch:
+                break
+            if processes == 1:
+                results = map(count_characters, batch)
+            else:
+                if pool is None:
+                    # don't let the workers inherit our database connection.
+                    if not connection.in_atomic_block:
+                        connection.close()
+                    pool = Pool(processes)
+                results = pool.map(count_characters, batch)
+            for s, l in results:
+                source_counts.update(s)
+                language_counts.update(l)
+            total += sum([len(chunk) for chunk in batch])
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    with transaction.atomic():
+        source_rows = SourceCharacter.objects.all()
+        language_rows = LanguageCharacter.objects.all()
+        if not everything:
+            source_rows = source_rows.filter(source_id__in=sources or [])
+            language_rows = language_rows.filter(language_id__in=languages or [])
+        source_rows.delete()
+        language_rows.delete()
+        SourceCharacter.objects.bulk_create([
+            SourceCharacter(source_id=key, character=char, count=n)
+            for ((key, char), n) in source_counts.items()
+            if everything or key in (sources or [])
+        ])
+        LanguageCharacter.objects.bulk_create([
+            LanguageCharacter(language_id=key, character=char, count=n)
+            for ((key, char), n) in language_counts.items()
+            if everything or key in (languages or [])
+        ])
+    return total
+
+
+def get_inventory(rows):
+    """
+    Returns a list of (character, count, unicode name) for a queryset of
+    SourceCharacter or LanguageCharacter rows.
+    """
+    inventory = []
+    for char, count in sorted(rows.values_list('character', 'count')):
+        try:
+            name = unicodedata.name(char)
+        except (ValueError, TypeError):
+            name = "<UNKNOWN>"
+        inventory.append((char, count, name))
+    return inventory
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative loading of tabular lexical data.
+
+A `Loader` turns rows (from a TSV or CSV file, or the forms of a CLDF
+wordlist) into Lexicon entries. Each target is read from the column of the
+same name unless it's mapped to another in a mapping of {target: column}.
+The targets are:
+
+    language, source, word, loan_source
+        the slug of the Language, Source or Word (Language for loan_source).
+    entry, phon_entry, source_gloss, annotation, loan
+        fields of the Lexicon entry.
+    language.isocode, source.year, word.full, loan_source.language, ...
+        fields of a Language, Source or Word that has to be created.
+
+Related objects are looked up in in-memory caches of {slug: id}. Missing
+ones are created if `create` is set (named after their slug unless the
+mapping gives a name) and are an error otherwise.
+
+The entries are added with `bulk_create` a batch at a time, the lexicon
+counts and n-grams are updated for each batch, and the character
+inventories of the sources and languages are recounted at the end. They
+aren't indexed by watson or versioned: load inside
+`website.apps.core.bulk.bulk_import` and give it `Loader.added` for that.
+"""
+import re
+import time
+from itertools import islice
+
+from django.utils import six
+from django.utils.encoding import force_text
+from django.utils.text import slugify
+
+from csvw import dsv
+from csvw.metadata import TableGroup
+
+from website.apps.core.models import Language, Source
+from website.apps.core.bulk import create_objects
+from website.apps.core.ngrams import index_objects
+from website.apps.lexicon.models import Word, Lexicon
+from website.apps.lexicon.counts import update_counts
+from website.apps.lexicon.inventory import rebuild_inventory
+
+# number of rows to add at a time.
+BATCH_SIZE = 1000
+
+# the related objects of an entry, and the field that names new ones.
+RELATED = {
+    'language': Language,
+    'source': Source,
+    'word': Word,
+    'loan_source': Language,
+}
+NAME_FIELDS = {
+    Language: 'language',
+    Source: 'author',
+    Word: 'word',
+}
+FIELDS = ('entry', 'phon_entry', 'source_gloss', 'annotation', 'loan')
+REQUIRED = ('language', 'source', 'word', 'entry')
+
+# the fields that tell the new entries apart (see `create_objects`).
+MATCH_FIELDS = ('language', 'source', 'word', 'entry', 'editor', 'added')
+
+TRUE = ('1', 'y', 'yes', 't', 'true', 'x')
+
+CLDF = 'http://cldf.clld.org/v1.0/terms.rdf#'
+
+# a source reference with pages e.g. "smith1991[12-13]"
+is_pages = re.compile(r"""\[[^\]]*\]$""")
+
+
+class LoadError(ValueError):
+    pass
+
+
+class SlugCache(object):
+    """
+    The ids of the objects of `model` by slug, creating any that are
+    missing if `create` is set.
+    """
+    def __init__(self, model, editor, create=False):
+        self.model = model
+        self.editor = editor
+        self.create = create
+        self.ids = dict(model.objects.values_list('slug', 'id'))
+        self.created = []
+
+    def get(self, slug, fields=None):
+        try:
+            return self.ids[slug]
+        except KeyError:
+            pass
+        cleaned = slugify(slug)[:64]
+        if cleaned in self.ids:
+            self.ids[slug] = self.ids[cleaned]
+            return self.ids[slug]
+        if not self.create or not cleaned:
+            raise LoadError(u"Unknown %s %r" % (self.model._meta.verbose_name, slug))
+        values = {NAME_FIELDS[self.model]: slug}
+        values.update(fields or {})
+        obj = self.model.objects.create(slug=cleaned, editor=self.editor, **values)
+        self.ids[slug] = self.ids[cleaned] = obj.pk
+        self.created.append(obj.pk)
+        return obj.pk
+
+
+class Loader(object):
+    """
+    Loads rows (dicts of {column: value}) into Lexicon. `mapping` gives the
+    columns of any targets not in a column of their own name, and `defaults`
+    gives values for targets that a row leaves empty (e.g. the source of
+    everything in the file).
+
+    `progress` is called after each batch with the number of rows loaded
+    so far and the rate in rows per second.
+    """
+    def __init__(self, editor, mapping=None, defaults=None, create=False,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.editor = editor
+        self.mapping = mapping or {}
+        self.defaults = defaults or {}
+        self.batch_size = int(batch_size)
+        self.progress = progress
+        self.caches = {
+            Language: SlugCache(Language, editor, create),
+            Source: SlugCache(Source, editor, create),
+            Word: SlugCache(Word, editor, create),
+        }
+        self.added = []
+        self.sources, self.languages = set(), set()
+
+    def get(self, row, target):
+        value = row.get(self.mapping.get(target, target))
+        if isinstance(value, six.string_types):
+            value = value.strip()
+        if value in (None, ''):
+            value = self.defaults.get(target)
+        return value
+
+    def get_fields(self, row, name):
+        """Returns the fields for a new `name` object from `row`"""
+        prefix = name + '.'
+        return dict([
+            (target[len(prefix):], self.get(row, target))
+            for target in set(self.mapping) | set(self.defaults) | set(row)
+            if target.startswith(prefix) and self.get(row, target) is not None
+        ])
+
+    def make_entry(self, row, number):
+        values = {}
+        for target in REQUIRED:
+            if self.get(row, target) is None:
+                raise LoadError(u"Row %d has no %s" % (number, target))
+        for target, model in RELATED.items():
+            slug = self.get(row, target)
+            if slug is not None:
+                try:
+                    values[target + '_id'] = self.caches[model].get(
+                        force_text(slug), self.get_fields(row, target)
+                    )
+                except LoadError as e:
+                    raise LoadError(u"Row %d: %s" % (number, e))
+        for target in FIELDS:
+            values[target] = self.get(row, target)
+        values['loan'] = force_text(values['loan'] or '').lower() in TRUE
+        return Lexicon(editor=self.editor, **values)
+
+    def save(self, entries):
+        """Adds a batch of entries, and updates everything derived from them"""
+        create_objects(Lexicon, entries, MATCH_FIELDS)
+        update_counts(added=[(e.language_id, e.source_id, e.word_id) for e in entries])
+        self.sources.update([e.source_id for e in entries])
+        self.languages.update([e.language_id for e in entries])
+        index_objects(Lexicon, [(e.pk, e.entry) for e in entries])
+        self.added.extend([e.pk for e in entries])
+
+    def load(self, rows):
+        """Loads `rows`, returning the number of entries added"""
+        rows, start, total = iter(rows), time.time(), 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.save([self.make_entry(row, total + i + 1) for (i, row) in enumerate(batch)])
+            total += len(batch)
+            if self.progress:
+                self.progress(total, total / max(time.time() - start, 0.001))
+        # in one go, rather than a few queries per character per batch.
+        if total:
+            rebuild_inventory(sources=list(self.sources), languages=list(self.languages), processes=1)
+        return total
+
+    @property
+    def created(self):
+        """Returns {model: [ids]} of the related objects created"""
+        return dict([(m, c.created) for (m, c) in self.caches.items() if c.created])
+
+
+def read_table(filename, delimiter=None):
+    """
+    Yields the rows of a TSV or CSV file (by extension, unless `delimiter`
+    is given) as dicts of {column: value}.
+    """
+    if delimiter is None:
+        delimiter = '\t' if filename.lower().endswith('.tsv') else ','
+    for row in dsv.reader(filename, dicts=True, delimiter=delimiter):
+        yield row
+
+
+def _get_table(group, component):
+    for table in group.tables:
+        if table.common_props.get('dc:conformsTo') == CLDF + component:
+            return table
+
+
+def _get_rows(table, terms):
+    """Returns {id: {target: value}} for a CLDF table, from {target: term}"""
+    rows = {}
+    if table is None:
+        return rows
+    columns = dict([(t, table.get_column(CLDF + term)) for (t, term) in terms.items()])
+    id_column = table.get_column(CLDF + 'id')
+    for row in table.iterdicts():
+        rows[row[id_column.name]] = dict([
+            (t, row[c.name]) for (t, c) in columns.items() if c is not None
+        ])
+    return rows
+
+
+def read_cldf(metadata):
+    """
+    Yields the forms of the CLDF wordlist described by the metadata file
+    `metadata` as rows of {target: value}, with the names and codes of
+    their languages and parameters (i.e. words) for creating new ones.
+    """
+    group = TableGroup.from_file(metadata)
+    forms = _get_table(group, 'FormTable')
+    if forms is None:
+        raise LoadError(u"No FormTable in %s" % metadata)
+    languages = _get_rows(_get_table(group, 'LanguageTable'), {
+        'language.language': 'name',
+        'language.isocode': 'iso639P3code',
+        'language.glottocode': 'glottocode',
+    })
+    words = _get_rows(_get_table(group, 'ParameterTable'), {'word.word': 'name'})
+
+    columns = dict([(target, forms.get_column(CLDF + term)) for (target, term) in (
+        ('language', 'languageReference'),
+        ('word', 'parameterReference'),
+        ('entry', 'form'),
+        ('annotation', 'comment'),
+        ('source', 'source'),
+    )])
+    columns = dict([(t, c.name) for (t, c) in columns.items() if c is not None])
+    for form in forms.iterdicts():
+        row = dict([(t, form[c]) for (t, c) in columns.items()])
+        # take the first source, without its pages.
+        sources = row.get('source') or []
+        if isinstance(sources, six.string_types):
+            sources = [sources]
+        row['source'] = is_pages.sub('', sources[0]) if sources else None
+        row.update(languages.get(row.get('language'), {}))
+        row.update(words.get(row.get('word'), {}))
+        yield row
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from website.apps.lexicon.models import Word
+from website.apps.lexicon.alignment import run_alignments, get_alignment
+
+
+class Command(BaseCommand):
+    args = 'align_words [--all] [--full] [--processes N] [--wait seconds]'
+    help = 'Aligns the words in the alignment queue'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Queue every word without a current alignment first'
+        )
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=None,
+            help='Number of worker processes (default: one per CPU)'
+        )
+        parser.add_argument('--full',
+            action='store_true',
+            dest='full',
+            default=False,
+            help='Realign words from scratch rather than just their changed entries'
+        )
+        parser.add_argument('--wait',
+            action='store',
+            dest='wait',
+            type=int,
+            default=0,
+            help='Keep checking the queue every `wait` seconds'
+        )
+    
+    def _print(self, message):
+        """
+        Wrapper to print to stdout, if it exists
+        
+        (it won't exist if we're running tests)
+        """
+        if hasattr(self, 'stdout'):
+            self.stdout.write(message)
+    
+    def handle(self, *args, **options):
+        if options['all']:
+            for word in Word.objects.all():
+                get_alignment(word)
+        
+        while True:
+            count = 0
+            for count, (word_id, entries) in enumerate(
+                run_alignments(processes=options['processes'], full=options['full']), 1
+            ):
+                self._print("%d\t%d entries" % (word_id, entries))
+            if count:
+                self._print("Aligned %d words" % count)
+            if not options['wait']:
+                break
+            time.sleep(options['wait'])
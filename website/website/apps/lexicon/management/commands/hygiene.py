@@ -1,18 +1,63 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+import re
+import unicodedata
+from itertools import islice
+from multiprocessing import Pool
+
 from reversion import revisions as reversion
-from django.db.models import Count
+from django.db import connection
+from django.db.models import Min, Case, When, Value, F, CharField
 from optparse import make_option
 from django.core.management.base import BaseCommand
 
 from website.apps.core.models import Language
+from website.apps.core.ngrams import index_objects
 from website.apps.lexicon.models import Lexicon
+from website.apps.lexicon.inventory import update_inventory
+
+# number of entries to tidy (and save in one revision) at a time.
+CHUNK_SIZE = 1000
+
+# number of entries to write back per UPDATE statement (each one takes three
+# query parameters, and sqlite only allows 999).
+UPDATE_SIZE = 250
+
+
+def tidy_entry(entry):
+    from ftfy import fix_text
+    return fix_text(entry.strip(), fix_entities=True, normalization="NFKC", uncurl_quotes=True)
+
+
+def fold_entry(entry):
+    """
+    Returns the form of `entry` used to find near-duplicates: NFKC
+    normalised, with diacritics removed and whitespace collapsed.
+    """
+    entry = unicodedata.normalize('NFKD', entry)
+    entry = u''.join([c for c in entry if not unicodedata.combining(c)])
+    entry = re.sub(r'\s+', ' ', entry, flags=re.UNICODE).strip()
+    return unicodedata.normalize('NFKC', entry)
+
+
+def _tidy_chunk(rows):
+    # runs in the worker processes, so no database access in here.
+    tidied = []
+    for pk, entry in rows:
+        new = tidy_entry(entry)
+        if entry != new:
+            tidied.append((pk, entry, new))
+    return tidied
+
 
 class Command(BaseCommand):
-    args = 'hygiene [empty, tidy, dedupe, star] --save [--quiet]'
+    args = 'hygiene [empty, tidy, dedupe, near, star] --save [--quiet]'
     help = 'Cleans Data from Database'
     output_transaction = True
     
     def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='empty, tidy, dedupe, near, star')
         parser.add_argument('--save',
             action='store_true',
             dest='save',
@@ -21,10 +66,23 @@ class Command(BaseCommand):
         )
         parser.add_argument('--quiet',
             action='store_true',
-            dest='save',
+            dest='quiet',
             default=False,
             help='be quiet'
         )
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=1,
+            help='Tidy entries in this many processes'
+        )
+        parser.add_argument('--checkpoint',
+            action='store',
+            dest='checkpoint',
+            default=None,
+            help='Record progress in this file, and resume from it if it exists'
+        )
         
     def _print(self, message, quiet=False):
         """
@@ -50,58 +108,166 @@ class Command(BaseCommand):
             unstarred.extend(proto.lexicon_set.exclude(entry__startswith='*'))
         return unstarred
     
-    def tidy(self):
+    def get_chunks(self, start=0, size=CHUNK_SIZE):
+        """Yields lists of (id, entry) in primary key order, after id `start`"""
+        while True:
+            chunk = list(
+                Lexicon.objects.filter(id__gt=start).order_by('id').values_list('id', 'entry')[0:size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            start = chunk[-1][0]
+
+    def tidy(self, start=0, processes=1, chunk_size=CHUNK_SIZE):
+        """
+        Normalises the entries after id `start` with ftfy, in a pool of
+        `processes` workers.
+
+        This is a generator yielding (last id, [(id, entry, tidied entry)])
+        for each chunk of entries in primary key order.
+        """
         try:
             from ftfy import fix_text
         except ImportError:
             raise ImportError("Please install python-ftfy")
-        
-        tidied = []
-        for obj in Lexicon.objects.all():
-            new = fix_text(obj.entry.strip(), fix_entities=True, normalization="NFKC", uncurl_quotes=True)
-            if obj.entry != new:
-                tidied.append((obj, new))
-        return tidied
-    
+
+        chunks = self.get_chunks(start, chunk_size)
+        if processes == 1:
+            for chunk in chunks:
+                yield chunk[-1][0], _tidy_chunk(chunk)
+            return
+
+        # don't let the workers inherit our database connection.
+        if not connection.in_atomic_block:
+            connection.close()
+        pool = Pool(processes)
+        try:
+            while True:
+                batch = list(islice(chunks, processes))
+                if not batch:
+                    break
+                for chunk, tidied in zip(batch, pool.map(_tidy_chunk, batch)):
+                    yield chunk[-1][0], tidied
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def save_tidied(self, tidied):
+        """
+        Writes back a chunk of (id, entry, tidied entry) from `tidy` as one
+        revision. Entries that have been edited since they were read are
+        left alone.
+        """
+        with reversion.create_revision():
+            reversion.set_comment("Tidied entries")
+            for i in range(0, len(tidied), UPDATE_SIZE):
+                batch = tidied[i:i + UPDATE_SIZE]
+                Lexicon.objects.filter(id__in=[pk for (pk, old, new) in batch]).update(
+                    entry=Case(
+                        *[When(id=pk, entry=old, then=Value(new)) for (pk, old, new) in batch],
+                        default=F('entry'), output_field=CharField()
+                    )
+                )
+            # updates don't send post_save, so record the changes ourselves.
+            old = dict([(pk, entry) for (pk, entry, new) in tidied])
+            removed, added, changed = [], [], []
+            for obj in Lexicon.objects.filter(id__in=list(old)):
+                reversion.add_to_revision(obj)
+                if obj.entry != old[obj.id]:
+                    removed.append((obj.source_id, obj.language_id, old[obj.id]))
+                    added.append((obj.source_id, obj.language_id, obj.entry))
+                    changed.append((obj.id, obj.entry))
+            update_inventory(removed, added)
+            index_objects(Lexicon, changed)
+
+    def read_checkpoint(self, filename):
+        """Returns the last id recorded in the checkpoint `filename`, or 0"""
+        if filename and os.path.exists(filename):
+            with io.open(filename, 'r') as handle:
+                return int(handle.read().strip() or 0)
+        return 0
+
+    def write_checkpoint(self, filename, last_id):
+        # write then rename, so an interruption never leaves a partial file.
+        with io.open(filename + '.tmp', 'w') as handle:
+            handle.write(u"%d\n" % last_id)
+        os.rename(filename + '.tmp', filename)
+
+    def find_duplicate_ids(self):
+        """
+        Returns a queryset of the ids of all entries that repeat an earlier
+        entry (the same language, source, word and entry). Only the first
+        (lowest id) of each group is left out.
+        """
+        first = Lexicon.objects.values('language', 'source', 'word', 'entry')
+        first = first.annotate(first=Min('id')).values('first')
+        return Lexicon.objects.exclude(id__in=first).order_by('id').values_list('id', flat=True)
+
     def find_duplicates(self):
-        dupes = Lexicon.objects.values('language', 'source', 'word', 'entry')
-        dupes = dupes.annotate(count=Count('entry')).filter(count__gte=2)
-        
-        objects = []
-        for d in dupes:
-            qset = Lexicon.objects.filter(
-                language_id=d['language'], 
-                source_id=d['source'],
-                word_id=d['word'],
-                entry__exact=d['entry']
-            ).order_by('id')
-            assert len(qset) == d['count']
-            objects.extend(qset[1:])
-        return objects
-        
-        
+        return list(
+            Lexicon.objects.filter(id__in=self.find_duplicate_ids())
+            .select_related('language', 'source', 'word').order_by('id')
+        )
+
+    def find_near_duplicates(self):
+        """
+        Finds variant spellings: entries of the same language and word that
+        differ from an earlier entry but fold to the same form (see
+        `fold_entry`).
+
+        Returns a list of (entry, earlier entry) pairs of Lexicon ids.
+        """
+        lexica = Lexicon.objects.order_by('language_id', 'word_id', 'id')
+        lexica = lexica.values_list('id', 'language_id', 'word_id', 'entry')
+        near, group, seen = [], None, {}
+        # each language and word comes in one run, so we only need to
+        # remember the forms in the current one.
+        for pk, language_id, word_id, entry in lexica.iterator():
+            if (language_id, word_id) != group:
+                group, seen = (language_id, word_id), {}
+            folded = fold_entry(entry)
+            if folded not in seen:
+                seen[folded] = (pk, entry)
+            elif seen[folded][1] != entry:
+                near.append((pk, seen[folded][0]))
+        return near
+
     def delete(self, items):
-        """Delete a list of records"""
-        for obj in items:
+        """Delete a list of records, one revision per chunk"""
+        items = list(items)
+        for i in range(0, len(items), UPDATE_SIZE):
+            chunk = items[i:i + UPDATE_SIZE]
             with reversion.create_revision():
-                obj.delete()
+                reversion.set_comment("Deleted entries")
+                # record what we're deleting, as the delete won't.
+                for obj in chunk:
+                    reversion.add_to_revision(obj)
+                Lexicon.objects.filter(id__in=[obj.id for obj in chunk]).delete()
     
     def handle(self, *args, **options):
         if len(args) == 0:
             args = ('empty', 'dedupe', 'tidy', 'star')
         
         if 't' in args or 'tidy' in args:
-            tidier = self.tidy()
-            for (obj, new) in tidier:
-                self._print(
-                    'Tidied: %s (%r) - %s (%r)' % (obj.entry, obj.entry, new, new),
-                    options.get('quiet', False)
-                        
-                )
+            checkpoint = options.get('checkpoint')
+            start = self.read_checkpoint(checkpoint)
+            if start:
+                self._print('Resuming after entry %d' % start, options.get('quiet', False))
+            for last_id, tidied in self.tidy(start, options.get('processes', 1)):
+                for (pk, old, new) in tidied:
+                    self._print(
+                        'Tidied: %s (%r) - %s (%r)' % (old, old, new, new),
+                        options.get('quiet', False)
+                    )
                 if 'save' in options and options['save']:
-                    with reversion.create_revision():
-                        obj.entry = new
-                        obj.save()
+                    if tidied:
+                        self.save_tidied(tidied)
+                    if checkpoint:
+                        self.write_checkpoint(checkpoint, last_id)
+            # finished, so the next run starts from the beginning again.
+            if options.get('save') and checkpoint and os.path.exists(checkpoint):
+                os.remove(checkpoint)
         
         if 'e' in args or 'empty' in args or 'empties' in args:
             empties = self.find_empty()
@@ -128,6 +294,20 @@ class Command(BaseCommand):
             
             if 'save' in options and options['save']:
                 self.delete(duplicates)
+
+        if 'n' in args or 'near' in args:
+            # only reported, as variant spellings need checking by hand.
+            near = self.find_near_duplicates()
+            lexica = Lexicon.objects.select_related('language', 'word').in_bulk(
+                set([pk for pair in near for pk in pair])
+            )
+            for pk, other in near:
+                self._print(
+                    'Near Duplicate: %d/%d - %s, %s = %r ~ %r' % (pk, other,
+                        lexica[pk].language, lexica[pk].word,
+                        lexica[pk].entry, lexica[other].entry),
+                    options.get('quiet', False)
+                )
                 
         if 's' in args or 'star' in args:
             unstarred_forms = self.find_unstarred()
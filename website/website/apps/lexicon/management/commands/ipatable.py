@@ -1,37 +1,57 @@
 # -*- coding: utf-8 -*-
-from reversion import revisions as reversion
-import unicodedata
-from django.db.models import Count
-from optparse import make_option
 from django.core.management.base import BaseCommand
-from collections import Counter
-from website.apps.core.models import Source
+from website.apps.core.models import Language, Source
+from website.apps.lexicon.inventory import get_inventory
+from website.apps.lexicon.models import Segmentation
+from website.apps.lexicon.segments import update_segments, get_segment_inventory
 
 
 class Command(BaseCommand):
-    args = 'ipatable source'
-    help = 'Prints the IPA table for the given source'
+    args = 'ipatable source [--language] [--segments]'
+    help = 'Prints the IPA table for the given source (or language)'
     output_transaction = True
     
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='source slug')
+        parser.add_argument('--language',
+            action='store_true',
+            dest='language',
+            default=False,
+            help='Print the table for the language with this slug instead'
+        )
+        parser.add_argument('--segments',
+            action='store_true',
+            dest='segments',
+            default=False,
+            help='Print the segments used rather than the characters'
+        )
+    
     def handle(self, *args, **options):
         if len(args) != 1:
             raise IndexError("ipatable needs a source slug")
         
-        try:
-             SObj = Source.objects.get(slug=args[0])
-        except Source.DoesNotExist:
-            raise Source.DoesNotExist(u"Unable to find {}".format(args[0]))
+        if options.get('language'):
+            try:
+                obj = Language.objects.get(slug=args[0])
+            except Language.DoesNotExist:
+                raise Language.DoesNotExist(u"Unable to find {}".format(args[0]))
+            rows = obj.languagecharacter_set.all()
+            lexica = obj.lexicon_set.all()
+        else:
+            try:
+                obj = Source.objects.get(slug=args[0])
+            except Source.DoesNotExist:
+                raise Source.DoesNotExist(u"Unable to find {}".format(args[0]))
+            rows = obj.sourcecharacter_set.all()
+            lexica = obj.lexicon_set.all()
         
-        chars = Counter()
-        total = 0
-        for obj in SObj.lexicon_set.all():
-            chars.update(obj.entry)
-            total += len(obj.entry)
-        assert total == sum(chars.values())
+        if options.get('segments'):
+            # bring the cached segments up to date first.
+            for count in update_segments(lexica, processes=1):
+                pass
+            inventory = get_segment_inventory(Segmentation.objects.filter(lexicon__in=lexica))
+        else:
+            inventory = get_inventory(rows)
         
-        for char in sorted(chars):
-            try:
-                u = unicodedata.name(char)
-            except:
-                u = "<UNKNOWN>"
-            print(u"\t".join([char, '%d' % chars[char], u.ljust(50), u"?"]))
+        for char, count, name in inventory:
+            self.stdout.write(u"\t".join([char, '%d' % count, name.ljust(50), u"?"]))
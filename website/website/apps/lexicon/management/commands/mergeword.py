@@ -1,19 +1,30 @@
 # -*- coding: utf-8 -*-
-from reversion import revisions as reversion
-from django.db.models import Count
-from optparse import make_option
+from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
 
+from website.apps.core.models import Language, Source
+from website.apps.core.dossier import invalidate_dossiers
+from website.apps.core.merge import get_dependents, merge_objects
 from website.apps.lexicon.models import Word
+from website.apps.lexicon.inventory import rebuild_inventory
+from website.apps.lexicon.counts import recount_lexicon
+from website.apps.lexicon.alignment import get_checksum, get_entries, queue_alignment
+
+MODELS = {
+    'word': Word,
+    'language': Language,
+    'source': Source,
+}
 
 
 class Command(BaseCommand):
-    args = 'mergeword destination source --save'
-    help = 'Merges two words in the database'
+    args = 'mergeword destination source --save [--model word|language|source]'
+    help = 'Merges two words (or languages, or sources) in the database'
     output_transaction = True
     
     
     def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='destination source')
         parser.add_argument('--save',
             action='store_true',
             dest='save',
@@ -22,10 +33,23 @@ class Command(BaseCommand):
         )
         parser.add_argument('--quiet',
             action='store_true',
-            dest='save',
+            dest='quiet',
             default=False,
             help='be quiet'
         )
+        parser.add_argument('--model',
+            action='store',
+            dest='model',
+            default='word',
+            choices=sorted(MODELS),
+            help='Type of object to merge (default: word)'
+        )
+        parser.add_argument('--editor',
+            action='store',
+            dest='editor',
+            default=None,
+            help='Username to record the change against'
+        )
     
     def _print(self, message, quiet=False):
         """
@@ -40,49 +64,61 @@ class Command(BaseCommand):
         if len(args) != 2:
             raise IndexError("mergeword needs two slugs as arguments: mergeword destination source")
         
+        model = MODELS[options.get('model') or 'word']
+        quiet = options.get('quiet', False)
+        
         if 'save' in options and options['save']:
             dryrun = False
         else:
             dryrun = True
-            self._print(
-                "*** DRY RUN! Use --save to save changes! ***",
-                options.get('quiet', False)
-            )
+            self._print("*** DRY RUN! Use --save to save changes! ***", quiet)
         
-        # try get word 1
+        # try get object 1
         try:
-            dest = Word.objects.get(slug=args[0])
-        except Word.DoesNotExist:
-            raise Word.DoesNotExist(u"Unable to find {}".format(args[0]))
+            dest = model.objects.get(slug=args[0])
+        except model.DoesNotExist:
+            raise model.DoesNotExist(u"Unable to find {}".format(args[0]))
             
-        # try get word 2
+        # try get object 2
         try:
-            source = Word.objects.get(slug=args[1])
-        except Word.DoesNotExist:
-            raise Word.DoesNotExist(u"Unable to find {}".format(args[1]))
+            source = model.objects.get(slug=args[1])
+        except model.DoesNotExist:
+            raise model.DoesNotExist(u"Unable to find {}".format(args[1]))
         
-        for obj in source.lexicon_set.all():
-            self._print(
-                u"Moving {} to {}".format(obj, dest),
-                options.get('quiet', False)
-            )
-            if not dryrun:
-                with reversion.create_revision():
-                    obj.word = dest
-                    obj.save()
+        if dryrun:
+            for field, rows in get_dependents(source):
+                count = rows.count()
+                if count:
+                    self._print(
+                        u"Moving {} {}.{} from {} to {}".format(
+                            count, field.model.__name__, field.name, source, dest
+                        ), quiet
+                    )
+            self._print("*** DRY RUN! Use --save to save changes! ***", quiet)
+            return
         
-        # remove word 2
-        if not dryrun:
-            assert source.lexicon_set.count() == 0
-            with reversion.create_revision():
+        editor = None
+        if options.get('editor'):
+            editor = User.objects.get(username=options['editor'])
+        for related, name, count in merge_objects(dest, source, editor):
+            if count:
                 self._print(
-                    "Deleting Word {}".format(source),
-                    options.get('quiet', False)
+                    u"Moved {} {}.{} to {}".format(count, related.__name__, name, dest),
+                    quiet
                 )
-                source.delete()
-        else:
-            self._print(
-                "*** DRY RUN! Use --save to save changes! ***",
-                options.get('quiet', False)
-            )
-            
+        self._print(u"Deleted {} {}".format(model.__name__, source), quiet)
+        
+        # the moved entries were updated in bulk, so recount them and their
+        # characters, and refresh the dossiers of their languages.
+        recount_lexicon(model, [dest.id])
+        if model == Source:
+            rebuild_inventory(sources=[dest.id], processes=1)
+            invalidate_dossiers(Language.objects.filter(lexicon__source=dest).distinct())
+        elif model == Language:
+            rebuild_inventory(languages=[dest.id], processes=1)
+            invalidate_dossiers([dest.id])
+        elif model == Word:
+            # the source's alignment and suggestions went with it, so realign
+            # the destination now that it has all the entries (suggestions
+            # are redone by the next suggest_cognates as the entries changed).
+            queue_alignment(dest.id, get_checksum(get_entries(dest.id)))
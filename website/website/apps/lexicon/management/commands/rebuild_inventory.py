@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from website.apps.lexicon.inventory import rebuild_inventory
+
+
+class Command(BaseCommand):
+    args = 'rebuild_inventory [--processes N]'
+    help = 'Recounts the character inventories of all sources and languages'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=None,
+            help='Number of worker processes (default: one per CPU)'
+        )
+    
+    def handle(self, *args, **options):
+        count = rebuild_inventory(processes=options['processes'])
+        self.stdout.write("Counted %d entries" % count)
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from website.apps.lexicon.counts import recount_lexicon, COUNTED
+
+
+class Command(BaseCommand):
+    args = 'recount_lexicon'
+    help = 'Corrects the lexicon counts of languages, sources and words'
+    
+    def handle(self, *args, **options):
+        for field, model in COUNTED:
+            count = recount_lexicon(model)
+            self.stdout.write("%s: corrected %d counts" % (model._meta.label, count))
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from website.apps.lexicon.models import Lexicon
+from website.apps.lexicon.segments import update_segments
+
+
+class Command(BaseCommand):
+    args = 'segment_entries [--source slug] [--all] [--processes N]'
+    help = 'Segments the entries that are new or have changed since they were last segmented'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--source',
+            action='store',
+            dest='source',
+            default=None,
+            help='Only segment the entries of the source with this slug'
+        )
+        parser.add_argument('--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help='Segment all entries again, even if unchanged'
+        )
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=None,
+            help='Number of worker processes (default: one per CPU)'
+        )
+    
+    def handle(self, *args, **options):
+        lexica = Lexicon.objects.all()
+        if options.get('source'):
+            lexica = lexica.filter(source__slug=options['source'])
+        count = sum(update_segments(
+            lexica, processes=options['processes'], force=options['all']
+        ))
+        self.stdout.write("Segmented %d entries" % count)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand, CommandError
+
+from website.apps.lexicon.models import Lexicon
+from website.apps.lexicon.similarity import find_similar, restrict
+
+
+class Command(BaseCommand):
+    args = 'similar query [--distance N] [--word slug] [--clade clade] [--source slug]'
+    help = 'Finds the entries within an edit distance of a form'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='the form to look for')
+        parser.add_argument('--distance',
+            action='store',
+            dest='distance',
+            type=int,
+            default=2,
+            help='Maximum edit distance (default: 2)'
+        )
+        parser.add_argument('--word',
+            action='store',
+            dest='word',
+            default=None,
+            help='Filter by word slug'
+        )
+        parser.add_argument('--clade',
+            action='store',
+            dest='clade',
+            default=None,
+            help='Filter by clade'
+        )
+        parser.add_argument('--source',
+            action='store',
+            dest='source',
+            default=None,
+            help='Filter by source slug'
+        )
+        parser.add_argument('--limit',
+            action='store',
+            dest='limit',
+            type=int,
+            default=None,
+            help='Show at most this many entries'
+        )
+    
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("similar needs a form to look for")
+        lexica = restrict(
+            Lexicon.objects.all(),
+            word=options.get('word'), clade=options.get('clade'), source=options.get('source')
+        )
+        for distance, lex in find_similar(
+            args[0], options['distance'], lexica, options.get('limit')
+        ):
+            self.stdout.write(u"\t".join([
+                '%d' % distance,
+                '%d' % lex.id,
+                lex.language.slug,
+                lex.word.slug,
+                lex.source.slug,
+                lex.entry
+            ]))
@@ -1,17 +1,42 @@
 # -*- coding: utf-8 -*-
+import json
+
 from reversion import revisions as reversion
-from optparse import make_option
+from django.db.models import Q
 from django.core.management.base import BaseCommand
 
 from website.apps.core.models import Language, Source
-from website.apps.lexicon.models import Word, Lexicon
+from website.apps.core.bulk import create_objects
+from website.apps.core.ngrams import index_objects
+from website.apps.lexicon.models import Word, Lexicon, Cognate
+from website.apps.lexicon.inventory import update_inventory
+from website.apps.lexicon.counts import update_counts
+from website.apps.pronouns.models import Pronoun
+
+# number of combined entries to split (and save in one revision) at a time.
+BATCH_SIZE = 250
+
+# the fields that tell the new entries apart (see `create_objects`).
+MATCH_FIELDS = ('language', 'source', 'word', 'entry', 'editor', 'added')
+
+
+def get_components(entry):
+    """Returns the components of a combined entry"""
+    if '/' in entry:
+        components = entry.split("/")
+    else:
+        components = entry.split(",")
+    components = [c.strip() for c in components]
+    for c in components:
+        assert len(c) > 0, "Unable to split properly - zero length component"
+    return components
 
 
 class Command(BaseCommand):
     args = 'split_entries --save [--word --language --source]'
     help = 'Splits Combined Lexical Entries'
     output_transaction = True
-    
+
     def add_arguments(self, parser):
         parser.add_argument('--save',
             action='store_true',
@@ -21,46 +46,44 @@ class Command(BaseCommand):
         )
         parser.add_argument('--language',
             action='store',
-            type='int',
+            type=int,
             dest='language',
             default=False,
             help='Filter by language_id'
         )
         parser.add_argument('--word',
             action='store',
-            type='int',
+            type=int,
             dest='word',
             default=False,
             help='Filter by word_id'
         )
         parser.add_argument('--source',
             action='store',
-            type='int',
+            type=int,
             dest='source',
             default=False,
             help='Filter by source_id'
         )
         parser.add_argument('--quiet',
             action='store_true',
-            dest='save',
+            dest='quiet',
             default=False,
             help='be quiet'
         )
-        
+
     def _print(self, message, quiet=False):
         """
         Wrapper to print to stdout, if it exists
-        
+
         (it won't exist if we're running tests)
         """
         if not quiet and hasattr(self, 'stdout'):
             self.stdout.write(message)
-    
+
     def find_combined(self, language=None, word=None, source=None, ignore_protoforms=True):
-        combined = []
-        
-        qset = Lexicon.objects.all().order_by('language')
-        
+        qset = Lexicon.objects.all().order_by('language', 'id')
+
         # filter on language if given a language.
         if language:
             qset = qset.filter(language=language)
@@ -70,70 +93,172 @@ class Command(BaseCommand):
         # filter on source if given a source.
         if source:
             qset = qset.filter(source=source)
-        
-        # remove protoforms 
+
+        # remove protoforms
         if ignore_protoforms:
             #qset = qset.exclude(entry__startswith="*")
             qset = qset.exclude(entry__regex=r'^\*\w+\(\w+[,/]\w+\)\w+')
-            
-        combined.extend(qset.filter(entry__icontains="/"))
-        combined.extend(qset.filter(entry__icontains=", "))
-        return combined
-    
-    def split_and_replace(self, obj, quiet=False):
-        if '/' in obj.entry:
-            components = obj.entry.split("/")
-        elif ',' in obj.entry:
-            components = obj.entry.split(",")
-        pks = []
-        for c in components:
-            c = c.strip()
-            assert len(c) > 0, "Unable to split properly - zero length component"
-            self._print("Splitting: %s -> %s" % (obj.entry, c), quiet)
+
+        return list(qset.filter(Q(entry__contains="/") | Q(entry__contains=", ")))
+
+    def get_plan(self, combined):
+        """
+        Returns a list of dictionaries describing how each of the `combined`
+        entries will be split, including how many cognates and pronouns will
+        be carried over to the new entries.
+        """
+        ids = [obj.id for obj in combined]
+        cognates, pronouns = {}, {}
+        for i in range(0, len(ids), BATCH_SIZE):
+            batch = ids[i:i + BATCH_SIZE]
+            for lex_id in Cognate.objects.filter(lexicon_id__in=batch).values_list('lexicon_id', flat=True):
+                cognates[lex_id] = cognates.get(lex_id, 0) + 1
+            for lex_id in Pronoun.entries.through.objects.filter(
+                lexicon_id__in=batch
+            ).values_list('lexicon_id', flat=True):
+                pronouns[lex_id] = pronouns.get(lex_id, 0) + 1
+
+        plan = []
+        for obj in combined:
+            step = {
+                'id': obj.id,
+                'language': obj.language_id,
+                'word': obj.word_id,
+                'source': obj.source_id,
+                'entry': obj.entry,
+                'cognates': cognates.get(obj.id, 0),
+                'pronouns': pronouns.get(obj.id, 0),
+            }
+            try:
+                step['components'] = get_components(obj.entry)
+            except AssertionError as e:
+                step['error'] = "%s" % e
+            plan.append(step)
+        return plan
+
+    def split_entries(self, combined, batch_size=BATCH_SIZE):
+        """
+        Replaces each of the `combined` entries by one entry per component,
+        copying their cognates and pronoun links to the new entries.
+
+        Each batch of entries is split in one revision. Raises AssertionError
+        if any entry can't be split. Returns a dictionary of
+        {old lexicon id: [new lexicon ids]}.
+        """
+        components = dict([(obj.id, get_components(obj.entry)) for obj in combined])
+        created = {}
+        for i in range(0, len(combined), batch_size):
+            batch = combined[i:i + batch_size]
             with reversion.create_revision():
-                o = Lexicon.objects.create(
-                    language=obj.language, 
-                    word=obj.word,
-                    source=obj.source,
-                    editor=obj.editor,
-                    entry=c
-                )
-                reversion.set_comment("Automatic split_entries has created this from: %r" % obj.id)
-                pks.append(o.id)
-        
-        # now delete old entry
-        with reversion.create_revision():
-            reversion.set_comment(
-                "Automatic split_entries has moved this item to: %s" % ",".join([str(p) for p in pks])
+                created.update(self._split_batch(batch, components))
+        return created
+
+    def _split_batch(self, batch, components):
+        ids = [obj.id for obj in batch]
+        new = [
+            Lexicon(
+                language_id=obj.language_id,
+                word_id=obj.word_id,
+                source_id=obj.source_id,
+                editor_id=obj.editor_id,
+                entry=c
+            ) for obj in batch for c in components[obj.id]
+        ]
+        create_objects(Lexicon, new, MATCH_FIELDS)
+
+        # map the old entries to the new ones (in the order they were made).
+        created, new = {}, iter(new)
+        for obj in batch:
+            created[obj.id] = [next(new) for c in components[obj.id]]
+
+        # carry over cognates...
+        cognates = [
+            Cognate(
+                lexicon=lex,
+                cognateset_id=cog.cognateset_id,
+                source_id=cog.source_id,
+                comment=cog.comment,
+                flag=cog.flag,
+                editor_id=cog.editor_id
             )
-            obj.delete()
-            
-        
+            for cog in Cognate.objects.filter(lexicon_id__in=ids)
+            for lex in created[cog.lexicon_id]
+        ]
+        Cognate.objects.bulk_create(cognates)
+
+        # ...and pronoun links.
+        through = Pronoun.entries.through
+        links = through.objects.filter(lexicon_id__in=ids)
+        pronoun_ids = set(links.values_list('pronoun_id', flat=True))
+        through.objects.bulk_create([
+            through(pronoun_id=pronoun_id, lexicon=lex)
+            for (pronoun_id, lex_id) in links.values_list('pronoun_id', 'lexicon_id')
+            for lex in created[lex_id]
+        ])
+
+        # record what we're deleting, as the delete won't.
+        for obj in batch:
+            reversion.add_to_revision(obj)
+        for cog in Cognate.objects.filter(lexicon_id__in=ids):
+            reversion.add_to_revision(cog)
+        Lexicon.objects.filter(id__in=ids).delete()
+
+        # bulk_create doesn't send post_save, so record the new rows ourselves.
+        new_ids = [lex.id for lexica in created.values() for lex in lexica]
+        new = list(Lexicon.objects.filter(id__in=new_ids))
+        for lex in new:
+            reversion.add_to_revision(lex)
+        update_inventory(added=[(lex.source_id, lex.language_id, lex.entry) for lex in new])
+        index_objects(Lexicon, [(lex.id, lex.entry) for lex in new])
+        update_counts(added=[(lex.language_id, lex.source_id, lex.word_id) for lex in new])
+        for cog in Cognate.objects.filter(lexicon_id__in=new_ids):
+            reversion.add_to_revision(cog)
+        for pronoun in Pronoun.objects.filter(id__in=pronoun_ids):
+            reversion.add_to_revision(pronoun)
+        reversion.set_comment(
+            "Automatic split_entries has split: %s" % ", ".join([
+                "%d -> %s" % (k, ",".join([str(lex.id) for lex in created[k]]))
+                for k in ids
+            ])
+        )
+        return dict([(k, [lex.id for lex in v]) for (k, v) in created.items()])
+
+    def split_and_replace(self, obj, quiet=False):
+        for c in get_components(obj.entry):
+            self._print("Splitting: %s -> %s" % (obj.entry, c), quiet)
+        return self.split_entries([obj])[obj.id]
+
     def handle(self, *args, **options):
         language = options.get('language', None)
         word = options.get('word', None)
         source = options.get('source', None)
-        
+
         if language:
             language = Language.objects.get(pk=language)
         if word:
             word = Word.objects.get(pk=word)
         if source:
             source = Source.objects.get(pk=source)
-        
+
         comb = self.find_combined(language=language, word=word, source=source)
-        
-        for obj in comb:
+        plan = self.get_plan(comb)
+
+        if not options.get('save', None):
+            # the plan, as one JSON object per line.
+            for step in plan:
+                self._print(json.dumps(step, sort_keys=True), options.get('quiet', False))
+            return
+
+        failed = set([step['id'] for step in plan if 'error' in step])
+        for step in plan:
             self._print(
-                "L.%3d W.%3d S.%3d: \t %r" % (
-                    obj.language.id,
-                    obj.word.id,
-                    obj.source.id, 
-                    obj.entry,
+                "L.%3d W.%3d S.%3d: \t %r%s" % (
+                    step['language'],
+                    step['word'],
+                    step['source'],
+                    step['entry'],
+                    " - %s" % step['error'] if 'error' in step else ''
                 ),
                 options.get('quiet', False)
             )
-        
-        if options.get('save', None):
-            for obj in comb:
-                self.split_and_replace(obj, options.get('quiet', False))
+        self.split_entries([obj for obj in comb if obj.id not in failed])
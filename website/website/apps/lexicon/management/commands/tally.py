@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from reversion import revisions as reversion
-from django.db.models import Count
 from optparse import make_option
 from django.core.management.base import BaseCommand
 
@@ -31,8 +30,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         tally = {}
         families = {}
-        languages = Language.objects.annotate(count=Count('lexicon')).all()
-        #languages = languages.filter(count__gt=0)
+        languages = Language.objects.all()
+        #languages = languages.filter(lexicon_count__gt=0)
         languages = languages.order_by("classification")
         
         prev_classif = None
@@ -41,11 +40,11 @@ class Command(BaseCommand):
             if lang.classification != prev_classif:
                 print(condense_classification(lang.classification))
             
-            if lang.count < 50:
+            if lang.lexicon_count < 50:
                 strength = '   '
-            elif lang.count < 100:
+            elif lang.lexicon_count < 100:
                 strength = '*  '
-            elif lang.count < 200:
+            elif lang.lexicon_count < 200:
                 strength = '** '
             else:
                 strength = '***'
@@ -55,7 +54,7 @@ class Command(BaseCommand):
                 '%3d' % count,
                 "%3s" % lang.isocode,
                 lang.ljust(50),
-                '%5d' % lang.count,
+                '%5d' % lang.lexicon_count,
                 strength
             ]))
             tally[strength] = tally.get(strength, 0) + 1
@@ -64,7 +63,7 @@ class Command(BaseCommand):
                 families[family] = families.get(family, 0) + 1
                 
             prev_classif = lang.classification
-            total += lang.count
+            total += lang.lexicon_count
             
         print('-' * 76)
         print('%d languages' % count)
@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
-from optparse import make_option
-from django.core.management.base import BaseCommand
+import io
+import os
+import shutil
+from collections import defaultdict
+from multiprocessing import Pool
 
-from website.apps.core.models import Language, Source
-from website.apps.lexicon.models import Word, Lexicon
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from website.apps.core.models import Language, Source, Clade
+from website.apps.lexicon.models import Word, Lexicon, Cognate
+from website.apps.lexicon.segments import get_segments
+
+# number of rows to fetch (and prefetch cognates for) at a time.
+CHUNK_SIZE = 2000
 
 
 def repr_cog(cog_id, source_id=None):
@@ -13,11 +24,20 @@ def repr_cog(cog_id, source_id=None):
         return "{0:x}".format(cog_id)
 
 
+def _write_shard(args):
+    # runs in a worker process: write one shard of the table to `path`.
+    filters, language_ids, path, segments = args
+    cmd = Command()
+    lexica = cmd.get_entries(**filters).filter(language_id__in=language_ids)
+    with io.open(path, 'w', encoding='utf8') as handle:
+        return cmd.write_table(lexica, handle, segments=segments)
+
+
 class Command(BaseCommand):
     args = 'write_table'
     help = 'writes a table of data'
     output_transaction = True
-    
+
     def add_arguments(self, parser):
         parser.add_argument('--language',
             action='store',
@@ -43,11 +63,36 @@ class Command(BaseCommand):
             default=False,
             help='Filter by clade'
         )
-    
+        parser.add_argument('--output',
+            action='store',
+            dest='output',
+            default=None,
+            help='Write to this file rather than stdout'
+        )
+        parser.add_argument('--shard',
+            action='store',
+            dest='shard',
+            default=None,
+            help='Only write shard i of n (given as i/n) of the languages'
+        )
+        parser.add_argument('--processes',
+            action='store',
+            dest='processes',
+            type=int,
+            default=1,
+            help='Write the languages in this many shards in parallel (needs --output)'
+        )
+        parser.add_argument('--segments',
+            action='store_true',
+            dest='segments',
+            default=False,
+            help='Add a column with the segmented entries'
+        )
+
     def get_entries(self, language=None, word=None, source=None, clade=None):
-        lexica = Lexicon.objects.all().select_related()
-        lexica = lexica.order_by('word').order_by('language')
-    
+        lexica = Lexicon.objects.all().select_related('language', 'word', 'source')
+        lexica = lexica.order_by('language', 'language_id', 'word', 'id')
+
         # filters
         if language:
             lexica = lexica.filter(
@@ -63,37 +108,136 @@ class Command(BaseCommand):
             )
         if clade:
             lexica = lexica.filter(
-                language__in=Language.objects.filter(
-                    classification__startswith=clade
-                )
+                language__in=Clade.objects.languages(clade)
             )
         return lexica
-    
-    def handle(self, *args, **options):
-        lexica = self.get_entries(
-            language=options.get('language', None),
-            word=options.get('word', None),
-            source=options.get('source', None),
-            clade=options.get('clade', None)
+
+    def get_shards(self, lexica, n):
+        """
+        Splits the languages in `lexica` into `n` consecutive runs (in the
+        order they are written) with roughly equal numbers of entries.
+        Returns a list of lists of language ids.
+        """
+        counts = dict(
+            lexica.order_by().values_list('language_id').annotate(count=Count('id'))
         )
-        
+        languages = Language.objects.filter(id__in=list(counts))
+        languages = languages.order_by('language', 'dialect', 'id')
+
+        shards, total, size = [[]], 0, sum(counts.values()) / float(n)
+        for lang_id in languages.values_list('id', flat=True):
+            if total >= size * len(shards) and len(shards) < n:
+                shards.append([])
+            shards[-1].append(lang_id)
+            total += counts[lang_id]
+        return shards + [[] for _ in range(n - len(shards))]
+
+    def get_chunks(self, lexica, size=CHUNK_SIZE):
+        """Yields lists of `size` entries, streaming them from the database"""
+        chunk = []
+        for lex in lexica.iterator():
+            chunk.append(lex)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get_cognates(self, chunk):
+        """Returns {lexicon id: [(cognate set id, source id)]} for a chunk of entries"""
+        cognates = defaultdict(list)
+        members = Cognate.objects.filter(lexicon_id__in=[lex.id for lex in chunk])
+        for lex_id, cog_id, source_id in members.values_list(
+            'lexicon_id', 'cognateset_id', 'source_id'
+        ):
+            cognates[lex_id].append((cog_id, source_id))
+        return cognates
+
+    def write_table(self, lexica, handle, chunk_size=CHUNK_SIZE, segments=False):
+        """
+        Writes `lexica` to the file-like `handle`, with a column of their
+        segments (see `website.apps.lexicon.segments`) if `segments`.
+        Returns the number of rows
+        """
         def detab(v):
             if v is None:
                 return ''
             else:
                 return v.replace("\t", "")
-        
-        for lex in lexica:
-            cogs = ",".join([
-                repr_cog(_.cognateset.id, _.source_id) for _ in lex.cognate_set.all()
-            ])
-            
-            print(u"\t".join([
-                "%s" % lex.id,
-                lex.language.slug,
-                lex.word.slug,
-                lex.source.slug,
-                detab(lex.entry),
-                detab(lex.annotation),
-                cogs
-            ]))
+
+        count = 0
+        for chunk in self.get_chunks(lexica, chunk_size):
+            cognates = self.get_cognates(chunk)
+            segmented = get_segments(chunk) if segments else {}
+            for lex in chunk:
+                cogs = ",".join([
+                    repr_cog(cog_id, source_id) for (cog_id, source_id) in cognates[lex.id]
+                ])
+                row = [
+                    "%s" % lex.id,
+                    lex.language.slug,
+                    lex.word.slug,
+                    lex.source.slug,
+                    detab(lex.entry),
+                    detab(lex.annotation),
+                    cogs
+                ]
+                if segments:
+                    row.append(segmented.get(lex.id, ''))
+                handle.write(u"\t".join(row) + u"\n")
+            count += len(chunk)
+        return count
+
+    def write_parallel(self, filters, lexica, output, processes, segments=False):
+        """Writes `processes` shards in parallel, then joins them into `output`"""
+        paths = ["%s.%d" % (output, i) for i in range(processes)]
+        jobs = [
+            (filters, shard, path, segments) for (shard, path) in
+            zip(self.get_shards(lexica, processes), paths)
+        ]
+        # the workers need their own database connections.
+        connections.close_all()
+        pool = Pool(processes)
+        try:
+            count = sum(pool.map(_write_shard, jobs))
+        finally:
+            pool.close()
+            pool.join()
+        with io.open(output, 'wb') as handle:
+            for path in paths:
+                with io.open(path, 'rb') as shard:
+                    shutil.copyfileobj(shard, handle)
+                os.remove(path)
+        return count
+
+    def handle(self, *args, **options):
+        filters = dict(
+            language=options.get('language', None),
+            word=options.get('word', None),
+            source=options.get('source', None),
+            clade=options.get('clade', None)
+        )
+        lexica = self.get_entries(**filters)
+
+        if options['processes'] > 1:
+            if not options['output']:
+                raise CommandError("--processes needs --output")
+            self.write_parallel(
+                filters, lexica, options['output'], options['processes'],
+                options.get('segments', False)
+            )
+            return
+
+        if options['shard']:
+            try:
+                i, n = [int(_) for _ in options['shard'].split('/')]
+                assert 1 <= i <= n
+            except (ValueError, AssertionError):
+                raise CommandError("--shard should be i/n e.g. 1/4")
+            lexica = lexica.filter(language_id__in=self.get_shards(lexica, n)[i - 1])
+
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf8') as handle:
+                self.write_table(lexica, handle, segments=options.get('segments', False))
+        else:
+            self.write_table(lexica, self.stdout, segments=options.get('segments', False))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:14
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lexicon', '0005_removing_concepticon_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Alignment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checksum', models.CharField(help_text='Hash of the aligned entries', max_length=40, unique=True)),
+                ('alignment', models.TextField(help_text='JSON list of [lexicon id, entry, [aligned segments]]')),
+                ('added', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'alignments',
+                'get_latest_by': 'added',
+            },
+        ),
+        migrations.CreateModel(
+            name='AlignmentQueue',
+            fields=[
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='lexicon.Word')),
+                ('checksum', models.CharField(help_text='Hash of the entries when queued', max_length=40)),
+                ('added', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, help_text='When a worker picked this up', null=True)),
+            ],
+            options={
+                'ordering': ['added'],
+                'db_table': 'alignment_queue',
+            },
+        ),
+        migrations.AddField(
+            model_name='alignment',
+            name='word',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lexicon.Word'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:29
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import Counter
+
+
+def build_inventory(apps, schema_editor):
+    Lexicon = apps.get_model("lexicon", "Lexicon")
+    SourceCharacter = apps.get_model("lexicon", "SourceCharacter")
+    LanguageCharacter = apps.get_model("lexicon", "LanguageCharacter")
+    sources, languages = Counter(), Counter()
+    rows = Lexicon.objects.values_list('source_id', 'language_id', 'entry')
+    for source_id, language_id, entry in rows.iterator():
+        for char in entry or '':
+            sources[(source_id, char)] += 1
+            languages[(language_id, char)] += 1
+    SourceCharacter.objects.bulk_create([
+        SourceCharacter(source_id=key, character=char, count=n)
+        for ((key, char), n) in sources.items()
+    ], batch_size=500)
+    LanguageCharacter.objects.bulk_create([
+        LanguageCharacter(language_id=key, character=char, count=n)
+        for ((key, char), n) in languages.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_clades'),
+        ('lexicon', '0006_alignments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LanguageCharacter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('character', models.CharField(max_length=4)),
+                ('count', models.IntegerField(default=0)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Language')),
+            ],
+            options={
+                'ordering': ['character'],
+                'db_table': 'inventory_languages',
+            },
+        ),
+        migrations.CreateModel(
+            name='SourceCharacter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('character', models.CharField(max_length=4)),
+                ('count', models.IntegerField(default=0)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Source')),
+            ],
+            options={
+                'ordering': ['character'],
+                'db_table': 'inventory_sources',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='sourcecharacter',
+            unique_together=set([('source', 'character')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='languagecharacter',
+            unique_together=set([('language', 'character')]),
+        ),
+        migrations.RunPython(build_inventory, migrations.RunPython.noop),
+    ]
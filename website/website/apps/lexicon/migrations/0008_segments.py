@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:35
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_clades'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lexicon', '0007_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrthographyProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added', models.DateTimeField(auto_now_add=True)),
+                ('profile', models.TextField(help_text='One grapheme per line, followed by a tab and the segment(s) it stands for if different (space separated, or NULL to drop it). Lines starting with # are ignored.')),
+                ('checksum', models.CharField(editable=False, help_text='Hash of the profile', max_length=40)),
+                ('editor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='orthography_profile', to='core.Source')),
+            ],
+            options={
+                'db_table': 'orthography_profiles',
+            },
+        ),
+        migrations.CreateModel(
+            name='Segmentation',
+            fields=[
+                ('lexicon', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='lexicon.Lexicon')),
+                ('segments', models.TextField(help_text='Space separated segments')),
+                ('checksum', models.CharField(help_text='Hash of the entry and orthography profile segmented', max_length=40)),
+            ],
+            options={
+                'db_table': 'lexicon_segments',
+            },
+        ),
+    ]
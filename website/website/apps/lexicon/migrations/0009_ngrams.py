@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:38
+from __future__ import unicode_literals
+
+import unicodedata
+
+from django.db import migrations
+
+
+def get_ngrams(text):
+    text = unicodedata.normalize('NFC', text or u'').lower()
+    return set([text[i:i + n] for n in (2, 3) for i in range(0, len(text) - n + 1)])
+
+
+def build_ngrams(apps, schema_editor):
+    NGram = apps.get_model("core", "NGram")
+    for label, field in [('lexicon.word', 'word'), ('lexicon.lexicon', 'entry')]:
+        model = apps.get_model(*label.split('.'))
+        chunk = []
+        for pk, text in model.objects.values_list('pk', field).iterator():
+            chunk.extend([NGram(model=label, object_id=pk, gram=g) for g in get_ngrams(text)])
+            if len(chunk) > 5000:
+                NGram.objects.bulk_create(chunk, batch_size=500)
+                chunk = []
+        NGram.objects.bulk_create(chunk, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ngrams'),
+        ('lexicon', '0008_segments'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_ngrams, migrations.RunPython.noop),
+    ]
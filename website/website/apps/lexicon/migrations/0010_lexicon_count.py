@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 16:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def count_lexicon(apps, schema_editor):
+    Lexicon = apps.get_model("lexicon", "Lexicon")
+    for field, label in [('language', 'core.Language'), ('source', 'core.Source'), ('word', 'lexicon.Word')]:
+        model = apps.get_model(*label.split('.'))
+        counts = {}
+        for pk, n in Lexicon.objects.values_list(field).annotate(n=models.Count('id')).order_by():
+            counts.setdefault(n, []).append(pk)
+        for n, pks in counts.items():
+            for i in range(0, len(pks), 500):
+                model.objects.filter(pk__in=pks[i:i + 500]).update(lexicon_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_lexicon_count'),
+        ('lexicon', '0009_ngrams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='lexicon_count',
+            field=models.IntegerField(db_index=True, default=0, editable=False, help_text='Number of lexical entries'),
+        ),
+        migrations.RunPython(count_lexicon, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 17:17
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lexicon', '0010_lexicon_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alignment',
+            name='checksum',
+            field=models.CharField(help_text='Hash of the aligned entries', max_length=40),
+        ),
+        migrations.AlterUniqueTogether(
+            name='alignment',
+            unique_together=set([('word', 'checksum')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 17:22
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lexicon', '0011_alignment_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alignment',
+            name='profile',
+            field=models.TextField(blank=True, default='', help_text='JSON list of {sound class: count} for each column'),
+        ),
+    ]
@@ -1,13 +1,19 @@
+import hashlib
+import json
+from collections import Counter
+
 from django.db import models
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.core.urlresolvers import reverse
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils import six
+from django.utils import timezone
 
 from watson import search as watson
 from reversion import revisions as reversion
 
-from website.apps.core.models import TrackedModel
+from website.apps.core.models import Language, Source
+from website.apps.core.models import TrackedModel, CountedModel, register_ngrams
 from website.apps.statistics.models import statistic
 from website.signals import create_redirect
 
@@ -38,7 +44,7 @@ WORD_QUALITY = (
 
 @python_2_unicode_compatible
 @reversion.register
-class Word(TrackedModel):
+class Word(CountedModel):
     """Word Details"""
     word = models.CharField(max_length=64, db_index=True, unique=True,
         help_text="Word in English")
@@ -288,6 +294,124 @@ class Concepticon(TrackedModel):
         db_table = 'concepticon'
 
 
+@python_2_unicode_compatible
+@reversion.register
+class OrthographyProfile(TrackedModel):
+    """
+    How the entries of a source are split into segments.
+    See `website.apps.lexicon.segments`.
+    """
+    source = models.OneToOneField('core.Source', related_name='orthography_profile')
+    profile = models.TextField(
+        help_text="One grapheme per line, followed by a tab and the segment(s) "
+                  "it stands for if different (space separated, or NULL to "
+                  "drop it). Lines starting with # are ignored."
+    )
+    checksum = models.CharField(max_length=40, editable=False,
+        help_text="Hash of the profile")
+    
+    def __str__(self):
+        return six.text_type("Orthography profile: %s" % self.source)
+    
+    def save(self, *args, **kwargs):
+        self.checksum = hashlib.sha1(self.profile.encode('utf8')).hexdigest()
+        super(OrthographyProfile, self).save(*args, **kwargs)
+    
+    class Meta:
+        db_table = 'orthography_profiles'
+
+
+class Alignment(models.Model):
+    """
+    Multiple alignment of a word's entries.
+    
+    `checksum` is the hash of the (lexicon id, entry) pairs that were aligned,
+    so the alignment is current as long as the word's entries hash the same.
+    It's only unique within a word, as words with the same entries (e.g. no
+    entries at all) hash the same. See `website.apps.lexicon.alignment`.
+    """
+    word = models.ForeignKey('Word')
+    checksum = models.CharField(max_length=40,
+        help_text="Hash of the aligned entries")
+    alignment = models.TextField(
+        help_text="JSON list of [lexicon id, entry, [aligned segments]]")
+    profile = models.TextField(blank=True, default='',
+        help_text="JSON list of {sound class: count} for each column")
+    added = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def get_rows(self):
+        return json.loads(self.alignment)
+    
+    def get_profile(self):
+        """Returns the profile of the alignment, or None if it wasn't stored"""
+        if not self.profile:
+            return None
+        return [Counter(column) for column in json.loads(self.profile)]
+    
+    class Meta:
+        db_table = 'alignments'
+        get_latest_by = 'added'
+        unique_together = ('word', 'checksum')
+
+
+class AlignmentQueue(models.Model):
+    """Words waiting to be (re-)aligned by the align_words command"""
+    word = models.OneToOneField('Word', primary_key=True)
+    checksum = models.CharField(max_length=40,
+        help_text="Hash of the entries when queued")
+    added = models.DateTimeField(default=timezone.now, db_index=True)
+    started = models.DateTimeField(blank=True, null=True,
+        help_text="When a worker picked this up")
+    
+    class Meta:
+        db_table = 'alignment_queue'
+        ordering = ['added', ]
+
+
+class SourceCharacter(models.Model):
+    """
+    Number of times a character occurs in the entries of a source.
+    See `website.apps.lexicon.inventory`.
+    """
+    source = models.ForeignKey('core.Source')
+    character = models.CharField(max_length=4)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'inventory_sources'
+        unique_together = ('source', 'character')
+        ordering = ['character', ]
+
+
+class LanguageCharacter(models.Model):
+    """
+    Number of times a character occurs in the entries of a language.
+    See `website.apps.lexicon.inventory`.
+    """
+    language = models.ForeignKey('core.Language')
+    character = models.CharField(max_length=4)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'inventory_languages'
+        unique_together = ('language', 'character')
+        ordering = ['character', ]
+
+
+class Segmentation(models.Model):
+    """
+    Cached segmentation of a lexical entry.
+    See `website.apps.lexicon.segments`.
+    """
+    lexicon = models.OneToOneField('Lexicon', primary_key=True)
+    segments = models.TextField(help_text="Space separated segments")
+    checksum = models.CharField(max_length=40,
+        help_text="Hash of the entry and orthography profile segmented")
+    
+    class Meta:
+        db_table = 'lexicon_segments'
+
+
 # pre-save adding of redirects when slug field altered.
 pre_save.connect(
     create_redirect, sender=Word, dispatch_uid="word:001"
@@ -296,6 +420,83 @@ pre_save.connect(
     create_redirect, sender=WordSubset, dispatch_uid="wordsubset:001"
 )
 
+# keep the character inventories and lexicon counts up to date.
+def remember_entry(sender, instance, **kwargs):
+    """
+    Stores the saved version of a Lexicon on `instance` for
+    `update_inventory` and `update_counts`
+    """
+    instance._inventory_row = instance._count_row = None
+    if instance.pk is not None:
+        saved = sender.objects.filter(pk=instance.pk).values_list(
+            'source_id', 'language_id', 'word_id', 'entry'
+        ).first()
+        if saved:
+            source_id, language_id, word_id, entry = saved
+            instance._inventory_row = (source_id, language_id, entry)
+            instance._count_row = (language_id, source_id, word_id)
+
+
+def add_to_inventory(sender, instance, **kwargs):
+    from website.apps.lexicon.inventory import update_inventory
+    row = (instance.source_id, instance.language_id, instance.entry)
+    old = getattr(instance, '_inventory_row', None)
+    if old != row:
+        update_inventory(removed=[old] if old else [], added=[row])
+
+
+def remove_from_inventory(sender, instance, **kwargs):
+    from website.apps.lexicon.inventory import update_inventory
+    update_inventory(removed=[(instance.source_id, instance.language_id, instance.entry)])
+
+
+def add_to_counts(sender, instance, **kwargs):
+    from website.apps.lexicon.counts import update_counts
+    row = (instance.language_id, instance.source_id, instance.word_id)
+    old = getattr(instance, '_count_row', None)
+    if old != row:
+        update_counts(removed=[old] if old else [], added=[row])
+
+
+def remove_from_counts(sender, instance, **kwargs):
+    from website.apps.lexicon.counts import update_counts
+    update_counts(removed=[(instance.language_id, instance.source_id, instance.word_id)])
+
+
+def recount_loaded(sender, instance, raw=False, **kwargs):
+    """Recounts objects loaded from fixtures or reverted, as their count may be stale"""
+    from website.apps.lexicon.counts import recount_lexicon
+    if raw:
+        recount_lexicon(sender, [instance.pk])
+
+
+pre_save.connect(remember_entry, sender=Lexicon, dispatch_uid="lexicon:inventory")
+post_save.connect(add_to_inventory, sender=Lexicon, dispatch_uid="lexicon:inventory")
+post_delete.connect(remove_from_inventory, sender=Lexicon, dispatch_uid="lexicon:inventory")
+post_save.connect(add_to_counts, sender=Lexicon, dispatch_uid="lexicon:counts")
+post_delete.connect(remove_from_counts, sender=Lexicon, dispatch_uid="lexicon:counts")
+post_save.connect(recount_loaded, sender=Language, dispatch_uid="lexicon:counts")
+post_save.connect(recount_loaded, sender=Source, dispatch_uid="lexicon:counts")
+post_save.connect(recount_loaded, sender=Word, dispatch_uid="lexicon:counts")
+
+
+def invalidate_entry_dossiers(sender, instance, **kwargs):
+    """
+    Deletes the dossier of the language of an entry edited in place (as
+    it may be in a pronoun paradigm). `update_counts` sees to the dossiers
+    of entries that are added, moved or deleted.
+    """
+    from website.apps.core.dossier import invalidate_dossiers
+    row = (instance.language_id, instance.source_id, instance.word_id)
+    if getattr(instance, '_count_row', None) == row:
+        invalidate_dossiers([instance.language_id])
+
+
+post_save.connect(invalidate_entry_dossiers, sender=Lexicon, dispatch_uid="lexicon:dossier")
+
+register_ngrams(Word, 'word')
+register_ngrams(Lexicon, 'entry')
+
 watson.register(Word, fields=('word', 'full'))
 watson.register(WordSubset, fields=('subset', 'description'))
 watson.register(Lexicon, fields=('entry', 'annotation'))
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Segmentation of lexical entries.
+
+Entries (or their phonological form, if given) are split into segments
+using the orthography profile of their source, if it has one. The result is
+cached in `Segmentation` along with a checksum of the form and the profile,
+so an entry is only segmented again when either of them changes.
+`get_segments` reads (and fills) the cache for a handful of entries, and
+`update_segments` fills it in bulk.
+"""
+import hashlib
+import unicodedata
+from collections import Counter
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+
+from django.db import connection, transaction
+from django.utils.encoding import force_text
+
+from website.apps.lexicon.models import Lexicon, OrthographyProfile, Segmentation
+
+# marks the boundary between words of a multi-word entry.
+WORD_BOUNDARY = '#'
+
+# combining characters that join the characters either side of them.
+TIES = (u'͡', u'͜')
+
+# number of entries to segment (and save) at a time.
+CHUNK_SIZE = 500
+
+
+def parse_profile(text):
+    """
+    Returns {grapheme: [segments]} for an orthography profile (see
+    `OrthographyProfile.profile`).
+    """
+    profile = {}
+    for line in (text or '').splitlines():
+        if not line.strip() or line.startswith('#') or line.startswith('Grapheme\t'):
+            continue
+        grapheme, _, segments = line.partition('\t')
+        grapheme = unicodedata.normalize('NFC', grapheme.strip())
+        segments = segments.strip() or grapheme
+        profile[grapheme] = [] if segments == 'NULL' else segments.split()
+    return profile
+
+
+def _is_modifier(char):
+    return unicodedata.combining(char) or unicodedata.category(char) in ('Lm', 'Sk', 'Mn')
+
+
+def segment(form, profile=None):
+    """
+    Splits `form` into a list of segments, matching the longest graphemes
+    in `profile` (from `parse_profile`) first. Anything not in the profile
+    becomes a segment of one character plus any diacritics that follow it.
+    """
+    form = unicodedata.normalize('NFC', force_text(form or '').strip())
+    profile = profile or {}
+    longest = max([len(g) for g in profile] + [0])
+    segments, i = [], 0
+    while i < len(form):
+        if form[i].isspace():
+            if segments and segments[-1] != WORD_BOUNDARY:
+                segments.append(WORD_BOUNDARY)
+            i += 1
+            continue
+
+        for n in range(min(longest, len(form) - i), 0, -1):
+            if form[i:i + n] in profile:
+                segments.extend(profile[form[i:i + n]])
+                i += n
+                break
+        else:
+            if _is_modifier(form[i]) and segments and segments[-1] != WORD_BOUNDARY:
+                # a diacritic on the last segment.
+                segments[-1] += form[i]
+                i += 1
+                continue
+            j = i + 1
+            while j < len(form) and (_is_modifier(form[j]) or form[j - 1] in TIES):
+                j += 1
+            segments.append(form[i:j])
+            i = j
+    return segments
+
+
+def get_checksum(form, profile_checksum=None):
+    """Returns a hash of a form and the checksum of the profile it's segmented with"""
+    return hashlib.sha1(
+        (u"%s\t%s" % (form or '', profile_checksum or '')).encode('utf8')
+    ).hexdigest()
+
+
+def _get_profiles(source_ids):
+    # {source id: (checksum, profile text)}
+    return dict([
+        (source_id, (checksum, text)) for (source_id, checksum, text) in
+        OrthographyProfile.objects.filter(source_id__in=source_ids).values_list(
+            'source_id', 'checksum', 'profile'
+        )
+    ])
+
+
+def _segment_rows(job):
+    # runs in the worker processes, so no database access in here.
+    rows, profiles = job
+    parsed = dict([(k, parse_profile(text)) for (k, text) in profiles.items()])
+    return [
+        (lex_id, checksum, u" ".join(segment(form, parsed.get(profile_checksum))))
+        for (lex_id, form, checksum, profile_checksum) in rows
+    ]
+
+
+def _find_stale(rows, profiles, force=False):
+    """
+    Returns the (lexicon id, form, checksum, profile checksum) of those of
+    `rows` (lexicon id, source id, entry, phon_entry) that need segmenting,
+    and the cached {lexicon id: segments} of the rest.
+    """
+    cached = {}
+    if not force:
+        cached = dict([
+            (lex_id, (checksum, segments)) for (lex_id, checksum, segments) in
+            Segmentation.objects.filter(lexicon_id__in=[r[0] for r in rows]).values_list(
+                'lexicon_id', 'checksum', 'segments'
+            )
+        ])
+    stale, fresh = [], {}
+    for lex_id, source_id, entry, phon_entry in rows:
+        form = phon_entry or entry
+        profile_checksum = profiles.get(source_id, (None, None))[0]
+        checksum = get_checksum(form, profile_checksum)
+        if lex_id in cached and cached[lex_id][0] == checksum:
+            fresh[lex_id] = cached[lex_id][1]
+        else:
+            stale.append((lex_id, form, checksum, profile_checksum))
+    return stale, fresh
+
+
+def _save_segments(results):
+    with transaction.atomic():
+        Segmentation.objects.filter(lexicon_id__in=[r[0] for r in results]).delete()
+        Segmentation.objects.bulk_create([
+            Segmentation(lexicon_id=lex_id, checksum=checksum, segments=segments)
+            for (lex_id, checksum, segments) in results
+        ])
+
+
+def get_segments(lexica):
+    """
+    Returns {lexicon id: space separated segments} for a list of Lexicon
+    objects, segmenting (and caching) any that are new or have changed.
+    """
+    segments = {}
+    profiles = _get_profiles(set([lex.source_id for lex in lexica]))
+    for i in range(0, len(lexica), CHUNK_SIZE):
+        rows = [
+            (lex.id, lex.source_id, lex.entry, lex.phon_entry)
+            for lex in lexica[i:i + CHUNK_SIZE]
+        ]
+        stale, fresh = _find_stale(rows, profiles)
+        segments.update(fresh)
+        if stale:
+            results = _segment_rows((stale, dict(profiles.values())))
+            _save_segments(results)
+            segments.update([(lex_id, s) for (lex_id, checksum, s) in results])
+    return segments
+
+
+def update_segments(lexica=None, processes=None, force=False, chunk_size=CHUNK_SIZE):
+    """
+    Segments all entries (or those in the queryset `lexica`) that are new
+    or have changed (or all of them if `force`), in a pool of `processes`
+    workers (defaults to one per CPU, `1` segments in this process).
+
+    This is a generator yielding the number of entries segmented in each
+    chunk as it is saved.
+    """
+    if lexica is None:
+        lexica = Lexicon.objects.all()
+    profiles = _get_profiles(OrthographyProfile.objects.values('source_id'))
+    texts = dict(profiles.values())
+
+    def get_jobs():
+        rows = lexica.order_by('id').values_list('id', 'source_id', 'entry', 'phon_entry')
+        chunk = []
+        for row in rows.iterator():
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                stale = _find_stale(chunk, profiles, force)[0]
+                if stale:
+                    yield (stale, texts)
+                chunk = []
+        if chunk:
+            stale = _find_stale(chunk, profiles, force)[0]
+            if stale:
+                yield (stale, texts)
+
+    pool = None
+    if processes != 1:
+        # don't let the workers inherit our database connection.
+        if not connection.in_atomic_block:
+            connection.close()
+        pool = Pool(processes)
+    jobs = get_jobs()
+    try:
+        while True:
+            batch = list(islice(jobs, processes or cpu_count()))
+            if not batch:
+                break
+            if pool is None:
+                results = map(_segment_rows, batch)
+            else:
+                results = pool.map(_segment_rows, batch)
+            for result in results:
+                _save_segments(result)
+                yield len(result)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def get_segment_inventory(rows):
+    """
+    Returns a list of (segment, count, unicode names) for a queryset of
+    Segmentation rows, like `website.apps.lexicon.inventory.get_inventory`.
+    """
+    counts = Counter()
+    for segments in rows.values_list('segments', flat=True).iterator():
+        counts.update([s for s in segments.split() if s != WORD_BOUNDARY])
+    inventory = []
+    for seg, count in sorted(counts.items()):
+        try:
+            name = u" + ".join([unicodedata.name(char) for char in seg])
+        except (ValueError, TypeError):
+            name = "<UNKNOWN>"
+        inventory.append((seg, count, name))
+    return inventory
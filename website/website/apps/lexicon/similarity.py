@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Similarity search over lexical entries.
+
+`find_similar` finds the entries within a given edit distance of a query.
+Candidates come from the n-gram index (see `website.apps.core.ngrams`): an
+entry within distance `k` of the query must still contain all but `k * n`
+of the query's distinct n-grams, as each edit can only destroy `n` of them.
+Queries too short for that to rule anything out fall back on the query's
+characters, of which each edit can only remove one. Only the candidates are
+compared with the query, using a Levenshtein distance restricted to a band
+around the diagonal (which also rules out entries of the wrong length, once
+they're normalised).
+"""
+import unicodedata
+
+from django.db.models import Count, Case, When, Q, Value, IntegerField
+
+from website.apps.core.models import NGram, Clade
+from website.apps.core.ngrams import normalize
+from website.apps.lexicon.models import Lexicon
+
+# the n-gram length used to find candidates (the index has bigrams and
+# trigrams, and bigrams give a usable threshold for shorter queries).
+NGRAM_SIZE = 2
+
+
+def levenshtein(a, b, limit=None):
+    """
+    Returns the edit distance between `a` and `b`, or None if it is more
+    than `limit`. With a `limit`, only the cells within `limit` of the
+    diagonal are computed.
+    """
+    if limit is None:
+        limit = max(len(a), len(b))
+    if abs(len(a) - len(b)) > limit:
+        return None
+    beyond = limit + 1
+    previous = [j if j <= limit else beyond for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [beyond] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            current[j] = min(
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+                previous[j] + 1,
+                current[j - 1] + 1,
+                beyond
+            )
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def get_candidates(lexica, query, distance):
+    """
+    Returns the entries in the queryset `lexica` that could be within
+    `distance` of `query`.
+    """
+    query = normalize(query)
+    grams = set([
+        query[i:i + NGRAM_SIZE] for i in range(0, len(query) - NGRAM_SIZE + 1)
+    ])
+    threshold = len(grams) - distance * NGRAM_SIZE
+    if threshold > 0:
+        matches = NGram.objects.filter(model='lexicon.lexicon', gram__in=grams)
+        matches = matches.values('object_id').annotate(n=Count('gram')).filter(n__gte=threshold)
+        return lexica.filter(pk__in=matches.values('object_id'))
+
+    characters = set(query)
+    threshold = len(characters) - distance
+    if threshold <= 0:
+        return lexica
+    # (SQLite only ignores the case of ASCII letters, and the entries
+    # aren't necessarily stored composed)
+    shared = sum([
+        Case(
+            When(
+                Q(entry__icontains=c) | Q(entry__contains=c.upper()) |
+                Q(entry__icontains=unicodedata.normalize('NFD', c)),
+                then=Value(1)
+            ),
+            default=Value(0), output_field=IntegerField()
+        ) for c in characters
+    ])
+    return lexica.annotate(shared=shared).filter(shared__gte=threshold)
+
+
+def restrict(lexica, word=None, clade=None, source=None):
+    """Restricts the queryset `lexica` to a word, clade and/or source (given by slug)"""
+    if word:
+        lexica = lexica.filter(word__slug=word)
+    if clade:
+        lexica = lexica.filter(language__in=Clade.objects.languages(clade))
+    if source:
+        lexica = lexica.filter(source__slug=source)
+    return lexica
+
+
+def find_similar(query, distance=2, lexica=None, limit=None, max_candidates=None):
+    """
+    Returns a list of (edit distance, Lexicon) for the entries in `lexica`
+    (default: all of them) within `distance` edits of `query`, ignoring
+    case, closest first. Returns at most `limit` results if given, and
+    only compares the first `max_candidates` candidates if given.
+    """
+    if lexica is None:
+        lexica = Lexicon.objects.all()
+    candidates = get_candidates(lexica, query, distance)
+    if max_candidates:
+        candidates = candidates.order_by('pk')[:max_candidates]
+    query = normalize(query)
+    results = []
+    for lex in candidates.select_related('language', 'word', 'source').iterator():
+        d = levenshtein(query, normalize(lex.entry), distance)
+        if d is not None:
+            results.append((d, lex))
+    results.sort(key=lambda r: (r[0], r[1].entry, r[1].id))
+    return results[:limit] if limit else results
@@ -4,7 +4,7 @@ from django.core.urlresolvers import reverse
 import django_tables2 as tables
 from django_tables2.utils import A  # alias for Accessor
 
-from website.apps.core.tables import DataTable
+from website.apps.core.tables import DataTable, KeysetMixin
 
 from website.apps.lexicon.models import Word, WordSubset, Lexicon
 
@@ -13,17 +13,17 @@ class WordIndexTable(DataTable):
     """Word Listing"""
     id = tables.LinkColumn('word-detail', args=[A('slug')], order_by=("id",))
     fullword = tables.LinkColumn('word-detail', args=[A('slug')], order_by=("word", "full"))
-    count = tables.Column()
+    count = tables.Column(accessor='lexicon_count')
     
     class Meta(DataTable.Meta):
         model = Word
         order_by = 'fullword' # default sorting
         sequence = ('id', 'fullword', 'count')
-        exclude = ('editor', 'word', 'full', 'added', 'slug', 'quality', 'comment', 'concepticon')
+        exclude = ('editor', 'word', 'full', 'added', 'slug', 'quality', 'comment', 'concepticon', 'lexicon_count')
     Meta.attrs['summary'] = 'Table of Words'
 
 
-class WordLexiconTable(DataTable):
+class WordLexiconTable(KeysetMixin, DataTable):
     """Lexicon table for Word pages"""
     id = tables.Column()
     language = tables.LinkColumn('language-detail', args=[A('language.slug')])
@@ -45,7 +45,7 @@ class WordLexiconTable(DataTable):
     Meta.attrs['summary'] = 'Table of Lexicon'
 
 
-class LanguageLexiconTable(DataTable):
+class LanguageLexiconTable(KeysetMixin, DataTable):
     """Lexicon table for Language pages"""
     id = tables.Column()
     source = tables.LinkColumn('source-detail', args=[A('source.slug')])
@@ -63,7 +63,7 @@ class LanguageLexiconTable(DataTable):
     Meta.attrs['summary'] = 'Table of Lexicon'
 
 
-class SourceLexiconTable(DataTable):
+class SourceLexiconTable(KeysetMixin, DataTable):
     """Lexicon table for Source pages"""
     id = tables.Column()
     language = tables.LinkColumn('language-detail', args=[A('language.slug')])
@@ -150,6 +150,7 @@ class AlignmentTable(WordLexiconTable):
     language = tables.LinkColumn('language-detail', args=[A('language.slug')])
     source = tables.LinkColumn('source-detail', args=[A('source.slug')])
     entry = tables.Column()
+    segments = tables.Column(attrs={"td": {"style": "font-family: monospace;"}})
     alignment = tables.Column(attrs={"td": {"style": "font-family: monospace;"}})
     annotation = tables.Column()
     loan = tables.BooleanColumn(null=False, yesno=('x', ''))
@@ -161,8 +162,57 @@ class AlignmentTable(WordLexiconTable):
     class Meta(WordLexiconTable.Meta):
         model = Lexicon
         order_by = 'word' # default sorting
-        sequence = ('id', 'language', 'entry', 'alignment', 'annotation', 'loan',  'source')
+        sequence = ('id', 'language', 'entry', 'segments', 'alignment', 'annotation', 'loan',  'source')
         exclude = ('editor', 'added', 'slug', 'phon_entry', 'loan_source', 'word', 'source_gloss')
     Meta.attrs['summary'] = 'Table of Lexicon'
 
 
+class SearchLexiconTable(DataTable):
+    """Lexicon table for substring searches"""
+    id = tables.LinkColumn('lexicon-detail', args=[A('id')])
+    language = tables.LinkColumn('language-detail', args=[A('language.slug')])
+    word = tables.LinkColumn('word-detail', args=[A('word.slug')])
+    source = tables.LinkColumn('source-detail', args=[A('source.slug')])
+    entry = tables.Column()
+    annotation = tables.Column()
+    
+    def render_language(self, record):
+        col = tables.LinkColumn('language-detail', args=[record.language.slug])
+        return col.render(value=record.language, record=record.language, bound_column=None)
+    
+    class Meta(DataTable.Meta):
+        model = Lexicon
+        order_by = 'entry' # default sorting
+        sequence = ('id', 'language', 'word', 'entry', 'annotation', 'source')
+        exclude = ('editor', 'added', 'slug', 'phon_entry', 'loan_source', 'source_gloss', 'loan')
+    Meta.attrs['summary'] = 'Table of Lexicon'
+
+
+class SimilarLexiconTable(SearchLexiconTable):
+    """Lexicon table for similarity searches"""
+    id = tables.LinkColumn('lexicon-detail', args=[A('id')])
+    language = tables.LinkColumn('language-detail', args=[A('language.slug')])
+    word = tables.LinkColumn('word-detail', args=[A('word.slug')])
+    source = tables.LinkColumn('source-detail', args=[A('source.slug')])
+    entry = tables.Column()
+    distance = tables.Column()
+    annotation = tables.Column()
+    
+    class Meta(SearchLexiconTable.Meta):
+        model = Lexicon
+        order_by = 'distance' # default sorting
+        sequence = ('id', 'language', 'word', 'entry', 'distance', 'annotation', 'source')
+    Meta.attrs['summary'] = 'Table of Lexicon'
+
+
+class InventoryTable(DataTable):
+    """Character inventory of a source or language"""
+    character = tables.Column(attrs={"td": {"style": "font-family: monospace;"}})
+    count = tables.Column()
+    name = tables.Column(verbose_name="Unicode Name")
+    
+    class Meta(DataTable.Meta):
+        order_by = 'character' # default sorting
+        sequence = ('character', 'count', 'name')
+    Meta.attrs['summary'] = 'Table of Characters'
+
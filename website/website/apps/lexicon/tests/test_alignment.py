@@ -0,0 +1,215 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.test.client import Client
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+
+from website.apps.lexicon.tests import DataMixin
+from website.apps.lexicon.models import Word, Lexicon, Alignment, AlignmentQueue
+from website.apps.lexicon.alignment import get_checksum, get_entries, align_entries
+from website.apps.lexicon.alignment import get_alignment, claim_alignments
+from website.apps.lexicon.alignment import run_alignments, ALIGNMENT_TIMEOUT
+from website.apps.lexicon.alignment import realign_entries, get_profile, GAP
+
+
+class AlignmentMixin(DataMixin):
+    @classmethod
+    def setUpTestData(cls):
+        super(AlignmentMixin, cls).setUpTestData()
+        Lexicon.objects.filter(pk=cls.lexicon2.pk).update(entry='lima')
+        Lexicon.objects.filter(pk=cls.lexicon3.pk).update(entry='lma')
+
+
+class Test_Alignment(AlignmentMixin, TestCase):
+    """Tests the alignment store"""
+    def test_align_entries(self):
+        rows = align_entries([(2, 'lima'), (1, 'lma'), (3, '')])
+        assert [r[0] for r in rows] == [1, 2, 3]
+        assert "".join(rows[0][2]) == 'l-ma'
+        assert "".join(rows[1][2]) == 'lima'
+        assert rows[2] == (3, '', [])
+    
+    def test_unalignable(self):
+        rows = align_entries([(1, 'lima'), (2, '??')])
+        assert rows[1] == (2, '??', [])
+    
+    def test_queues_new_word(self):
+        alignment, pending = get_alignment(self.word2)
+        assert alignment is None
+        assert pending
+        job = AlignmentQueue.objects.get(word=self.word2)
+        assert job.checksum == get_checksum(get_entries(self.word2.id))
+    
+    def test_queues_once(self):
+        get_alignment(self.word2)
+        get_alignment(self.word2)
+        assert AlignmentQueue.objects.count() == 1
+    
+    def test_run_alignments(self):
+        get_alignment(self.word2)
+        assert list(run_alignments(processes=1)) == [(self.word2.id, 2)]
+        assert AlignmentQueue.objects.count() == 0
+        alignment, pending = get_alignment(self.word2)
+        assert not pending
+        assert sorted([r[1] for r in alignment.get_rows()]) == ['lima', 'lma']
+    
+    def test_pool(self):
+        get_alignment(self.word1)
+        get_alignment(self.word2)
+        assert sorted(run_alignments(processes=2)) == [(self.word1.id, 1), (self.word2.id, 2)]
+    
+    def test_serves_last_alignment_while_pending(self):
+        get_alignment(self.word2)
+        list(run_alignments(processes=1))
+        old = Alignment.objects.get(word=self.word2)
+        Lexicon.objects.filter(pk=self.lexicon2.pk).update(entry='lama')
+        alignment, pending = get_alignment(self.word2)
+        assert pending
+        assert alignment == old
+        assert AlignmentQueue.objects.filter(word=self.word2).exists()
+        # and realigning replaces it.
+        list(run_alignments(processes=1))
+        alignment, pending = get_alignment(self.word2)
+        assert not pending
+        assert Alignment.objects.filter(word=self.word2).count() == 1
+    
+    def test_realigns_incrementally(self):
+        get_alignment(self.word2)
+        list(run_alignments(processes=1))
+        Lexicon.objects.create(
+            language=self.lang2, source=self.source1, word=self.word2,
+            entry='limpa', editor=self.editor
+        )
+        get_alignment(self.word2)
+        assert list(run_alignments(processes=1)) == [(self.word2.id, 3)]
+        alignment = Alignment.objects.get(word=self.word2)
+        rows = alignment.get_rows()
+        assert ["".join(r[2]) for r in rows] == ['lim-a', 'l-m-a', 'limpa']
+        assert alignment.get_profile() == get_profile(rows)
+    
+    def test_changed_while_queued(self):
+        get_alignment(self.word2)
+        Lexicon.objects.filter(pk=self.lexicon2.pk).update(entry='lama')
+        assert len(list(run_alignments(processes=1))) == 1
+        assert AlignmentQueue.objects.count() == 0
+        alignment, pending = get_alignment(self.word2)
+        assert not pending
+    
+    def test_claim_skips_started(self):
+        get_alignment(self.word2)
+        assert len(claim_alignments()) == 1
+        assert len(claim_alignments()) == 0
+        # ...unless the worker has died
+        AlignmentQueue.objects.update(started=timezone.now() - ALIGNMENT_TIMEOUT - timedelta(minutes=1))
+        assert len(claim_alignments()) == 1
+    
+    def test_words_without_entries(self):
+        # these all have the same checksum.
+        empty = [
+            Word.objects.create(word=w, slug=w, editor=self.editor) for w in ('a', 'b')
+        ]
+        for word in empty:
+            get_alignment(word)
+        list(run_alignments(processes=1))
+        assert AlignmentQueue.objects.count() == 0
+        for word in empty:
+            alignment, pending = get_alignment(word)
+            assert alignment.word == word
+            assert not pending
+
+
+class Test_WordAlignment(AlignmentMixin, TestCase):
+    """Tests the word_alignment view"""
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username="admin", password="test")
+        self.url = reverse('word-alignment', kwargs={'slug': self.word2.slug})
+    
+    def test_pending(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        assert response.context['pending']
+        assert b'waiting to be aligned' in response.content
+        assert AlignmentQueue.objects.filter(word=self.word2).exists()
+    
+    def test_aligned(self):
+        get_alignment(self.word2)
+        list(run_alignments(processes=1))
+        response = self.client.get(self.url)
+        assert not response.context['pending']
+        assert sorted([r.alignment for r in response.context['lexicon'].data.data]) == ['l-ma', 'lima']
+
+
+class Test_Realign(TestCase):
+    """Tests incremental realignment"""
+    def setUp(self):
+        self.entries = [(1, 'lima'), (2, 'lma'), (3, 'rima'), (4, 'lina')]
+        self.previous = align_entries(self.entries)
+    
+    def check(self, rows, profile=None):
+        # all rows are the same width and just the entry plus gaps
+        widths = set([len(r[2]) for r in rows if r[2]])
+        assert len(widths) == 1, widths
+        for lex_id, entry, segments in rows:
+            assert "".join([s for s in segments if s != GAP]) == entry
+        # and the profile was kept up to date.
+        if profile is not None:
+            assert profile == get_profile(rows)
+    
+    def test_unchanged(self):
+        rows, profile, incremental = realign_entries(self.previous, self.entries)
+        assert incremental
+        assert rows == self.previous
+    
+    def test_add(self):
+        entries = self.entries + [(5, 'limpa')]
+        rows, profile, incremental = realign_entries(self.previous, entries)
+        assert incremental
+        assert [r[0] for r in rows] == [1, 2, 3, 4, 5]
+        self.check(rows, profile)
+        # a new column for the p
+        assert len(rows[0][2]) == len(self.previous[0][2]) + 1
+    
+    def test_remove(self):
+        rows, profile, incremental = realign_entries(self.previous, self.entries[0:3] + [(5, 'lima')])
+        assert incremental
+        assert [r[0] for r in rows] == [1, 2, 3, 5]
+        self.check(rows, profile)
+    
+    def test_remove_drops_empty_columns(self):
+        previous = align_entries(self.entries + [(5, 'limpa')])
+        assert len(previous[0][2]) == 5
+        # lina and limpa are the only entries in the n/p column.
+        rows, profile, incremental = realign_entries(previous, self.entries[0:3])
+        assert incremental
+        assert len(rows[0][2]) == 4
+        self.check(rows, profile)
+    
+    def test_change(self):
+        entries = [(1, 'lima'), (2, 'lma'), (3, 'rima'), (4, 'lama')]
+        rows, profile, incremental = realign_entries(self.previous, entries)
+        assert incremental
+        assert dict([(r[0], r[1]) for r in rows]) == dict(entries)
+        self.check(rows, profile)
+    
+    def test_stored_profile(self):
+        # the profile of the previous alignment is used rather than rebuilt.
+        entries = self.entries + [(5, 'limpa'), (6, 'lim')]
+        rows, profile, incremental = realign_entries(
+            self.previous, entries, profile=get_profile(self.previous)
+        )
+        assert incremental
+        self.check(rows, profile)
+    
+    def test_too_many_changes(self):
+        entries = [(5, 'tangan'), (6, u'ta\u014ban'), (7, 'lima')]
+        rows, profile, incremental = realign_entries(self.previous, entries)
+        assert not incremental
+        assert rows == align_entries(entries)
+    
+    def test_quality_drop(self):
+        entries = self.entries + [(5, 'kukukukuku')]
+        rows, profile, incremental = realign_entries(self.previous, entries)
+        assert not incremental
+        self.check(rows)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import six
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Source, Language
+from website.apps.lexicon.models import Word, Lexicon
+from website.apps.lexicon.counts import recount_lexicon
+from website.apps.core.dossier import get_dossier
+
+from website.apps.lexicon.management.commands import split_entries
+
+
+class Test_Counts(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word1 = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.word2 = Word.objects.create(word='Five', slug='five', editor=cls.editor)
+        cls.lang1 = Language.objects.create(
+            language='A', slug='langa', isocode='aaa', editor=cls.editor
+        )
+        cls.lang2 = Language.objects.create(
+            language='B', slug='langb', isocode='bbb', editor=cls.editor
+        )
+        cls.source1 = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+        cls.source2 = Source.objects.create(
+            year="1992", author='Jones', slug='Jones1992', editor=cls.editor
+        )
+
+    def add(self, entry='lima', language=None, source=None, word=None):
+        return Lexicon.objects.create(
+            language=language or self.lang1, source=source or self.source1,
+            word=word or self.word1, editor=self.editor, entry=entry
+        )
+
+    def counts(self):
+        return (
+            dict(Language.objects.values_list('slug', 'lexicon_count')),
+            dict(Source.objects.values_list('slug', 'lexicon_count')),
+            dict(Word.objects.values_list('slug', 'lexicon_count')),
+        )
+
+    def actual(self):
+        return (
+            dict([(o.slug, o.lexicon_set.count()) for o in Language.objects.all()]),
+            dict([(o.slug, o.lexicon_set.count()) for o in Source.objects.all()]),
+            dict([(o.slug, o.lexicon_set.count()) for o in Word.objects.all()]),
+        )
+
+    def test_added(self):
+        self.add()
+        self.add(language=self.lang2)
+        assert self.counts() == (
+            {'langa': 1, 'langb': 1},
+            {'Smith1991': 2, 'Jones1992': 0},
+            {'hand': 2, 'five': 0}
+        )
+
+    def test_moved(self):
+        lex = self.add()
+        lex.language = self.lang2
+        lex.source = self.source2
+        lex.word = self.word2
+        lex.save()
+        assert self.counts() == (
+            {'langa': 0, 'langb': 1},
+            {'Smith1991': 0, 'Jones1992': 1},
+            {'hand': 0, 'five': 1}
+        )
+
+    def test_changed_entry(self):
+        lex = self.add()
+        lex.entry = 'rima'
+        lex.save()
+        assert self.counts() == self.actual()
+
+    def test_deleted(self):
+        self.add()
+        self.add().delete()
+        assert self.counts() == self.actual()
+
+    def test_language_deleted(self):
+        self.add(language=self.lang2)
+        Language.objects.get(pk=self.lang2.pk).delete()
+        assert self.counts() == self.actual()
+
+    def test_stale_save(self):
+        # saving an object loaded before its entries were added keeps the count.
+        language = Language.objects.get(pk=self.lang1.pk)
+        self.add()
+        language.information = 'changed'
+        language.save()
+        assert Language.objects.get(pk=self.lang1.pk).lexicon_count == 1
+        assert Language.objects.get(pk=self.lang1.pk).information == 'changed'
+
+    def test_recount(self):
+        self.add()
+        self.add(word=self.word2)
+        Word.objects.update(lexicon_count=99)
+        assert recount_lexicon(Word) == 2
+        assert self.counts() == self.actual()
+        assert recount_lexicon(Word) == 0
+
+    def test_recount_some(self):
+        self.add()
+        Word.objects.update(lexicon_count=99)
+        assert recount_lexicon(Word, [self.word2.pk]) == 1
+        assert Word.objects.get(pk=self.word1.pk).lexicon_count == 99
+        assert Word.objects.get(pk=self.word2.pk).lexicon_count == 0
+
+    def test_command(self):
+        self.add()
+        Source.objects.update(lexicon_count=5)
+        out = six.StringIO()
+        call_command('recount_lexicon', stdout=out)
+        assert 'core.Source: corrected 2 counts' in out.getvalue()
+        assert self.counts() == self.actual()
+
+    def test_split_entries(self):
+        self.add('mata/mala')
+        cmd = split_entries.Command()
+        cmd.split_entries(cmd.find_combined())
+        assert self.counts()[0]['langa'] == 2
+        assert self.counts() == self.actual()
+
+    def test_mergeword(self):
+        self.add(word=self.word1)
+        self.add(word=self.word2)
+        call_command('mergeword', 'hand', 'five', save=True, quiet=True)
+        assert self.counts()[2] == {'hand': 2}
+        assert self.counts() == self.actual()
+
+    def test_index_sorted_by_count(self):
+        self.add(word=self.word2)
+        response = Client().get(reverse('word-index'), {'sort': '-count'})
+        self.assertEqual(response.status_code, 200)
+        rows = [(r.slug, r.lexicon_count) for r in response.context['table'].page.object_list.data]
+        assert rows == [('five', 1), ('hand', 0)]
+
+    def test_language_index(self):
+        self.add(language=self.lang2)
+        response = Client().get(reverse('language-index'), {'sort': '-count'})
+        self.assertEqual(response.status_code, 200)
+        assert [r.slug for r in response.context['table'].page.object_list.data] == ['langb', 'langa']
+
+
+class Test_Dossiers(TestCase):
+    """The counts and sources in the language dossiers follow the entries"""
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word1 = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.lang1 = Language.objects.create(language='A', slug='langa', editor=cls.editor)
+        cls.lang2 = Language.objects.create(language='B', slug='langb', editor=cls.editor)
+        cls.source1 = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+        cls.source2 = Source.objects.create(
+            year="1992", author='Jones', slug='Jones1992', editor=cls.editor
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    add = Test_Counts.__dict__['add']
+
+    def sources(self, slug):
+        return [s.slug for s in get_dossier(slug)['sources_used']]
+
+    def test_added(self):
+        assert self.sources('langa') == []
+        self.add()
+        assert self.sources('langa') == ['Smith1991']
+        assert get_dossier('langa')['language'].lexicon_count == 1
+
+    def test_moved(self):
+        lex = self.add()
+        assert self.sources('langa') == ['Smith1991']
+        assert self.sources('langb') == []
+        lex.language, lex.source = self.lang2, self.source2
+        lex.save()
+        assert self.sources('langa') == []
+        assert self.sources('langb') == ['Jones1992']
+
+    def test_deleted(self):
+        lex = self.add()
+        assert self.sources('langa') == ['Smith1991']
+        lex.delete()
+        assert self.sources('langa') == []
+        assert get_dossier('langa')['language'].lexicon_count == 0
+
+    def test_source_renamed(self):
+        self.add()
+        assert [str(s) for s in get_dossier('langa')['sources_used']] == ['Smith (1991)']
+        source = Source.objects.get(pk=self.source1.pk)
+        source.author = 'Smyth'
+        source.save()
+        assert [str(s) for s in get_dossier('langa')['sources_used']] == ['Smyth (1991)']
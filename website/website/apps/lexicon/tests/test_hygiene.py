@@ -1,5 +1,13 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.test.client import Client
+from django.utils import six
+from reversion.models import Version
 
 from django.contrib.auth.models import User
 from website.apps.core.models import Source, Language
@@ -199,6 +207,75 @@ class Test_Duplicates(HygieneDataMixin):
         assert len(dupes) == 0
 
 
+    def test_find_many(self):
+        dupes = [
+            Lexicon.objects.create(
+                language=self.lang, word=self.word, source=self.source,
+                editor=self.editor, entry=entry
+            ) for entry in (self.good1.entry, self.good1.entry, self.good2.entry)
+        ]
+        cmd = hygiene.Command()
+        with self.assertNumQueries(1):
+            ids = list(cmd.find_duplicate_ids())
+        assert ids == [d.id for d in dupes]
+
+    def test_delete_records_revision(self):
+        dupe1 = Lexicon.objects.create(
+            language=self.good1.language,
+            word=self.good1.word,
+            source=self.good1.source,
+            editor=self.good1.editor,
+            entry=self.good1.entry
+        )
+        cmd = hygiene.Command()
+        cmd.delete(cmd.find_duplicates())
+        assert not Lexicon.objects.filter(pk=dupe1.id).exists()
+        assert Version.objects.get_for_object_reference(Lexicon, dupe1.id).count() == 1
+
+
+class Test_NearDuplicates(HygieneDataMixin):
+    """Tests the hygiene management command - near duplicates"""
+
+    def add(self, entry, **kwargs):
+        kwargs.setdefault('language', self.lang)
+        kwargs.setdefault('word', self.word)
+        return Lexicon.objects.create(
+            source=self.source, editor=self.editor, entry=entry, **kwargs
+        )
+
+    def test_fold_entry(self):
+        assert hygiene.fold_entry(u"  ma\u0301ta  ") == u"mata"
+        assert hygiene.fold_entry(u"m\xe1ta") == u"mata"
+        assert hygiene.fold_entry(u"a \t  word") == u"a word"
+        assert hygiene.fold_entry(u"\uff41") == u"a"  # fullwidth a
+
+    def test_find(self):
+        variant = self.add(u"a  w\xf3rd")
+        cmd = hygiene.Command()
+        assert cmd.find_near_duplicates() == [(variant.id, self.good2.id)]
+
+    def test_exact_duplicates_ignored(self):
+        self.add(self.good2.entry)
+        cmd = hygiene.Command()
+        assert cmd.find_near_duplicates() == []
+
+    def test_not_near_duplicate_if_different_word(self):
+        newword = Word.objects.create(
+            word='Banana', slug='banana', full='Yum', editor=self.editor
+        )
+        self.add(u"a  w\xf3rd", word=newword)
+        cmd = hygiene.Command()
+        assert cmd.find_near_duplicates() == []
+
+    def test_command(self):
+        variant = self.add(u"a  w\xf3rd")
+        out = six.StringIO()
+        call_command('hygiene', 'near', save=True, stdout=out)
+        assert 'Near Duplicate: %d/%d' % (variant.id, self.good2.id) in out.getvalue()
+        # never deleted.
+        assert Lexicon.objects.filter(pk=variant.id).exists()
+
+
 class Test_FindUnstarred(HygieneDataMixin):
     """Tests the hygiene management command - find_unstarred"""
     def setUp(self):
@@ -230,4 +307,90 @@ class Test_FindUnstarred(HygieneDataMixin):
         assert forms[0] == self.unstarred
 
 
+class Test_Tidy(HygieneDataMixin):
+    """Tests the hygiene management command - tidy"""
+    def setUp(self):
+        super(Test_Tidy, self).setUp()
+        self.mojibake = Lexicon.objects.create(
+            language=self.lang, word=self.word, source=self.source,
+            editor=self.editor, entry=u"caf\xc3\xa9"
+        )
+        self.quoted = Lexicon.objects.create(
+            language=self.lang, word=self.word, source=self.source,
+            editor=self.editor, entry=u" \u201cquoted\u201d "
+        )
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tmpdir, 'tidy.checkpoint')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(Test_Tidy, self).tearDown()
+
+    def test_tidy(self):
+        cmd = hygiene.Command()
+        tidied = [t for (last, chunk) in cmd.tidy(chunk_size=3) for t in chunk]
+        self.assertEqual(tidied, [
+            (self.mojibake.id, u"caf\xc3\xa9", u"caf\xe9"),
+            (self.quoted.id, u" \u201cquoted\u201d ", u'"quoted"'),
+        ])
+
+    def test_tidy_chunks(self):
+        cmd = hygiene.Command()
+        chunks = list(cmd.tidy(chunk_size=3))
+        assert len(chunks) == 4  # 10 entries
+        assert [last for (last, chunk) in chunks] == [
+            Lexicon.objects.order_by('id')[i].id for i in (2, 5, 8, 9)
+        ]
+
+    def test_tidy_start(self):
+        cmd = hygiene.Command()
+        tidied = [t for (last, chunk) in cmd.tidy(start=self.mojibake.id) for t in chunk]
+        assert [t[0] for t in tidied] == [self.quoted.id]
+
+    def test_tidy_processes(self):
+        cmd = hygiene.Command()
+        self.assertEqual(
+            list(cmd.tidy(chunk_size=2, processes=2)),
+            list(cmd.tidy(chunk_size=2, processes=1))
+        )
+
+    def test_save_tidied(self):
+        cmd = hygiene.Command()
+        cmd.save_tidied([t for (last, chunk) in cmd.tidy() for t in chunk])
+        assert Lexicon.objects.get(pk=self.mojibake.id).entry == u"caf\xe9"
+        assert Lexicon.objects.get(pk=self.quoted.id).entry == u'"quoted"'
+        assert Lexicon.objects.get(pk=self.good1.id).entry == self.good1.entry
+        versions = Version.objects.get_for_object(self.mojibake)
+        assert versions.count() == 1
+        assert versions[0].revision == Version.objects.get_for_object(self.quoted)[0].revision
+
+    def test_save_tidied_skips_edited(self):
+        cmd = hygiene.Command()
+        tidied = [t for (last, chunk) in cmd.tidy() for t in chunk]
+        Lexicon.objects.filter(pk=self.mojibake.id).update(entry='edited')
+        cmd.save_tidied(tidied)
+        assert Lexicon.objects.get(pk=self.mojibake.id).entry == 'edited'
+        assert Lexicon.objects.get(pk=self.quoted.id).entry == u'"quoted"'
+
+    def test_command_resumes_from_checkpoint(self):
+        with open(self.checkpoint, 'w') as handle:
+            handle.write("%d\n" % self.mojibake.id)
+        out = six.StringIO()
+        call_command('hygiene', 'tidy', save=True, checkpoint=self.checkpoint, stdout=out)
+        assert Lexicon.objects.get(pk=self.mojibake.id).entry == u"caf\xc3\xa9"
+        assert Lexicon.objects.get(pk=self.quoted.id).entry == u'"quoted"'
+        assert 'Resuming after entry %d' % self.mojibake.id in out.getvalue()
+        # and is removed when finished.
+        assert not os.path.exists(self.checkpoint)
+
+    def test_command_writes_checkpoint(self):
+        cmd = hygiene.Command()
+        cmd.write_checkpoint(self.checkpoint, 42)
+        assert cmd.read_checkpoint(self.checkpoint) == 42
+        assert cmd.read_checkpoint(None) == 0
 
+    def test_command_dry_run(self):
+        out = six.StringIO()
+        call_command('hygiene', 'tidy', stdout=out)
+        assert Lexicon.objects.get(pk=self.mojibake.id).entry == u"caf\xc3\xa9"
+        assert out.getvalue().count('Tidied:') == 2
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import six
+from django.utils.encoding import force_text
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Source, Language
+from website.apps.lexicon.models import Word, Lexicon, SourceCharacter, LanguageCharacter
+from website.apps.lexicon.inventory import count_characters, rebuild_inventory
+
+from website.apps.lexicon.management.commands import hygiene, split_entries
+
+
+class Test_Inventory(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.lang1 = Language.objects.create(
+            language='A', slug='langa', isocode='aaa', editor=cls.editor
+        )
+        cls.lang2 = Language.objects.create(
+            language='B', slug='langb', isocode='bbb', editor=cls.editor
+        )
+        cls.source1 = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+        cls.source2 = Source.objects.create(
+            year="1992", author='Jones', slug='Jones1992', editor=cls.editor
+        )
+
+    def add(self, entry, language=None, source=None):
+        return Lexicon.objects.create(
+            language=language or self.lang1, source=source or self.source1,
+            word=self.word, editor=self.editor, entry=entry
+        )
+
+    def sources(self, source=None):
+        return dict(SourceCharacter.objects.filter(
+            source=source or self.source1
+        ).values_list('character', 'count'))
+
+    def languages(self, language=None):
+        return dict(LanguageCharacter.objects.filter(
+            language=language or self.lang1
+        ).values_list('character', 'count'))
+
+    def everything(self):
+        return (
+            sorted(SourceCharacter.objects.values_list('source_id', 'character', 'count')),
+            sorted(LanguageCharacter.objects.values_list('language_id', 'character', 'count')),
+        )
+
+    def test_count_characters(self):
+        sources, languages = count_characters([(1, 2, u'aba'), (1, 3, u'ʔa'), (4, 2, None)])
+        assert sources == {(1, u'a'): 3, (1, u'b'): 1, (1, u'ʔ'): 1}
+        assert languages == {(2, u'a'): 2, (2, u'b'): 1, (3, u'ʔ'): 1, (3, u'a'): 1}
+
+    def test_added(self):
+        self.add(u'mata')
+        self.add(u'maʔ')
+        assert self.sources() == {u'm': 2, u'a': 3, u't': 1, u'ʔ': 1}
+        assert self.languages() == self.sources()
+
+    def test_changed(self):
+        lex = self.add(u'mata')
+        lex.entry = u'mala'
+        lex.save()
+        assert self.sources() == {u'm': 1, u'a': 2, u'l': 1}
+
+    def test_moved(self):
+        lex = self.add(u'mata')
+        lex.source = self.source2
+        lex.language = self.lang2
+        lex.save()
+        assert self.sources() == {}
+        assert self.languages() == {}
+        assert self.sources(self.source2) == {u'm': 1, u'a': 2, u't': 1}
+        assert self.languages(self.lang2) == {u'm': 1, u'a': 2, u't': 1}
+
+    def test_deleted(self):
+        self.add(u'mata')
+        self.add(u'ma').delete()
+        assert self.sources() == {u'm': 1, u'a': 2, u't': 1}
+
+    def test_source_deleted(self):
+        self.add(u'mata', source=self.source2)
+        Source.objects.get(pk=self.source2.pk).delete()
+        assert not SourceCharacter.objects.filter(source_id=self.source2.pk).exists()
+        assert self.languages() == {}
+
+    def test_rebuild(self):
+        self.add(u'mata')
+        self.add(u'maʔ', language=self.lang2, source=self.source2)
+        expected = self.everything()
+        SourceCharacter.objects.all().delete()
+        LanguageCharacter.objects.update(count=99)
+        assert rebuild_inventory(processes=1, chunk_size=1) == 2
+        assert self.everything() == expected
+
+    def test_rebuild_processes(self):
+        for i in range(5):
+            self.add(u'mata%d' % i, language=[self.lang1, self.lang2][i % 2])
+        expected = self.everything()
+        SourceCharacter.objects.all().delete()
+        LanguageCharacter.objects.all().delete()
+        rebuild_inventory(processes=2, chunk_size=2)
+        assert self.everything() == expected
+
+    def test_rebuild_some(self):
+        self.add(u'mata')
+        self.add(u'maʔ', language=self.lang2, source=self.source2)
+        SourceCharacter.objects.update(count=99)
+        LanguageCharacter.objects.update(count=99)
+        rebuild_inventory(sources=[self.source1.id], processes=1)
+        assert self.sources() == {u'm': 1, u'a': 2, u't': 1}
+        assert set(self.sources(self.source2).values()) == set([99])
+        assert set(LanguageCharacter.objects.values_list('count', flat=True)) == set([99])
+
+    def test_tidy(self):
+        self.add(u'caf\xc3\xa9 ')
+        hygiene.Command().handle('tidy', save=True, quiet=True)
+        expected = self.everything()
+        rebuild_inventory(processes=1)
+        assert self.everything() == expected
+        assert self.sources() == {u'c': 1, u'a': 1, u'f': 1, u'\xe9': 1}
+
+    def test_split_entries(self):
+        self.add(u'mata/mala')
+        cmd = split_entries.Command()
+        cmd.split_entries(cmd.find_combined())
+        assert self.sources() == {u'm': 2, u'a': 4, u't': 1, u'l': 1}
+
+    def test_mergeword(self):
+        self.add(u'mata')
+        self.add(u'maʔ', source=self.source2)
+        call_command('mergeword', 'Smith1991', 'Jones1992', model='source', save=True, quiet=True)
+        assert self.sources() == {u'm': 2, u'a': 3, u't': 1, u'ʔ': 1}
+
+    def test_ipatable(self):
+        self.add(u'maʔ')
+        out = six.StringIO()
+        call_command('ipatable', 'Smith1991', stdout=out)
+        rows = [r.split("\t") for r in force_text(out.getvalue()).splitlines()]
+        assert [(r[0], r[1]) for r in rows] == [(u'a', '1'), (u'm', '1'), (u'ʔ', '1')]
+        assert rows[2][2].strip() == 'LATIN LETTER GLOTTAL STOP'
+
+    def test_ipatable_language(self):
+        self.add(u'ma', language=self.lang2)
+        out = six.StringIO()
+        call_command('ipatable', 'langb', language=True, stdout=out)
+        assert [r.split("\t")[0] for r in force_text(out.getvalue()).splitlines()] == [u'a', u'm']
+
+    def test_source_view(self):
+        self.add(u'maʔ')
+        response = Client().get(reverse('source-inventory', kwargs={'slug': self.source1.slug}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'LATIN LETTER GLOTTAL STOP')
+
+    def test_language_view(self):
+        self.add(u'maʔ')
+        response = Client().get(
+            reverse('language-inventory', kwargs={'language': self.lang1.slug})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'LATIN LETTER GLOTTAL STOP')
+
+    def test_view_404(self):
+        response = Client().get(reverse('source-inventory', kwargs={'slug': 'nope'}))
+        self.assertEqual(response.status_code, 404)
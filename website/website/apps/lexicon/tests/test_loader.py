@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import six
+
+from django.contrib.auth.models import User
+from reversion.models import Revision
+from watson import search as watson
+from website.apps.core.models import Source, Language, NGram
+from website.apps.lexicon.models import Word, Lexicon, LanguageCharacter
+from website.apps.lexicon.loader import Loader, LoadError, read_table, read_cldf
+
+CLDF = 'http://cldf.clld.org/v1.0/terms.rdf#'
+
+
+class LoaderMixin(object):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.lang = Language.objects.create(
+            language='Maori', slug='maori', isocode='mri', editor=cls.editor
+        )
+        cls.source = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', reference='S2', editor=cls.editor
+        )
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, text):
+        filename = os.path.join(self.dir, name)
+        with io.open(filename, 'w', encoding='utf8') as handle:
+            handle.write(six.text_type(text))
+        return filename
+
+
+class Test_Loader(LoaderMixin, TestCase):
+    def test_load(self):
+        rows = [
+            {'language': 'maori', 'source': 'Smith1991', 'word': 'hand', 'entry': u'ringa'},
+            {'language': 'maori', 'source': 'Smith1991', 'word': 'hand', 'entry': u'kapu',
+             'annotation': 'palm', 'loan': 'yes'},
+        ]
+        progress = []
+        loader = Loader(self.editor, batch_size=1, progress=lambda n, rate: progress.append(n))
+        assert loader.load(rows) == 2
+        assert [n for n in progress] == [1, 2]
+        kapu = Lexicon.objects.get(entry='kapu')
+        assert kapu.language == self.lang and kapu.word == self.word
+        assert kapu.annotation == 'palm' and kapu.loan
+        assert not Lexicon.objects.get(entry='ringa').loan
+        assert sorted(loader.added) == sorted(Lexicon.objects.values_list('pk', flat=True))
+        # ...with everything derived from the entries.
+        assert Language.objects.get(pk=self.lang.pk).lexicon_count == 2
+        assert Word.objects.get(pk=self.word.pk).lexicon_count == 2
+        assert LanguageCharacter.objects.get(language=self.lang, character='a').count == 2
+        assert NGram.objects.filter(model='lexicon.lexicon', object_id=kapu.pk).exists()
+
+    def test_added(self):
+        existing = Lexicon.objects.create(
+            language=self.lang, source=self.source, word=self.word, entry='ringa',
+            editor=self.editor
+        )
+        loader = Loader(self.editor)
+        loader.load([{'language': 'maori', 'source': 'Smith1991', 'word': 'hand', 'entry': 'ringa'}] * 3)
+        assert len(set(loader.added)) == 3
+        assert existing.pk not in loader.added
+        assert Lexicon.objects.filter(pk__in=loader.added, entry='ringa').count() == 3
+
+    def test_mapping_and_defaults(self):
+        loader = Loader(
+            self.editor, mapping={'entry': 'Form', 'word': 'Gloss'},
+            defaults={'source': 'Smith1991'}
+        )
+        loader.load([{'language': 'maori', 'Gloss': 'hand', 'Form': 'ringa'}])
+        assert Lexicon.objects.get().source == self.source
+
+    def test_slug_cache(self):
+        loader = Loader(self.editor)
+        rows = [{'language': 'maori', 'source': 'Smith1991', 'word': 'hand', 'entry': 'ringa'}] * 10
+        with self.assertNumQueries(0):
+            entries = [loader.make_entry(row, i) for i, row in enumerate(rows)]
+        assert [e.language_id for e in entries] == [self.lang.pk] * 10
+
+    def test_unknown(self):
+        loader = Loader(self.editor)
+        with self.assertRaises(LoadError):
+            loader.load([{'language': 'samoan', 'source': 'Smith1991', 'word': 'hand', 'entry': 'lima'}])
+
+    def test_missing(self):
+        loader = Loader(self.editor)
+        with self.assertRaises(LoadError):
+            loader.load([{'language': 'maori', 'source': 'Smith1991', 'word': 'hand'}])
+
+    def test_create(self):
+        loader = Loader(self.editor, create=True)
+        loader.load([
+            {'language': 'samoan', 'language.isocode': 'smo', 'source': 'Smith1991',
+             'word': 'Leg', 'word.full': 'a leg', 'entry': 'vae'},
+            {'language': 'samoan', 'source': 'Smith1991', 'word': 'Leg', 'entry': 'vae'},
+        ])
+        samoan = Language.objects.get(slug='samoan')
+        assert samoan.language == 'samoan' and samoan.isocode == 'smo'
+        leg = Word.objects.get(slug='leg')
+        assert leg.word == 'Leg' and leg.full == 'a leg'
+        assert loader.created == {Language: [samoan.pk], Word: [leg.pk]}
+        assert Lexicon.objects.filter(language=samoan, word=leg).count() == 2
+
+    def test_read_table(self):
+        tsv = self.write('maori.tsv', u"language\tword\tentry\nmaori\thand\tringa\n")
+        assert list(read_table(tsv)) == [{'language': 'maori', 'word': 'hand', 'entry': 'ringa'}]
+        csv = self.write('maori.csv', u"language,word,entry\nmaori,hand,ŋa\n")
+        assert list(read_table(csv))[0]['entry'] == u'ŋa'
+
+    def test_read_cldf(self):
+        def table(url, component, columns):
+            return {
+                'url': url, 'dc:conformsTo': CLDF + component,
+                'tableSchema': {'columns': columns},
+            }
+        metadata = {
+            '@context': 'http://www.w3.org/ns/csvw',
+            'dc:conformsTo': CLDF + 'Wordlist',
+            'tables': [
+                table('forms.csv', 'FormTable', [
+                    {'name': 'ID', 'propertyUrl': CLDF + 'id'},
+                    {'name': 'Language_ID', 'propertyUrl': CLDF + 'languageReference'},
+                    {'name': 'Parameter_ID', 'propertyUrl': CLDF + 'parameterReference'},
+                    {'name': 'Form', 'propertyUrl': CLDF + 'form'},
+                    {'name': 'Source', 'propertyUrl': CLDF + 'source', 'separator': ';'},
+                ]),
+                table('languages.csv', 'LanguageTable', [
+                    {'name': 'ID', 'propertyUrl': CLDF + 'id'},
+                    {'name': 'Name', 'propertyUrl': CLDF + 'name'},
+                    {'name': 'ISO639P3code', 'propertyUrl': CLDF + 'iso639P3code'},
+                ]),
+                table('parameters.csv', 'ParameterTable', [
+                    {'name': 'ID', 'propertyUrl': CLDF + 'id'},
+                    {'name': 'Name', 'propertyUrl': CLDF + 'name'},
+                ]),
+            ]
+        }
+        self.write('forms.csv', u"ID,Language_ID,Parameter_ID,Form,Source\n1,samoan,leg,vae,Smith1991[12];Jones1992\n")
+        self.write('languages.csv', u"ID,Name,ISO639P3code\nsamoan,Samoan,smo\n")
+        self.write('parameters.csv', u"ID,Name\nleg,Leg\n")
+        filename = self.write('Wordlist-metadata.json', json.dumps(metadata).decode('utf8') if six.PY2 else json.dumps(metadata))
+        rows = list(read_cldf(filename))
+        assert len(rows) == 1
+        assert rows[0]['language'] == 'samoan'
+        assert rows[0]['language.language'] == 'Samoan'
+        assert rows[0]['language.isocode'] == 'smo'
+        assert rows[0]['word'] == 'leg'
+        assert rows[0]['word.word'] == 'Leg'
+        assert rows[0]['entry'] == 'vae'
+        assert rows[0]['source'] == 'Smith1991'
+
+        Loader(self.editor, create=True).load(rows)
+        lexicon = Lexicon.objects.get()
+        assert lexicon.language.language == 'Samoan'
+        assert lexicon.word.word == 'Leg'
+
+
+class Test_ImportCommand(LoaderMixin, TestCase):
+    def setUp(self):
+        super(Test_ImportCommand, self).setUp()
+        self.tsv = self.write(
+            'maori.tsv', u"Language\tword\tentry\nmaori\thand\tringa\nmaori\thand\tkapu\n"
+        )
+
+    def test_run(self):
+        out = six.StringIO()
+        call_command(
+            'import', self.tsv, run=True, editor='admin', column=['language=Language'],
+            default=['source=Smith1991'], stdout=out
+        )
+        assert Lexicon.objects.count() == 2
+        assert 'Loaded 2 entries' in out.getvalue()
+        # indexed and versioned as a whole.
+        assert watson.search('kapu').count() == 1
+        assert Revision.objects.get().comment == u"Imported maori.tsv: 2 Lexical Items"
+
+    def test_dryrun(self):
+        with self.assertRaises(ValueError):
+            call_command(
+                'import', self.tsv, editor='admin', column=['language=Language'],
+                default=['source=Smith1991'], stdout=six.StringIO()
+            )
+        assert Lexicon.objects.count() == 0
+
+    def test_needs_editor(self):
+        with self.assertRaises(CommandError):
+            call_command('import', self.tsv, run=True, stdout=six.StringIO())
+
+    def test_error(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'import', self.tsv, run=True, editor='admin', stdout=six.StringIO()
+            )
+        assert Lexicon.objects.count() == 0
@@ -1,9 +1,19 @@
+from django.contrib.redirects.models import Redirect
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
 from django.test.client import Client
+from django.utils import six
 
 from django.contrib.auth.models import User
-from website.apps.core.models import Source, Language
-from website.apps.lexicon.models import Word, Lexicon
+from website.apps.core.models import Source, Language, Family, Clade
+from website.apps.cognacy.models import CognateSuggestion, SuggestedWord
+from website.apps.core.merge import merge_objects
+from website.apps.entry.models import Wordlist, WordlistMember
+from website.apps.lexicon.models import Word, WordSubset, Lexicon, CognateNote
+from website.apps.lexicon.models import Alignment, AlignmentQueue
+from website.apps.pronouns.models import PronounType
 
 from website.apps.lexicon.management.commands import mergeword
 
@@ -90,3 +100,114 @@ class TestMergeWordManagementCommand(TestCase):
         assert Lexicon.objects.get(pk=self.lex_2_1.pk).word == self.word1
         assert Lexicon.objects.get(pk=self.lex_2_2.pk).word == self.word1
 
+    def test_moves_dependents(self):
+        note = CognateNote.objects.create(word=self.word2, note='n', editor=self.editor)
+        subset = WordSubset.objects.create(subset='body', slug='body', editor=self.editor)
+        subset.words.add(self.word1, self.word2)
+        other = WordSubset.objects.create(subset='legs', slug='legs', editor=self.editor)
+        other.words.add(self.word2)
+        wordlist = Wordlist.objects.create(name='list', editor=self.editor)
+        WordlistMember.objects.create(wordlist=wordlist, word=self.word2, order=1)
+        ptype = PronounType.objects.create(
+            word=self.word2, alignment='A', person=1, number='sg',
+            sequence=1, editor=self.editor
+        )
+        cmd = mergeword.Command()
+        cmd.handle('hand', 'leg', save=True, quiet=True)
+        assert not Word.objects.filter(slug='leg').exists()
+        assert CognateNote.objects.get(pk=note.pk).word == self.word1
+        assert list(subset.words.all()) == [self.word1]
+        assert list(other.words.all()) == [self.word1]
+        assert list(wordlist.words.all()) == [self.word1]
+        assert PronounType.objects.get(pk=ptype.pk).word == self.word1
+
+    def test_one_update_per_relation(self):
+        for i in range(20):
+            Lexicon.objects.create(
+                language=self.lang, word=self.word2, source=self.source,
+                editor=self.editor, entry="extra %d" % i
+            )
+        with CaptureQueriesContext(connection) as queries:
+            merge_objects(Word.objects.get(slug='hand'), Word.objects.get(slug='leg'))
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "lexicon"')]
+        assert len(updates) == 1
+        assert Lexicon.objects.filter(word=self.word1).count() == 24
+
+    def test_adds_redirect(self):
+        cmd = mergeword.Command()
+        cmd.handle('hand', 'leg', save=True, quiet=True)
+        redirect = Redirect.objects.get(old_path=self.word2.get_absolute_url())
+        assert redirect.new_path == self.word1.get_absolute_url()
+        response = Client().get(self.word2.get_absolute_url())
+        self.assertRedirects(response, self.word1.get_absolute_url(), status_code=301)
+
+    def test_dry_run_lists_changes(self):
+        out = six.StringIO()
+        call_command('mergeword', 'hand', 'leg', stdout=out)
+        assert 'Moving 2 Lexicon.word from Leg (a leg) to Hand (a hand)' in out.getvalue()
+        assert Word.objects.filter(slug='leg').exists()
+
+    def test_merge_languages(self):
+        lang2 = Language.objects.create(
+            language='B', slug='langb', isocode='bbb', editor=self.editor
+        )
+        family = Family.objects.create(family='F', slug='f', editor=self.editor)
+        lang2.family.add(family)
+        self.lang.family.add(family)
+        lex = Lexicon.objects.create(
+            language=lang2, word=self.word1, source=self.source,
+            editor=self.editor, entry="b"
+        )
+        call_command('mergeword', 'lang', 'langb', model='language', save=True, quiet=True)
+        assert not Language.objects.filter(slug='langb').exists()
+        assert Lexicon.objects.get(pk=lex.pk).language == self.lang
+        assert list(self.lang.family.all()) == [family]
+
+    def test_merge_languages_keeps_clades(self):
+        Language.objects.create(
+            language='X', slug='x', classification='A, B', editor=self.editor
+        )
+        y = Language.objects.create(
+            language='Y', slug='y', classification='A, C', editor=self.editor
+        )
+        call_command('mergeword', 'y', 'x', model='language', save=True, quiet=True)
+        y = Language.objects.get(pk=y.pk)
+        assert sorted(y.clades.values_list('path', flat=True)) == ['A', 'A, C']
+        assert y not in Clade.objects.languages('A, B')
+        # and "A, B" has nothing left in it.
+        assert not Clade.objects.filter(path='A, B').exists()
+
+    def test_derived_rows_not_moved(self):
+        suggestion = CognateSuggestion.objects.create(
+            lexicon=self.lex_2_1, word=self.word2, cluster=1
+        )
+        SuggestedWord.objects.create(word=self.word2, checksum='x', threshold=0.5)
+        alignment = Alignment.objects.create(
+            word=self.word2, checksum='x', alignment='[]'
+        )
+        AlignmentQueue.objects.create(word=self.word2, checksum='x')
+        call_command('mergeword', 'hand', 'leg', save=True, quiet=True)
+        assert not CognateSuggestion.objects.filter(pk=suggestion.pk).exists()
+        assert not SuggestedWord.objects.exists()
+        assert not Alignment.objects.filter(pk=alignment.pk).exists()
+        # the destination is queued to be realigned with its new entries.
+        queued = AlignmentQueue.objects.get()
+        assert queued.word_id == self.word1.pk
+        assert queued.checksum != 'x'
+
+    def test_merge_sources(self):
+        source2 = Source.objects.create(
+            year="1992", author='Jones', slug='Jones1992', editor=self.editor
+        )
+        lex = Lexicon.objects.create(
+            language=self.lang, word=self.word1, source=source2,
+            editor=self.editor, entry="b"
+        )
+        call_command('mergeword', 'Smith1991', 'Jones1992', model='source', save=True, quiet=True)
+        assert not Source.objects.filter(slug='Jones1992').exists()
+        assert Lexicon.objects.get(pk=lex.pk).source == self.source
+        assert Redirect.objects.filter(old_path=source2.get_absolute_url()).exists()
+
+    def test_error_on_bad_language_slug(self):
+        with self.assertRaises(Language.DoesNotExist):
+            call_command('mergeword', 'lang', 'nope', model='language', quiet=True)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import six
+from django.utils.encoding import force_text
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Source, Language, NGram
+from website.apps.core.ngrams import search, get_ngrams
+from website.apps.lexicon.models import Word, Lexicon
+
+from website.apps.lexicon.management.commands import hygiene, split_entries
+
+
+class Test_LexiconSearch(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.lang = Language.objects.create(
+            language='A', slug='langa', isocode='aaa', editor=cls.editor
+        )
+        cls.source = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+
+    def add(self, entry):
+        return Lexicon.objects.create(
+            language=self.lang, source=self.source, word=self.word,
+            editor=self.editor, entry=entry
+        )
+
+    def grams(self, obj):
+        return set(NGram.objects.filter(
+            model='lexicon.lexicon', object_id=obj.pk
+        ).values_list('gram', flat=True))
+
+    def test_search(self):
+        lex1 = self.add(u'ŋgali')
+        lex2 = self.add(u'aŋga')
+        self.add(u'gaŋ')
+        assert list(search(Lexicon.objects.order_by('id'), u'ŋg')) == [lex1, lex2]
+        assert list(search(Lexicon.objects.order_by('id'), u'Ŋga')) == [lex1, lex2]
+        assert list(search(Lexicon.objects.order_by('id'), u'ŋgal')) == [lex1]
+
+    def test_too_short(self):
+        self.add(u'mata')
+        assert not search(Lexicon.objects.all(), u'm').exists()
+
+    def test_words(self):
+        assert list(search(Word.objects.all(), u'and')) == [self.word]
+
+    def test_tidy(self):
+        lex = self.add(u'caf\xc3\xa9 ')
+        hygiene.Command().handle('tidy', save=True, quiet=True)
+        assert self.grams(lex) == get_ngrams(u'caf\xe9')
+
+    def test_split_entries(self):
+        self.add(u'mata/mala')
+        cmd = split_entries.Command()
+        cmd.split_entries(cmd.find_combined())
+        assert sorted([l.entry for l in search(Lexicon.objects.all(), u'ma')]) == [u'mala', u'mata']
+        assert not search(Lexicon.objects.all(), u'a/m').exists()
+
+    def test_command(self):
+        lex = self.add(u'ŋgali')
+        out = six.StringIO()
+        call_command('search', 'lexicon', u'ŋg', stdout=out)
+        row = force_text(out.getvalue()).split()
+        assert row[0] == str(lex.id)
+        assert row[-1] == u'ŋgali'
+
+    def test_command_short_query(self):
+        # too short for the index, so the command scans the table.
+        lex = self.add(u'ŋgali')
+        self.add(u'mata')
+        out = six.StringIO()
+        call_command('search', 'lexicon', u'ŋ', stdout=out)
+        rows = [force_text(r).split() for r in out.getvalue().splitlines()]
+        assert [(r[0], r[-1]) for r in rows] == [(str(lex.id), u'ŋgali')]
+
+    def test_view(self):
+        self.add(u'ŋgali')
+        self.add(u'mata')
+        response = Client().get(reverse('lexicon-search'), {'q': u'ŋg'})
+        self.assertEqual(response.status_code, 200)
+        assert [r.entry for r in response.context['lexicon'].data.data] == [u'ŋgali']
+        self.assertContains(response, u'ŋgali')
+
+    def test_view_empty(self):
+        response = Client().get(reverse('lexicon-search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'No results found')
+
+    def test_view_too_short(self):
+        self.add(u'mata')
+        response = Client().get(reverse('lexicon-search'), {'q': u'm'})
+        self.assertEqual(response.status_code, 200)
+        assert response.context['too_short']
+        assert not response.context['lexicon'].rows
+        self.assertContains(response, 'at least 2 characters')
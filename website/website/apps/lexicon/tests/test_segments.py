@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import six
+from django.utils.encoding import force_text
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Source, Language
+from website.apps.lexicon.models import Word, Lexicon, OrthographyProfile, Segmentation
+from website.apps.lexicon.segments import parse_profile, segment, get_segments
+from website.apps.lexicon.segments import update_segments
+from website.apps.lexicon.alignment import align_entries
+
+
+PROFILE = u"""Grapheme\tIPA
+# digraphs
+ng\tŋ
+ts
+h\tNULL
+"""
+
+
+class Test_Segment(TestCase):
+    def test_parse_profile(self):
+        assert parse_profile(PROFILE) == {u'ng': [u'ŋ'], u'ts': [u'ts'], u'h': []}
+
+    def test_no_profile(self):
+        assert segment(u'mata') == [u'm', u'a', u't', u'a']
+
+    def test_profile(self):
+        assert segment(u'ngatsah', parse_profile(PROFILE)) == [u'ŋ', u'a', u'ts', u'a']
+
+    def test_longest_match(self):
+        profile = parse_profile(u"n\nng\tŋ\nnga\tŋ a")
+        assert segment(u'nganga', profile) == [u'ŋ', u'a', u'ŋ', u'a']
+
+    def test_diacritics(self):
+        assert segment(u'kʰaː') == [u'kʰ', u'aː']
+        assert segment(u'ã') == [u'ã']  # normalised
+
+    def test_ties(self):
+        assert segment(u't͡sa') == [u't͡s', u'a']
+
+    def test_words(self):
+        assert segment(u' ma  ta ') == [u'm', u'a', u'#', u't', u'a']
+
+    def test_empty(self):
+        assert segment(u'') == []
+        assert segment(None) == []
+
+
+class Test_Segments(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.word = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.lang = Language.objects.create(
+            language='A', slug='langa', isocode='aaa', editor=cls.editor
+        )
+        cls.source1 = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+        cls.source2 = Source.objects.create(
+            year="1992", author='Jones', slug='Jones1992', editor=cls.editor
+        )
+        cls.profile = OrthographyProfile.objects.create(
+            source=cls.source1, profile=PROFILE, editor=cls.editor
+        )
+
+    def add(self, entry, source=None, **kwargs):
+        return Lexicon.objects.create(
+            language=self.lang, source=source or self.source1,
+            word=self.word, editor=self.editor, entry=entry, **kwargs
+        )
+
+    def cached(self):
+        return dict(Segmentation.objects.values_list('lexicon_id', 'segments'))
+
+    def test_get_segments(self):
+        lex1 = self.add(u'ngatsa')
+        lex2 = self.add(u'ngatsa', source=self.source2)
+        assert get_segments([lex1, lex2]) == {lex1.id: u'ŋ a ts a', lex2.id: u'n g a t s a'}
+        assert self.cached() == {lex1.id: u'ŋ a ts a', lex2.id: u'n g a t s a'}
+
+    def test_get_segments_cached(self):
+        lex = self.add(u'ngatsa')
+        get_segments([lex])
+        Segmentation.objects.update(segments=u'cached')
+        assert get_segments([lex]) == {lex.id: u'cached'}
+
+    def test_entry_changed(self):
+        lex = self.add(u'ngatsa')
+        get_segments([lex])
+        lex.entry = u'nga'
+        lex.save()
+        assert get_segments([lex]) == {lex.id: u'ŋ a'}
+
+    def test_phon_entry(self):
+        lex = self.add(u'ngatsa', phon_entry=u'ŋaca')
+        assert get_segments([lex]) == {lex.id: u'ŋ a c a'}
+
+    def test_profile_changed(self):
+        lex = self.add(u'ngatsa')
+        get_segments([lex])
+        self.profile.profile = u"ng\tN"
+        self.profile.save()
+        assert get_segments([lex]) == {lex.id: u'N a t s a'}
+
+    def test_update_segments(self):
+        lex1 = self.add(u'ngatsa')
+        lex2 = self.add(u'ma ta', source=self.source2)
+        assert sum(update_segments(processes=1, chunk_size=1)) == 2
+        assert self.cached() == {lex1.id: u'ŋ a ts a', lex2.id: u'm a # t a'}
+        # nothing has changed...
+        assert sum(update_segments(processes=1)) == 0
+        # ...unless forced.
+        assert sum(update_segments(processes=1, force=True)) == 2
+
+    def test_update_segments_processes(self):
+        for i in range(5):
+            self.add(u'ngatsa%d' % i)
+        assert sum(update_segments(processes=2, chunk_size=2)) == 5
+        assert set(self.cached().values()) == set([u'ŋ a ts a %d' % i for i in range(5)])
+
+    def test_deleted(self):
+        lex = self.add(u'ngatsa')
+        get_segments([lex])
+        lex.delete()
+        assert self.cached() == {}
+
+    def test_command(self):
+        self.add(u'ngatsa')
+        self.add(u'mata', source=self.source2)
+        out = six.StringIO()
+        call_command('segment_entries', source='Smith1991', processes=1, stdout=out)
+        assert out.getvalue().strip() == 'Segmented 1 entries'
+        assert list(self.cached().values()) == [u'ŋ a ts a']
+
+    def test_ipatable(self):
+        self.add(u'ngatsa')
+        out = six.StringIO()
+        call_command('ipatable', 'Smith1991', segments=True, stdout=out)
+        rows = [r.split("\t") for r in force_text(out.getvalue()).splitlines()]
+        assert [(r[0], r[1]) for r in rows] == [(u'a', '2'), (u'ts', '1'), (u'ŋ', '1')]
+        assert rows[1][2].strip() == 'LATIN SMALL LETTER T + LATIN SMALL LETTER S'
+
+    def test_write_table(self):
+        lex = self.add(u'ngatsa')
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'table.txt')
+            call_command('write_table', output=path, segments=True)
+            with io.open(path, encoding='utf8') as handle:
+                row = handle.read().strip().split("\t")
+        finally:
+            shutil.rmtree(tmpdir)
+        assert row[0] == str(lex.id)
+        assert row[-1] == u'ŋ a ts a'
+
+    def test_align_entries(self):
+        rows = align_entries([(1, u'ngatsa'), (2, u'ngasa')], {1: u'ŋ a ts a', 2: u'ŋ a s a'})
+        assert rows[0][2][0] == u'ŋ'
+        assert len(rows[0][2]) == len(rows[1][2])
+        assert u'ts' in rows[0][2]
+
+    def test_word_alignment_view(self):
+        self.add(u'ngatsa')
+        User.objects.create_user('admin2', 'admin@admin.com', "test")
+        client = Client()
+        client.login(username='admin2', password='test')
+        response = client.get(reverse('word-alignment', kwargs={'slug': self.word.slug}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, u'ŋ a ts a')
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import Client
+from django.utils import six
+from django.utils.encoding import force_text
+
+from django.contrib.auth.models import User
+from website.apps.core.models import Source, Language
+from website.apps.lexicon.models import Word, Lexicon
+from website.apps.lexicon.similarity import levenshtein, get_candidates, find_similar, restrict
+from website.apps.lexicon import views
+
+
+class Test_Levenshtein(TestCase):
+    def test_distance(self):
+        assert levenshtein(u'lima', u'lima') == 0
+        assert levenshtein(u'lima', u'rima') == 1
+        assert levenshtein(u'lima', u'lma') == 1
+        assert levenshtein(u'lima', u'alima') == 1
+        assert levenshtein(u'kitten', u'sitting') == 3
+        assert levenshtein(u'', u'abc') == 3
+
+    def test_limit(self):
+        assert levenshtein(u'kitten', u'sitting', 3) == 3
+        assert levenshtein(u'kitten', u'sitting', 2) is None
+        assert levenshtein(u'a', u'abcd', 2) is None
+        assert levenshtein(u'abcdef', u'badcfe', 1) is None
+        assert levenshtein(u'abcdef', u'badcfe', 3) is None
+        assert levenshtein(u'abcdef', u'badcfe', 4) == 4
+
+
+class Test_Similar(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create(username='admin')
+        cls.hand = Word.objects.create(word='Hand', slug='hand', editor=cls.editor)
+        cls.five = Word.objects.create(word='Five', slug='five', editor=cls.editor)
+        cls.lang1 = Language.objects.create(
+            language='A', slug='langa', isocode='aaa', editor=cls.editor,
+            classification="Austronesian, Oceanic"
+        )
+        cls.lang2 = Language.objects.create(
+            language='B', slug='langb', isocode='bbb', editor=cls.editor,
+            classification="Austronesian, Malayic"
+        )
+        cls.source = Source.objects.create(
+            year="1991", author='Smith', slug='Smith1991', editor=cls.editor
+        )
+        cls.entries = {}
+        for entry, language, word in [
+            (u'lima', cls.lang1, cls.hand),
+            (u'rima', cls.lang1, cls.five),
+            (u'Lima', cls.lang2, cls.hand),
+            (u'nima', cls.lang2, cls.five),
+            (u'alimana', cls.lang1, cls.hand),
+            (u'kulit', cls.lang1, cls.hand),
+        ]:
+            cls.entries[(entry, language.slug)] = Lexicon.objects.create(
+                language=language, source=cls.source, word=word,
+                editor=cls.editor, entry=entry
+            )
+
+    def found(self, *args, **kwargs):
+        return [(d, lex.entry) for (d, lex) in find_similar(*args, **kwargs)]
+
+    def test_find_similar(self):
+        assert self.found(u'lima', 1) == [(0, u'Lima'), (0, u'lima'), (1, u'nima'), (1, u'rima')]
+
+    def test_distance(self):
+        assert (3, u'alimana') not in self.found(u'lima', 2)
+        assert (3, u'alimana') in self.found(u'lima', 3)
+
+    def test_limit(self):
+        assert len(self.found(u'lima', 1, limit=2)) == 2
+
+    def test_candidates(self):
+        # long enough queries only look at entries sharing enough n-grams...
+        candidates = get_candidates(Lexicon.objects.all(), u'alimana', 1)
+        assert sorted(candidates.values_list('entry', flat=True)) == [u'alimana']
+        # ...short ones look at those sharing enough characters.
+        candidates = get_candidates(Lexicon.objects.all(), u'lima', 2)
+        assert sorted(candidates.values_list('entry', flat=True)) == [
+            u'Lima', u'alimana', u'kulit', u'lima', u'nima', u'rima'
+        ]
+        candidates = get_candidates(Lexicon.objects.all(), u'mil', 1)
+        assert sorted(candidates.values_list('entry', flat=True)) == [
+            u'Lima', u'alimana', u'kulit', u'lima', u'nima', u'rima'
+        ]
+
+    def test_decomposed(self):
+        # an entry stored decomposed is as long as its composed form.
+        Lexicon.objects.create(
+            language=self.lang1, source=self.source, word=self.hand,
+            editor=self.editor, entry=u'cafe\u0301'
+        )
+        assert self.found(u'caf\xe9', 0) == [(0, u'cafe\u0301')]
+        # ...and has the characters of the composed form.
+        candidates = get_candidates(Lexicon.objects.all(), u'\xe9', 0)
+        assert list(candidates.values_list('entry', flat=True)) == [u'cafe\u0301']
+
+    def test_max_candidates(self):
+        assert len(self.found(u'lima', 1, max_candidates=2)) <= 2
+
+    def test_restrict(self):
+        lexica = restrict(Lexicon.objects.all(), word='hand')
+        assert self.found(u'lima', 1, lexica) == [(0, u'Lima'), (0, u'lima')]
+        lexica = restrict(Lexicon.objects.all(), clade='Austronesian, Oceanic')
+        assert self.found(u'lima', 1, lexica) == [(0, u'lima'), (1, u'rima')]
+        lexica = restrict(Lexicon.objects.all(), source='Smith1991')
+        assert len(self.found(u'lima', 1, lexica)) == 4
+
+    def test_command(self):
+        out = six.StringIO()
+        call_command('similar', 'lima', distance=1, word='five', stdout=out)
+        rows = [r.split("\t") for r in force_text(out.getvalue()).splitlines()]
+        assert [(r[0], r[-1]) for r in rows] == [('1', u'nima'), ('1', u'rima')]
+
+    def test_view(self):
+        response = Client().get(reverse('lexicon-similar'), {
+            'q': 'lima', 'distance': 1, 'clade': 'Austronesian, Malayic'
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = [(r.distance, r.entry) for r in response.context['lexicon'].data.data]
+        assert rows == [(0, u'Lima'), (1, u'nima')]
+
+    def test_view_bad_distance(self):
+        response = Client().get(reverse('lexicon-similar'), {'q': 'lima', 'distance': 'x'})
+        self.assertEqual(response.status_code, 200)
+        assert response.context['distance'] == 2
+        response = Client().get(reverse('lexicon-similar'), {'q': 'lima', 'distance': 99})
+        assert response.context['distance'] == 3
+
+    def test_view_limit(self):
+        limit, views.MAX_SIMILAR_RESULTS = views.MAX_SIMILAR_RESULTS, 2
+        try:
+            response = Client().get(reverse('lexicon-similar'), {'q': 'lima', 'distance': 1})
+        finally:
+            views.MAX_SIMILAR_RESULTS = limit
+        assert len(response.context['lexicon'].data.data) == 2
+        assert response.context['limited']
+        self.assertContains(response, 'Showing the closest 2 entries')
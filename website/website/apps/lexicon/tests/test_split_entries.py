@@ -1,8 +1,14 @@
+import json
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import six
+from reversion.models import Revision
 
 from django.contrib.auth.models import User
 from website.apps.core.models import Source, Language
-from website.apps.lexicon.models import Word, Lexicon
+from website.apps.lexicon.models import Word, Lexicon, CognateSet, Cognate
+from website.apps.pronouns.models import Paradigm, PronounType, Pronoun
 
 from website.apps.lexicon.management.commands import split_entries
 
@@ -297,3 +303,115 @@ class Test_Ignore_Protoforms(HygieneDataMixin):
         assert one.source == two.source == self.pform3.source
         assert one.word == two.word == self.pform3.word
 
+
+class Test_Bulk_Split(HygieneDataMixin):
+    """Tests the split_entries management command splitting in bulk"""
+    def setUp(self):
+        super(Test_Bulk_Split, self).setUp()
+        self.slash = Lexicon.objects.get(entry="hello/world")
+        self.comma = Lexicon.objects.get(entry="foo, bar")
+        self.cogset = CognateSet.objects.create(protoform='x', editor=self.editor)
+        Cognate.objects.create(
+            lexicon=self.slash, cognateset=self.cogset, source=self.source,
+            flag='1', editor=self.editor
+        )
+        ptype = PronounType.objects.create(
+            word=self.word, alignment='A', person=1, number='sg',
+            sequence=1, editor=self.editor
+        )
+        paradigm = Paradigm.objects.create(
+            language=self.lang, source=self.source, editor=self.editor
+        )
+        self.pronoun = Pronoun.objects.create(
+            paradigm=paradigm, pronountype=ptype, editor=self.editor
+        )
+        self.pronoun.entries.add(self.comma)
+
+    def test_split_entries(self):
+        cmd = split_entries.Command()
+        created = cmd.split_entries(cmd.find_combined())
+        assert sorted(created) == sorted([self.slash.id, self.comma.id])
+        assert [
+            Lexicon.objects.get(pk=pk).entry for pk in created[self.slash.id]
+        ] == ['hello', 'world']
+        assert [
+            Lexicon.objects.get(pk=pk).entry for pk in created[self.comma.id]
+        ] == ['foo', 'bar']
+        assert not Lexicon.objects.filter(pk__in=[self.slash.id, self.comma.id]).exists()
+
+    def test_carries_cognates(self):
+        cmd = split_entries.Command()
+        created = cmd.split_entries(cmd.find_combined())
+        cognates = Cognate.objects.filter(cognateset=self.cogset)
+        assert sorted(cognates.values_list('lexicon_id', flat=True)) == created[self.slash.id]
+        assert all([c.source == self.source and c.flag == '1' for c in cognates])
+
+    def test_carries_pronouns(self):
+        cmd = split_entries.Command()
+        created = cmd.split_entries(cmd.find_combined())
+        assert sorted(
+            self.pronoun.entries.values_list('id', flat=True)
+        ) == created[self.comma.id]
+
+    def test_one_revision_per_batch(self):
+        cmd = split_entries.Command()
+        before = Revision.objects.count()
+        cmd.split_entries(cmd.find_combined())
+        assert Revision.objects.count() == before + 1
+        cmd = split_entries.Command()
+        for i in range(3):
+            Lexicon.objects.create(
+                language=self.lang, word=self.word, source=self.source,
+                editor=self.editor, entry="a/%d" % i
+            )
+        cmd.split_entries(cmd.find_combined(), batch_size=2)
+        assert Revision.objects.count() == before + 3
+
+    def test_fails_before_saving(self):
+        o = Lexicon.objects.create(
+            language=self.lang, word=self.word, source=self.source,
+            editor=self.editor, entry="hello/"
+        )
+        cmd = split_entries.Command()
+        with self.assertRaises(AssertionError):
+            cmd.split_entries(cmd.find_combined())
+        assert Lexicon.objects.filter(entry="hello").count() == 0
+
+    def test_plan(self):
+        out = six.StringIO()
+        call_command('split_entries', '--language=%d' % self.lang.id, stdout=out)
+        plan = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert plan == [
+            {
+                'id': self.slash.id, 'language': self.lang.id,
+                'word': self.word.id, 'source': self.source.id,
+                'entry': 'hello/world', 'components': ['hello', 'world'],
+                'cognates': 1, 'pronouns': 0,
+            },
+            {
+                'id': self.comma.id, 'language': self.lang.id,
+                'word': self.word.id, 'source': self.source.id,
+                'entry': 'foo, bar', 'components': ['foo', 'bar'],
+                'cognates': 0, 'pronouns': 1,
+            },
+        ]
+        # nothing changed
+        assert Lexicon.objects.filter(pk=self.slash.id).exists()
+
+    def test_plan_error(self):
+        o = Lexicon.objects.create(
+            language=self.lang, word=self.word, source=self.source,
+            editor=self.editor, entry="hello/"
+        )
+        plan = split_entries.Command().get_plan([o])
+        assert plan[0]['error'] == "Unable to split properly - zero length component"
+        assert 'components' not in plan[0]
+
+    def test_save_skips_errors(self):
+        o = Lexicon.objects.create(
+            language=self.lang, word=self.word, source=self.source,
+            editor=self.editor, entry="hello/"
+        )
+        call_command('split_entries', save=True, quiet=True)
+        assert Lexicon.objects.filter(pk=o.id).exists()
+        assert not Lexicon.objects.filter(pk=self.slash.id).exists()
@@ -2,11 +2,13 @@ from django.test import TestCase
 from django.test.client import Client
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from website.apps.lexicon.tests import DataMixin
 from website.apps.lexicon.models import WordSubset, Lexicon
 
-from website.apps.core.tests.utils import PaginatorTestMixin
+from website.apps.core.tests.utils import PaginatorTestMixin, KeysetPaginatorTestMixin
 
 class Test_WordIndex(DataMixin, PaginatorTestMixin, TestCase):
     """Tests the Word Index page"""
@@ -107,7 +109,7 @@ class Test_WordIndex(DataMixin, PaginatorTestMixin, TestCase):
             assert response.context['table'].rows[i].record == obj
 
 
-class Test_WordDetail(DataMixin, PaginatorTestMixin, TestCase):
+class Test_WordDetail(DataMixin, KeysetPaginatorTestMixin, TestCase):
 
     def setUp(self):
         super(Test_WordDetail, self).setUp()
@@ -134,13 +136,34 @@ class Test_WordDetail(DataMixin, PaginatorTestMixin, TestCase):
         assert 'table' in response.context
         self.assertEquals(len(response.context['table'].rows), 2)
 
-    def test_bad_paginator(self):
-        response = self.client.get('/word/hand?page=10000')
+    def test_bad_cursor(self):
+        response = self.client.get('/word/hand?cursor=banana')
         self.assertEqual(response.status_code, 404)
 
-    def test_bad_nonint_paginator(self):
-        response = self.client.get('/word/hand?page=banana')
-        self.assertEqual(response.status_code, 404)
+    def test_cursor(self):
+        lexica = [self.lexicon1] + [
+            Lexicon.objects.create(
+                language=self.lang1, source=self.source1, word=self.word1,
+                editor=self.editor, entry='e%03d' % i
+            ) for i in range(60)
+        ]
+        response = self.client.get(self.url, {'sort': 'entry'})
+        page = response.context['table'].page
+        assert len(page.object_list) == 50
+        assert page.paginator.count == 61
+        assert page.has_next() and not page.has_previous()
+        self.assertContains(response, 'Showing 50 of 61')
+        response = self.client.get(self.url, {'sort': 'entry', 'cursor': page.next_cursor})
+        page = response.context['table'].page
+        assert [r.record for r in page.object_list] == sorted(lexica, key=lambda l: l.entry)[50:]
+        assert page.has_previous() and not page.has_next()
+
+    def test_no_count(self):
+        empty = reverse('word-detail', kwargs={'slug': self.word3.slug})
+        for url in (self.url, empty):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            assert not [q for q in queries if 'COUNT(' in q['sql'].upper()]
 
     def test_sorting(self):
         url = reverse('word-detail', kwargs={'slug': self.word2.slug})
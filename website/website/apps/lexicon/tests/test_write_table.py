@@ -1,11 +1,16 @@
+import io
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import six
 from django.test.client import Client
 
 from django.contrib.auth.models import User
 from website.apps.core.models import Source, Language
-from website.apps.lexicon.models import Word, Lexicon
+from website.apps.lexicon.models import Word, Lexicon, CognateSet, Cognate
 
 from website.apps.lexicon.management.commands import write_table
+from website.apps.lexicon.management.commands.write_table import repr_cog
 
 
 class TestWriteTable(TestCase):
@@ -100,3 +105,54 @@ class TestWriteTable(TestCase):
                     assert len(lex) == 1
                     assert lex[0].entry == "%s-%s-%s" % (word.slug, lang.slug, source.slug)
 
+
+    def test_order(self):
+        entries = self.cmd.get_entries()
+        assert [l.language for l in entries] == [self.lang1] * 4 + [self.lang2] * 4
+        # ...and by word within language
+        assert [l.word for l in entries][0:4] == [self.word1] * 2 + [self.word2] * 2
+
+    def write(self, **kwargs):
+        handle = io.StringIO()
+        self.cmd.write_table(self.cmd.get_entries(**kwargs), handle, chunk_size=3)
+        return [line.split("\t") for line in handle.getvalue().splitlines()]
+
+    def test_write_table(self):
+        rows = self.write()
+        assert len(rows) == Lexicon.objects.count()
+        lex = Lexicon.objects.get(pk=int(rows[0][0]))
+        assert rows[0][1:6] == [
+            lex.language.slug, lex.word.slug, lex.source.slug, lex.entry, ''
+        ]
+
+    def test_write_table_cognates(self):
+        lex = Lexicon.objects.get(entry='hand-lang_a-Smith1991')
+        cogset1 = CognateSet.objects.create(protoform='a', editor=self.editor)
+        cogset2 = CognateSet.objects.create(protoform='b', editor=self.editor)
+        Cognate.objects.create(lexicon=lex, cognateset=cogset1, editor=self.editor)
+        Cognate.objects.create(
+            lexicon=lex, cognateset=cogset2, source=self.source1, editor=self.editor
+        )
+        rows = dict([(int(r[0]), r) for r in self.write()])
+        assert rows[lex.id][6] == "%s,%s" % (
+            repr_cog(cogset1.id), repr_cog(cogset2.id, self.source1.id)
+        )
+
+    def test_write_table_queries(self):
+        # queries are per chunk, not per row.
+        with self.assertNumQueries(4):  # the entries + a cognate query for each chunk of 3
+            self.write()
+
+    def test_shards(self):
+        entries = self.cmd.get_entries()
+        shards = self.cmd.get_shards(entries, 2)
+        assert shards == [[self.lang1.id], [self.lang2.id]]
+        assert self.cmd.get_shards(entries, 1) == [[self.lang1.id, self.lang2.id]]
+        assert self.cmd.get_shards(entries, 3) == [[self.lang1.id], [self.lang2.id], []]
+
+    def test_shard_option(self):
+        out = six.StringIO()
+        call_command('write_table', shard='2/2', stdout=out)
+        rows = out.getvalue().splitlines()
+        assert len(rows) == 4
+        assert all([r.split("\t")[1] == self.lang2.slug for r in rows])
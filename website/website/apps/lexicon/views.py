@@ -1,9 +1,7 @@
 from string import ascii_uppercase
 
-from django.core.cache import cache
 from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
 from django.http import Http404
 from django.views.generic import DetailView
 from django.views.generic.edit import UpdateView
@@ -12,8 +10,15 @@ from django.template import RequestContext
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 
+from website.apps.core.models import Language, Source
+from website.apps.core.ngrams import search, normalize, MIN_QUERY_LENGTH
+from website.apps.core.pagination import InvalidCursor
 from website.apps.lexicon.models import Word, WordSubset, Lexicon
 from website.apps.lexicon.forms import LexiconForm
+from website.apps.lexicon.alignment import get_alignment
+from website.apps.lexicon.segments import get_segments
+from website.apps.lexicon.inventory import get_inventory
+from website.apps.lexicon.similarity import find_similar, restrict
 
 from django_tables2 import SingleTableView, RequestConfig
 from website.apps.lexicon.tables import WordIndexTable, WordLexiconTable
@@ -23,6 +28,12 @@ from website.apps.lexicon.tables import WordLexiconEditTable
 from django.forms.models import modelformset_factory
 from website.apps.lexicon.forms import WordForm
 
+# the largest edit distance lexicon_similar will search for, the most
+# entries it will compare with the query, and the most it will list.
+MAX_SIMILAR_DISTANCE = 3
+MAX_SIMILAR_CANDIDATES = 20000
+MAX_SIMILAR_RESULTS = 1000
+
 
 class WordIndex(SingleTableView):
     """Word Index"""
@@ -42,7 +53,7 @@ class WordIndex(SingleTableView):
         else:
             qset = Word.objects.all()
         
-        return qset.annotate(count=Count("lexicon"))
+        return qset
 
     def get_context_data(self, **kwargs):
         context = super(WordIndex, self).get_context_data(**kwargs)
@@ -79,15 +90,16 @@ class WordDetail(DetailView):
             context['lexicon'] = WordLexiconEditTable(qset)
         else:
             context['lexicon'] = WordLexiconTable(qset)
-        RequestConfig(self.request).configure(context['lexicon'])
+        RequestConfig(self.request, paginate=False).configure(context['lexicon'])
             
         try:
-            context['lexicon'].paginate(
-                page=self.request.GET.get('page', 1), per_page=50
+            context['lexicon'].paginate_keyset(
+                self.request.GET.get(context['lexicon'].prefixed_cursor_field),
+                per_page=50, count=kwargs['object'].lexicon_count
             )
         except EmptyPage:  # 404 on a empty page
             raise Http404
-        except PageNotAnInteger:  # 404 on invalid page number
+        except InvalidCursor:  # 404 on invalid cursor
             raise Http404
         return context
 
@@ -148,38 +160,111 @@ def word_edit(request, slug):
 
 @login_required()
 def word_alignment(request, slug):
-    from lingpy import Multiple
     from website.apps.lexicon.tables import AlignmentTable
     w = get_object_or_404(Word, slug=slug)
     entries = w.lexicon_set.select_related().all()
     
-    # as MSA is seriously computationally expensive, we check if we can re-use
-    # a cached MSA.  first -- we set a cache value to be the raw string of all
-    # the entries. If one entry is changed, then this cache_value will be
-    # different.
-    cache_value = "".join(sorted([e.entry for e in entries]))
+    # as MSA is seriously computationally expensive, alignments are done by
+    # the align_words command. Here we show the last alignment we have, and
+    # queue the word if its entries have changed since.
+    alignment, pending = get_alignment(w, [(e.id, e.entry) for e in entries])
+    segments = {}
+    if alignment is not None:
+        segments = dict((lex_id, seg) for (lex_id, entry, seg) in alignment.get_rows())
     
-    if cache.get("msa-check-%s" % slug) == cache_value:
-        # have not changed. Get cache value
-        records = cache.get("msa-%s" % slug)
-    else:
-        # ... regenerate..
-        # align....
-        msa = Multiple([e.entry for e in entries])
-        msa.prog_align()
+    cached = get_segments(list(entries))
     
-        # tabulate....
-        records = []
-        for i, e in enumerate(entries):
-            e.alignment = "".join(msa.alm_matrix[i])
-            records.append(e)
-        
-        # update cache...
-        cache.set('msa-check-%s' % slug, cache_value, None)
-        cache.set('msa-%s' % slug, records, None)
+    records = []
+    for e in entries:
+        e.alignment = "".join(segments.get(e.id, []))
+        e.segments = cached.get(e.id, '')
+        records.append(e)
     
     table = AlignmentTable(records)
     
     return render(request, 'lexicon/word_alignment.html', {
-        'object': w, 'lexicon': table
+        'object': w, 'lexicon': table, 'pending': pending,
+        'alignment': alignment,
+    })
+
+
+def _render_inventory(request, obj, rows):
+    from website.apps.lexicon.tables import InventoryTable
+    table = InventoryTable([
+        {'character': char, 'count': count, 'name': name}
+        for (char, count, name) in get_inventory(rows)
+    ])
+    RequestConfig(request, paginate=False).configure(table)
+    return render(request, 'lexicon/inventory.html', {
+        'object': obj, 'inventory': table,
+    })
+
+
+def source_inventory(request, slug):
+    source = get_object_or_404(Source, slug=slug)
+    return _render_inventory(request, source, source.sourcecharacter_set.all())
+
+
+def language_inventory(request, language):
+    language = get_object_or_404(Language, slug=language)
+    return _render_inventory(request, language, language.languagecharacter_set.all())
+
+
+
+def lexicon_search(request):
+    """Finds the entries containing the query `q` (see `website.apps.core.ngrams`)"""
+    from website.apps.lexicon.tables import SearchLexiconTable
+    query = request.GET.get('q', '').strip()
+    too_short = bool(query) and len(normalize(query)) < MIN_QUERY_LENGTH
+    records = Lexicon.objects.none()
+    if query and not too_short:
+        records = search(Lexicon.objects.select_related('language', 'word', 'source'), query)
+    table = SearchLexiconTable(records)
+    RequestConfig(request).configure(table)
+    try:
+        table.paginate(page=request.GET.get('page', 1), per_page=50)
+    except EmptyPage:  # 404 on a empty page
+        raise Http404
+    except PageNotAnInteger:  # 404 on invalid page number
+        raise Http404
+    return render(request, 'lexicon/lexicon_search.html', {
+        'q': query, 'lexicon': table, 'too_short': too_short,
+        'min_length': MIN_QUERY_LENGTH,
     })
+
+
+def lexicon_similar(request):
+    """
+    Finds the entries within `distance` edits of the query `q`, optionally
+    restricted to a `word`, `clade` or `source`.
+    """
+    from website.apps.lexicon.tables import SimilarLexiconTable
+    query = request.GET.get('q', '').strip()
+    try:
+        distance = min(int(request.GET.get('distance', 2)), MAX_SIMILAR_DISTANCE)
+    except ValueError:
+        distance = 2
+    filters = dict([(k, request.GET.get(k, '').strip()) for k in ('word', 'clade', 'source')])
+    records = []
+    if query:
+        lexica = restrict(Lexicon.objects.all(), **filters)
+        for d, lex in find_similar(
+            query, distance, lexica,
+            limit=MAX_SIMILAR_RESULTS, max_candidates=MAX_SIMILAR_CANDIDATES
+        ):
+            lex.distance = d
+            records.append(lex)
+    table = SimilarLexiconTable(records)
+    RequestConfig(request).configure(table)
+    try:
+        table.paginate(page=request.GET.get('page', 1), per_page=50)
+    except EmptyPage:  # 404 on a empty page
+        raise Http404
+    except PageNotAnInteger:  # 404 on invalid page number
+        raise Http404
+    context = {
+        'q': query, 'distance': distance, 'lexicon': table,
+        'limited': len(records) == MAX_SIMILAR_RESULTS, 'limit': MAX_SIMILAR_RESULTS,
+    }
+    context.update(filters)
+    return render(request, 'lexicon/lexicon_similar.html', context)
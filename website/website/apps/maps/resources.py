@@ -1,11 +1,11 @@
-from django.db.models import Count
 from django.core.urlresolvers import reverse
 
 from tastypie import fields
 from tastypie.resources import Resource
 from tastypie.cache import SimpleCache
 
-from website.apps.core.models import Language, Location
+from website.apps.core.locations import get_locations
+from website.apps.core.models import Language
 
 
 class MapObj(object):
@@ -23,31 +23,18 @@ class MapObj(object):
         
 
 def prepare_map_data(records):
-    # this is a bit horrific but minimises database queries.
-    # 1. get entries and store in `entries`
-    isos = set()
-    entries = []
+    # plug in the coordinates from the location index, ignoring records
+    # without lats/longs.
+    locations = get_locations()
+    results = []
     for r in records:
-        if r.get('isocode', None) and len(r.get('isocode', "")) == 3:
+        point = locations.get(r.get('isocode', None))
+        if point is not None:
             obj = MapObj(r)
-            entries.append(obj)
-            isos.add(obj.isocode)
-    
-    # 2. get locations for the isocodes we've seen and store in a lookup table
-    locations = {}
-    for loc in Location.objects.filter(isocode__in=list(isos)):
-        locations[loc.isocode] = loc
-    
-    # 3. loop back through entries and plug in location data if we know it.
-    records = []
-    for e in entries:
-        # ignore entries without lats/longs
-        if e.isocode in locations:
-            e.latitude = locations[e.isocode].latitude
-            e.longitude = locations[e.isocode].longitude
-            records.append(e)
-    return records
-    
+            obj.latitude = point.latitude
+            obj.longitude = point.longitude
+            results.append(obj)
+    return results
 
 
 class LanguageMapResource(Resource):
@@ -75,16 +62,15 @@ class LanguageMapResource(Resource):
         
     def get_object_list(self, request):
         results = []
-        for L in Language.objects.annotate(count=Count('lexicon')).all():
-            if L.count > 0:
-                results.append({
-                    'isocode': L.isocode,
-                    'language': L.language,
-                    'label': L.language,
-                    'url': reverse(
-                        'language-detail', kwargs={'language': L.slug}
-                    ),
-                    'count': L.count,
-                })
+        for L in Language.objects.filter(lexicon_count__gt=0):
+            results.append({
+                'isocode': L.isocode,
+                'language': L.language,
+                'label': L.language,
+                'url': reverse(
+                    'language-detail', kwargs={'language': L.slug}
+                ),
+                'count': L.lexicon_count,
+            })
         return prepare_map_data(results)
 
@@ -127,6 +127,16 @@ class TestPrepareMapDataUtility(DataMixinLocations, TestCase):
         assert len(result) == 1
         assert result[0]['label'] == self.lexicon1.entry
 
+    def test_no_location_queries(self):
+        records = list(
+            Word.objects.get(pk=self.word2.pk).lexicon_set.select_related('language')
+        )
+        prepare_map_data(records)
+        # the locations come from the index once it's loaded.
+        with self.assertNumQueries(0):
+            result = prepare_map_data(records)
+        assert len(result) == 2
+
 
 class TestViewWordMap(DataMixinLocations, TestCase):
     def test_404(self):
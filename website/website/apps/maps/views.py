@@ -1,42 +1,33 @@
 from django.views.generic import DetailView, ListView
 from django.core.urlresolvers import reverse
-from website.apps.core.models import Language, Location
+from website.apps.core.locations import get_locations
+from website.apps.core.models import Language
 from website.apps.lexicon.models import Word, CognateSet
 
 
 def prepare_map_data(queryset):
-    # this is a bit horrific but minimises database queries.
-    # 1. get entries and store in `entries`
-    isos = set()
-    entries = []
-    for e in queryset:
-        if e.language.isocode and len(e.language.isocode) == 3:
-            entries.append({
-                'label': e.entry,
-                'language': e.language,
-                'isocode': e.language.isocode,
-                'url': reverse(
-                    'language-detail', kwargs={'language': e.language.slug}
-                ),
-            })
-            # save isocode
-            isos.add(e.language.isocode)
-    
-    # 2. get locations for the isocodes we've seen and store in a lookup table
-    locations = {}
-    for loc in Location.objects.filter(isocode__in=list(isos)):
-        locations[loc.isocode] = loc
-    
-    # 3. loop back through entries and plug in location data if we know it.
+    """
+    Returns the entries in `queryset` as dicts for the map, with the
+    coordinates of their language from the location index. Entries without
+    a location are left out.
+    """
+    locations = get_locations()
     final = []
-    for e in entries:
-        if e['isocode'] in locations:
-            e['latitude'] = locations[e['isocode']].latitude
-            e['longitude'] = locations[e['isocode']].longitude
-            final.append(e)
-        else:
+    for e in queryset:
+        point = locations.get(e.language.isocode)
+        if point is None:
             # ignore entries without lats/longs
             continue
+        final.append({
+            'label': e.entry,
+            'language': e.language,
+            'isocode': e.language.isocode,
+            'url': reverse(
+                'language-detail', kwargs={'language': e.language.slug}
+            ),
+            'latitude': point.latitude,
+            'longitude': point.longitude,
+        })
     return final
 
 
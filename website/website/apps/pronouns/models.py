@@ -1,5 +1,6 @@
 from django.utils import six
 from django.db import models
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.contrib.auth.models import User
 from django.utils.encoding import python_2_unicode_compatible
 
@@ -267,3 +268,41 @@ class Rule(TrackedModel):
         db_table = 'pronoun_rules'
 
         
+
+
+# the paradigms are shown on the language pages, so delete their dossiers
+# (see website.apps.core.dossier) when they change.
+def invalidate_paradigm(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers([instance.language_id])
+
+
+def invalidate_pronoun(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers(Language.objects.filter(paradigm__id=instance.paradigm_id))
+
+
+def invalidate_pronoun_entries(sender, instance, action, reverse, pk_set, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_pronoun(sender, instance)
+    elif action == 'pre_clear':  # a lexicon removed from all its pronouns
+        invalidate_dossiers(Language.objects.filter(paradigm__pronoun__entries=instance))
+    else:
+        invalidate_dossiers(Language.objects.filter(paradigm__pronoun__in=pk_set))
+
+
+def invalidate_pronountype(sender, instance, **kwargs):
+    from website.apps.core.dossier import invalidate_dossiers
+    invalidate_dossiers(Language.objects.filter(paradigm__isnull=False).distinct())
+
+
+post_save.connect(invalidate_paradigm, sender=Paradigm, dispatch_uid="pronouns:dossier")
+post_delete.connect(invalidate_paradigm, sender=Paradigm, dispatch_uid="pronouns:dossier")
+post_save.connect(invalidate_pronoun, sender=Pronoun, dispatch_uid="pronouns:dossier")
+post_delete.connect(invalidate_pronoun, sender=Pronoun, dispatch_uid="pronouns:dossier")
+m2m_changed.connect(invalidate_pronoun_entries, sender=Pronoun.entries.through, dispatch_uid="pronouns:dossier")
+post_save.connect(invalidate_pronountype, sender=PronounType, dispatch_uid="pronouns:dossier")
+post_delete.connect(invalidate_pronountype, sender=PronounType, dispatch_uid="pronouns:dossier")
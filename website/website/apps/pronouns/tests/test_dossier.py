@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from website.apps.core.dossier import get_dossier
+from website.apps.lexicon.models import Lexicon
+from website.apps.pronouns.models import Pronoun, PronounType
+from website.apps.pronouns.tests import PronounsTestData
+
+
+class Test_Dossier(PronounsTestData, TestCase):
+    """The pronoun paradigm in the language dossier"""
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('language-detail', kwargs={'language': self.lang.slug})
+
+    def cells(self):
+        return [
+            sorted([e.entry for e in cells['A'].entries.all()])
+            for (label, cells) in get_dossier(self.lang.slug)['pronoun_rows']
+        ]
+
+    def test_paradigm(self):
+        dossier = get_dossier(self.lang.slug)
+        assert dossier['pronoun'] == self.pdm
+        assert self.cells() == [['lexicon 1'], ['lexicon 2'], ['lexicon 3']]
+
+    def test_page_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'lexicon 2')
+
+    def test_entry_added(self):
+        self.cells()
+        Pronoun.objects.get(pk=self.p1.pk).entries.add(self.lex2)
+        assert self.cells() == [['lexicon 1', 'lexicon 2'], ['lexicon 2'], ['lexicon 3']]
+
+    def test_entry_removed(self):
+        self.cells()
+        Lexicon.objects.get(pk=self.lex3.pk).pronoun_set.clear()
+        assert self.cells() == [['lexicon 1'], ['lexicon 2']]
+
+    def test_entry_edited(self):
+        self.cells()
+        lex = Lexicon.objects.get(pk=self.lex1.pk)
+        lex.entry = 'edited'
+        lex.save()
+        assert self.cells() == [['edited'], ['lexicon 2'], ['lexicon 3']]
+
+    def test_pronountype_hidden(self):
+        self.cells()
+        PronounType.objects.filter(person='3').update(active=False)
+        ptype = PronounType.objects.get(person='1')
+        ptype.save()
+        assert self.cells() == [['lexicon 1'], ['lexicon 2']]
+
+    def test_paradigm_deleted(self):
+        get_dossier(self.lang.slug)
+        self.pdm.delete()
+        assert 'pronoun' not in get_dossier(self.lang.slug)
@@ -1,4 +1,7 @@
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, models
+from django.db.models import F, Func
+from django.db.models.functions import Coalesce
 from django.utils import six
 
 from django.utils.encoding import python_2_unicode_compatible
@@ -18,33 +21,93 @@ class InvalidMethod(Exception):
 class Statistic(object):
     def __init__(self):
         self._registry = {}
+        # method: function(model, field) returning the SQL expression for it.
         self._statistics = {
-            'count': self._get_count,
+            'count': self._count,
+            'distinct': self._distinct,
+            'sum': self._sum,
+            'max': self._max,
         }
     
-    def _get_count(self, model, field='id'):
-        """Method to get the count of `field` from `model`"""
+    def _get_field(self, model, field):
+        try:
+            return model._meta.get_field(field).column
+        except FieldDoesNotExist:
+            raise InvalidField("%s has no field `%s`" % (model.__name__, field))
+    
+    def _count(self, model, field='id'):
         if field != 'id':
             raise InvalidField("Expecting the field to be `id`")
-        return model.objects.count()
-        
+        return Func(template='COUNT(*)', output_field=models.FloatField())
+    
+    def _distinct(self, model, field):
+        self._get_field(model, field)
+        return Func(
+            F(field), template='COUNT(DISTINCT %(expressions)s)', output_field=models.FloatField()
+        )
+    
+    def _sum(self, model, field):
+        self._get_field(model, field)
+        return Coalesce(Func(F(field), function='SUM'), 0, output_field=models.FloatField())
+    
+    def _max(self, model, field):
+        self._get_field(model, field)
+        return Coalesce(Func(F(field), function='MAX'), 0, output_field=models.FloatField())
+    
+    def _evaluate(self, statistics):
+        """
+        Returns the values for a list of (model, field, method), all worked
+        out in one query of a subquery each.
+        """
+        if not statistics:
+            return []
+        subqueries, params = [], []
+        for model, field, method in statistics:
+            # a plain function rather than an aggregate, so it's computed
+            # over the whole table without a GROUP BY.
+            query = model._default_manager.order_by().annotate(
+                value=self._statistics[method](model, field)
+            ).values('value').query
+            sql, p = query.sql_with_params()
+            subqueries.append("(%s)" % sql)
+            params.extend(p)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT %s" % ", ".join(subqueries), params)
+            return list(cursor.fetchone())
+    
+    def _get_count(self, model, field='id'):
+        """Method to get the count of `field` from `model`"""
+        return self._evaluate([(model, field, 'count')])[0]
+    
+    def get_statistics(self, labels):
+        """Returns {label: value} for `labels`"""
+        labels = list(labels)
+        values = self._evaluate([self._registry[label][:3] for label in labels])
+        return dict(zip(labels, values))
+    
     def get_statistic(self, label):
-        model, field, method, graph = self._registry[label]
-        return self._statistics[method](model, field)
+        return self.get_statistics([label])[label]
     
-    def update(self, save=True):
-        out = {}
-        for label in self._registry:
-            value = self.get_statistic(label)
-            out[label] = value
-            if save:
-                StatisticalValue.objects.create(
+    def update(self, save=True, models=None):
+        """
+        Works out (and saves) the statistics, or only those of `models` if
+        given.
+        """
+        labels = [
+            label for label in self._registry
+            if models is None or self._registry[label][0] in models
+        ]
+        out = self.get_statistics(labels)
+        if save:
+            StatisticalValue.objects.bulk_create([
+                StatisticalValue(
                     label=label,
                     model=self._registry[label][0].__module__,
                     field=self._registry[label][1],
                     method=self._registry[label][2],
-                    value=value
-                )
+                    value=out[label]
+                ) for label in labels
+            ])
         return out
         
     def get_graphing(self):
@@ -71,6 +134,8 @@ class Statistic(object):
                     method, ",".join(self._statistics)
                 )
             )
+        # check that the method can work out `field` on `model`.
+        self._statistics[method](model, field)
         # Instantiate the admin class to save in the registry
         self._registry[label] = (model, field, method, graph)
 
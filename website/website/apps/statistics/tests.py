@@ -70,6 +70,39 @@ class StatisticTest(StatisticMixin, TestCase):
         assert StatisticalValue.objects.filter(label="NFam")[0].value == 1
         assert StatisticalValue.objects.filter(label="NSource")[0].value == 0
 
+    def test_update_models(self):
+        out = self.statistic.update(models=[Family, Source])
+        assert out == {"NFam": 1, "NSource": 0}
+        assert sorted(StatisticalValue.objects.values_list('label', flat=True)) == ["NFam", "NSource"]
+
+    def test_update_queries(self):
+        # one query for the values, and one to save them.
+        with self.assertNumQueries(2):
+            self.statistic.update()
+        with self.assertNumQueries(1):
+            self.statistic.update(save=False)
+
+    def test_distinct(self):
+        statistic = Statistic()
+        statistic.register("NClassified", Language, 'classification', method='distinct')
+        assert statistic.get_statistic("NClassified") == 2
+
+    def test_sum_and_max(self):
+        statistic = Statistic()
+        statistic.register("NLang", Language)
+        statistic.register("NEntries", Language, 'lexicon_count', method='sum')
+        statistic.register("MostEntries", Language, 'lexicon_count', method='max')
+        statistic.register("SourceEntries", Source, 'lexicon_count', method='sum')
+        Language.objects.filter(pk=self.lang1.pk).update(lexicon_count=3)
+        Language.objects.filter(pk=self.lang2.pk).update(lexicon_count=5)
+        with self.assertNumQueries(1):
+            out = statistic.get_statistics(["NEntries", "MostEntries", "SourceEntries", "NLang"])
+        assert out == {"NEntries": 8, "MostEntries": 5, "SourceEntries": 0, "NLang": 2}
+
+    def test_bad_field(self):
+        with self.assertRaises(InvalidField):
+            Statistic().register("Bad Field", Language, 'nothing', method='sum')
+
     def test_get_all(self):
         """Tests the manager method .get_all"""
         self.statistic.update()
@@ -14,7 +14,7 @@ GRAPH_START = datetime.strptime(
 def format_time_struct(date):
     return int(mktime(date)) * 1000
 
-def get_xy(label, get_latest=False):
+def get_xy(label, get_latest=False, latest=None):
     x = [format_time_struct(GRAPH_START.timetuple()), ]
     y = [0, ]
     
@@ -28,7 +28,9 @@ def get_xy(label, get_latest=False):
     # get_latest
     if get_latest:
         x.append(format_time_struct(datetime.now().timetuple()))
-        y.append(float(statistic.get_statistic(label)))
+        if latest is None:
+            latest = statistic.get_statistic(label)
+        y.append(float(latest))
     return {'x': x, 'y': y, 'name': label}
 
 
@@ -52,13 +54,15 @@ def statistics(request):
     """Shows statistics"""
     out = {'charts': []}
     
-    # add line graphs
-    for i, label in enumerate(statistic.get_graphing(), 1):
+    # add line graphs, with their current values worked out together.
+    graphing = statistic.get_graphing()
+    latest = statistic.get_statistics(graphing)
+    for i, label in enumerate(graphing, 1):
         out['charts'].append({
             'label': label,
             'type': "lineChart",
             'id': 'chart_id_%d' % i,
-            'data': get_xy(label, get_latest=True),
+            'data': get_xy(label, get_latest=True, latest=latest[label]),
             'extra': {
                  'x_is_date': True,
                  'x_axis_format': "%d %b %Y",
@@ -1,25 +1,49 @@
+from contextlib import contextmanager
+from threading import local
+
 from django.contrib.redirects.models import Redirect
 from django.contrib.sites.models import Site
 
+_state = local()
+
+
+@contextmanager
+def suspend_redirects():
+    """
+    Turns off `create_redirect` in this thread for the duration, e.g. for
+    bulk imports, which create objects rather than moving them.
+    """
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def add_redirect(old_path, new_path):
+    # Update any existing redirects that are pointing to the old url
+    for redirect in Redirect.objects.filter(new_path=old_path):
+        redirect.new_path = new_path
+        # If the updated redirect now points to itself, delete it
+        # (i.e. slug = A -> slug = B -> slug = A again)
+        if redirect.new_path == redirect.old_path:
+            redirect.delete()
+        else:
+            redirect.save()
+    # Now add the new redirect
+    Redirect.objects.create(
+                    site=Site.objects.get_current(),
+                    old_path=old_path,
+                    new_path=new_path)
+
 def create_redirect(sender, instance, **kwargs):
+    # new objects have no old url to redirect from.
+    if instance.pk is None or getattr(_state, 'suspended', False):
+        return
     try:
         o = sender.objects.get(id=instance.id)
         if o.slug != instance.slug:
-            old_path = o.get_absolute_url()
-            new_path = instance.get_absolute_url()
-            # Update any existing redirects that are pointing to the old url
-            for redirect in Redirect.objects.filter(new_path=old_path):
-                redirect.new_path = new_path
-                # If the updated redirect now points to itself, delete it
-                # (i.e. slug = A -> slug = B -> slug = A again)
-                if redirect.new_path == redirect.old_path:
-                    redirect.delete()
-                else:
-                    redirect.save()
-            # Now add the new redirect
-            Redirect.objects.create(
-                            site=Site.objects.get_current(),
-                            old_path=old_path,
-                            new_path=new_path)
+            add_redirect(o.get_absolute_url(), instance.get_absolute_url())
     except sender.DoesNotExist:
         pass
@@ -28,6 +28,8 @@ from website.apps.core.views import language_detail, iso_lookup, glotto_lookup
 from website.apps.lexicon.views import WordIndex, WordDetail
 from website.apps.lexicon.views import LexiconDetail, LexiconEdit
 from website.apps.lexicon.views import word_edit, word_alignment
+from website.apps.lexicon.views import source_inventory, language_inventory
+from website.apps.lexicon.views import lexicon_search, lexicon_similar
 
 from website.sitemap import sitemaps
 
@@ -104,6 +106,12 @@ if 'website.apps.lexicon' in settings.INSTALLED_APPS:
         # Word-Detail: Show the given word
         url(r'^word/(?P<slug>[\w\d\-\.]+)$', WordDetail.as_view(), name="word-detail"),
         
+        # lexicon-search: entries containing a substring.
+        url(r'^lexicon/search$', lexicon_search, name="lexicon-search"),
+        
+        # lexicon-similar: entries within an edit distance of a form.
+        url(r'^lexicon/similar$', lexicon_similar, name="lexicon-similar"),
+        
         # lexicon-detail: detail of lexical item.
         url(r'^lexicon/(?P<pk>\d+)$', LexiconDetail.as_view(), name="lexicon-detail"),
         
@@ -112,6 +120,10 @@ if 'website.apps.lexicon' in settings.INSTALLED_APPS:
         url(r'^lexicon/(?P<pk>\d+)/edit$', LexiconEdit.as_view(), name="lexicon-edit"),
         url(r'^word/(?P<slug>[\w\d\-\.]+)/edit$', word_edit, name="word-edit"),
         url(r'^word/(?P<slug>[\w\d\-\.]+)/alignment$', word_alignment, name="word-alignment"),
+        
+        # Character inventories
+        url(r'^source/(?P<slug>[\w\d\-\.]+)/inventory$', source_inventory, name="source-inventory"),
+        url(r'^language/(?P<language>[\w\d\-\.]+)/inventory$', language_inventory, name="language-inventory"),
     ])
     urlpatterns.extend([
         url(r"^cognacy/", include('website.apps.cognacy.urls', namespace='cognacy')),